@@ -0,0 +1,109 @@
+import heapq
+
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from project.caching import FeedbackRequestQueueCache
+from project.models import FeedbackRequest, User
+
+FeedbackRequestAssignment = FeedbackRequest.assigned_editors.through
+
+
+class FeedbackRequestAssigner:
+	""" Assigns unassigned FeedbackRequests to editors, balancing open work across them.
+
+		Editors are kept in a heap ordered by their open work (assigned FeedbackRequests that are not finished). Requests
+		are assigned in deadline order, each to the editors with the least open work at that point, so the most urgent
+		requests are spread across everyone before less urgent ones are handed out. Editors at `max_open_per_editor`
+		leave the heap.
+
+		Assignments are written with `bulk_create` on the through table, one transaction per `batch_size` requests.
+		Since that bypasses signals, the queue cache is invalidated explicitly.
+	"""
+
+	def __init__(
+		self,
+		editors: Optional[Iterable[User]] = None,
+		editors_per_request: int = 1,
+		max_open_per_editor: Optional[int] = None,
+		batch_size: int = 1000,
+	):
+		self.editors = editors
+		self.editors_per_request = editors_per_request
+		self.max_open_per_editor = max_open_per_editor
+		self.batch_size = batch_size
+		self.heap: List[List[int]] = []
+
+	@staticmethod
+	def default_editors():
+		""" Editors that requests are assigned to when none are specified: active staff users. """
+		return User.objects.filter(is_active=True, is_staff=True)
+
+	@staticmethod
+	def query_unassigned():
+		""" Query unstarted FeedbackRequests that are not assigned to anyone, most urgent first. """
+		return FeedbackRequest.objects.filter(status=FeedbackRequest.Status.UNSTARTED).filter(
+			~Exists(FeedbackRequestAssignment.objects.filter(feedbackrequest_id=OuterRef('pk')))
+		).order_by('deadline', 'pk')
+
+	def load_editors(self):
+		""" Build the heap of [open work, editor id] in one query. """
+		editors = self.default_editors() if self.editors is None else User.objects.filter(
+			pk__in=[editor.pk for editor in self.editors]
+		)
+		open_work = editors.annotate(
+			open_work=Count(
+				'assigned_feedback_requests',
+				filter=~Q(assigned_feedback_requests__status=FeedbackRequest.Status.FINISHED)
+			)
+		).values_list('open_work', 'pk')
+		self.heap = [
+			[load, editor_id] for load, editor_id in open_work
+			if self.max_open_per_editor is None or load < self.max_open_per_editor
+		]
+		heapq.heapify(self.heap)
+
+	def pick_editors(self) -> List[int]:
+		""" Pop the least loaded editors for one request and push them back with one more unit of open work. """
+		if len(self.heap) < self.editors_per_request:
+			return []
+		picked = [heapq.heappop(self.heap) for _ in range(self.editors_per_request)]
+		for entry in picked:
+			entry[0] += 1
+			if self.max_open_per_editor is None or entry[0] < self.max_open_per_editor:
+				heapq.heappush(self.heap, entry)
+		return [editor_id for _, editor_id in picked]
+
+	def assign(self, feedback_requests=None) -> int:
+		""" Assign the FeedbackRequests in the queryset (default: all unassigned ones) and return how many assignments
+			were created. Requests left over once every editor is at capacity stay unassigned.
+		"""
+		if feedback_requests is None:
+			feedback_requests = self.query_unassigned()
+		self.load_editors()
+		feedback_request_ids = feedback_requests.values_list('pk', flat=True).iterator(chunk_size=self.batch_size)
+
+		created = 0
+		while self.heap:
+			batch = list(islice(feedback_request_ids, self.batch_size))
+			if not batch:
+				break
+			assignments = []
+			for feedback_request_id in batch:
+				editor_ids = self.pick_editors()
+				if not editor_ids:
+					break
+				assignments += [
+					FeedbackRequestAssignment(feedbackrequest_id=feedback_request_id, user_id=editor_id)
+					for editor_id in editor_ids
+				]
+			with transaction.atomic():
+				FeedbackRequestAssignment.objects.bulk_create(
+					assignments, batch_size=self.batch_size, ignore_conflicts=True
+				)
+				FeedbackRequestQueueCache.invalidate_users(assignment.user_id for assignment in assignments)
+			created += len(assignments)
+		return created
@@ -0,0 +1,89 @@
+""" Async versions of the busiest API endpoints, for serving under ASGI (see prompt/asgi.py).
+
+	Under ASGI, Django 3.1 runs every sync view in one shared thread, so a request waiting on the database holds up
+	every other request's view. These views are async instead. Django 3.1 has no async ORM interface, so their database
+	work runs with database_sync_to_async, in a thread of the request's own, and the event loop only awaits it.
+
+	The views are the sync viewsets with AsyncViewMixin, so they have the same behavior, including authentication,
+	permissions (`IsAuthenticated`), caching and conditional GETs. They are routed under `api/async/` in prompt/urls.py.
+"""
+
+import asyncio
+import functools
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import connections
+
+from project.views import FeedbackRequestViewSet, FeedbackResponseViewSet
+
+
+def database_sync_to_async(func):
+	""" Wrap sync code that uses the ORM for awaiting from an AsyncViewMixin view. Calls made during one request run in
+		the same thread, and so share a database connection and transaction state.
+	"""
+	return sync_to_async(func, thread_sensitive=True)
+
+
+def close_connections():
+	""" Close the current thread's database connections, except those in a transaction, which belong to an outer
+		sync thread (as in tests) rather than the request's own.
+	"""
+	for connection in connections.all():
+		if not connection.in_atomic_block:
+			connection.close()
+
+
+class AsyncViewMixin:
+	""" Mixin that makes a DRF view or viewset async, for Django's async request handling.
+
+		Handlers may be coroutines, or sync methods, which run with database_sync_to_async. Authentication, permission
+		checks and finalizing the response also run that way, since they may query the database.
+	"""
+
+	@classmethod
+	def as_view(cls, *args, **initkwargs):
+		view = super().as_view(*args, **initkwargs)
+
+		@functools.wraps(view)
+		async def async_view(request, *args, **kwargs):
+			# Give the request its own thread for database work, which Django 3.1 does not
+			context = ThreadSensitiveContext()
+			async with context:
+				try:
+					return await view(request, *args, **kwargs)
+				finally:
+					# The request's thread ends with it, so close the connections it opened
+					await database_sync_to_async(close_connections)()
+
+		return async_view
+
+	async def dispatch(self, request, *args, **kwargs):
+		""" The async equivalent of APIView.dispatch. """
+		self.args = args
+		self.kwargs = kwargs
+		request = self.initialize_request(request, *args, **kwargs)
+		self.request = request
+		self.headers = self.default_response_headers
+
+		try:
+			await database_sync_to_async(self.initial)(request, *args, **kwargs)
+			handler = self.http_method_not_allowed
+			if request.method.lower() in self.http_method_names:
+				handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+			if asyncio.iscoroutinefunction(handler):
+				response = await handler(request, *args, **kwargs)
+			else:
+				response = await database_sync_to_async(handler)(request, *args, **kwargs)
+		except Exception as exc:
+			response = self.handle_exception(exc)
+
+		self.response = await database_sync_to_async(self.finalize_response)(request, response, *args, **kwargs)
+		return self.response
+
+
+class AsyncFeedbackRequestViewSet(AsyncViewMixin, FeedbackRequestViewSet):
+	""" FeedbackRequestViewSet, served async. Only the list (the editing queue) is routed. """
+
+
+class AsyncFeedbackResponseViewSet(AsyncViewMixin, FeedbackResponseViewSet):
+	""" FeedbackResponseViewSet, served async. The list, detail and delta (autosave) endpoints are routed. """
@@ -0,0 +1,51 @@
+""" Cheaper authentication of requests.
+
+	Sessions are read from the cache with the `cached_db` session engine (see SESSION_ENGINE in prompt/settings.py), and
+	CachedModelBackend caches the User each session belongs to for settings.AUTH_USER_CACHE_TIMEOUT seconds, so an
+	authenticated request needs no queries before the view runs. Cached users are invalidated when they are saved,
+	which includes changing their password, deleted or logged out. Changes that bypass signals, like `.update()`, show
+	after the timeout.
+"""
+
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from project.models import User
+
+
+class UserCache:
+	""" Caches Users by id. """
+
+	PREFIX = 'user'
+
+	@staticmethod
+	def get_key(user_id) -> str:
+		return f'{UserCache.PREFIX}:{user_id}'
+
+	@staticmethod
+	def get(user_id) -> Optional[User]:
+		return cache.get(UserCache.get_key(user_id))
+
+	@staticmethod
+	def set(user: User):
+		cache.set(UserCache.get_key(user.pk), user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+	@staticmethod
+	def invalidate(user_id):
+		cache.delete(UserCache.get_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+	""" ModelBackend that loads the users of sessions through UserCache. """
+
+	def get_user(self, user_id):
+		user = UserCache.get(user_id)
+		if user is None:
+			user = super().get_user(user_id)
+			if user is not None:
+				UserCache.set(user)
+			return user
+		return user if self.user_can_authenticate(user) else None
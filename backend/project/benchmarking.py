@@ -0,0 +1,167 @@
+""" Helpers shared by the `benchmark_*` management commands. """
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from project.models import User
+
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+@contextmanager
+def benchmark_database(keep: bool = False) -> Iterator[str]:
+	""" Run the enclosed block against a throwaway copy of the default database, the same way the test runner does.
+
+		The schema is created from the models rather than by running migrations, since the data migrations expect an
+		interactive setup, and the cache is replaced by a local memory one. On SQLite the database is a file in a
+		temporary directory rather than in memory, so that benchmarks with several threads share it. Yields the name of
+		the database.
+	"""
+	settings_dict = connection.settings_dict
+	old_name = settings_dict['NAME']
+	old_test_name = settings_dict['TEST'].get('NAME')
+	temp_dir = None
+	if connection.vendor == 'sqlite':
+		temp_dir = tempfile.mkdtemp(prefix='prompt-benchmark-')
+		settings_dict['TEST']['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+
+	setup_test_environment()
+	try:
+		with override_settings(MIGRATION_MODULES={app.label: None for app in apps.get_app_configs()}):
+			name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+		try:
+			# Keep the throwaway data out of the real cache, which holds as many entries
+			with override_settings(CACHES={
+				'default': {
+					'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+					'OPTIONS': {'MAX_ENTRIES': 100000},
+				}
+			}):
+				yield name
+		finally:
+			connections.close_all()
+			if not keep:
+				connection.creation.destroy_test_db(old_name, verbosity=0)
+	finally:
+		teardown_test_environment()
+		settings_dict['TEST']['NAME'] = old_test_name
+		if temp_dir is not None and not keep:
+			shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def create_benchmark_users(count: int, prefix: str = 'editor', **fields) -> List[User]:
+	""" Bulk create users that can log in with BENCHMARK_PASSWORD. The password is only hashed once. """
+	password = make_password(BENCHMARK_PASSWORD)
+	User.objects.bulk_create([
+		User(username=f'{prefix}-{i}@example.com', email=f'{prefix}-{i}@example.com', password=password, **fields)
+		for i in range(count)
+	])
+	return list(User.objects.filter(username__startswith=f'{prefix}-').order_by('pk'))
+
+
+class Stopwatch:
+	""" Accumulates named wall-clock timings, in seconds. """
+
+	def __init__(self):
+		self.timings: Dict[str, float] = {}
+
+	@contextmanager
+	def measure(self, name: str):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+@dataclass
+class EndpointMeasurement:
+	""" The cost of a single request: wall time and SQL time in milliseconds, and the number of SQL queries. """
+
+	status_code: int
+	wall_ms: float
+	queries: int
+	sql_ms: float
+
+
+class QueryTimer:
+	""" A database execute wrapper that counts queries and accumulates their time, in seconds. """
+
+	def __init__(self):
+		self.queries = 0
+		self.time = 0.0
+
+	def __call__(self, execute, sql, params, many, context):
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.time += time.perf_counter() - start
+			self.queries += 1
+
+
+def measure_request(client, method: str, path: str, **kwargs) -> Tuple[object, EndpointMeasurement]:
+	""" Make a request with a django.test.Client and measure it. Returns the response and the measurement. """
+	timer = QueryTimer()
+	with connection.execute_wrapper(timer):
+		start = time.perf_counter()
+		response = getattr(client, method)(path, **kwargs)
+		wall = time.perf_counter() - start
+	return response, EndpointMeasurement(
+		status_code=response.status_code,
+		wall_ms=wall * 1000,
+		queries=timer.queries,
+		sql_ms=timer.time * 1000,
+	)
+
+
+def summarize_measurements(measurements: List[EndpointMeasurement]) -> dict:
+	""" Combine repeated measurements of an endpoint: median times, and the largest query count. """
+	return {
+		'status_code': measurements[-1].status_code,
+		'wall_ms': round(statistics.median(m.wall_ms for m in measurements), 3),
+		'queries': max(m.queries for m in measurements),
+		'sql_ms': round(statistics.median(m.sql_ms for m in measurements), 3),
+	}
+
+
+def compare_to_baseline(
+	baseline: Dict[str, dict],
+	results: Dict[str, dict],
+	time_tolerance: float = 1.5,
+	min_time_delta_ms: float = 5.0,
+	query_tolerance: int = 0,
+) -> List[str]:
+	""" Compare summarized endpoint results to a baseline, and describe every regression.
+
+		An endpoint regresses if its status code changes, if it makes more than `query_tolerance` more queries, or if
+		its wall time exceeds the baseline by a factor of `time_tolerance` and by at least `min_time_delta_ms`. A
+		`time_tolerance` of 0 disables the wall time check, since wall times only compare on the same machine.
+	"""
+	regressions = []
+	for name, result in results.items():
+		if name not in baseline:
+			continue
+		expected = baseline[name]
+		if result['status_code'] != expected['status_code']:
+			regressions.append(f'{name}: status {expected["status_code"]} -> {result["status_code"]}')
+		if result['queries'] > expected['queries'] + query_tolerance:
+			regressions.append(f'{name}: {expected["queries"]} -> {result["queries"]} queries')
+		if (
+			time_tolerance and result['wall_ms'] > expected['wall_ms'] * time_tolerance
+			and result['wall_ms'] - expected['wall_ms'] >= min_time_delta_ms
+		):
+			regressions.append(f'{name}: {expected["wall_ms"]:.1f}ms -> {result["wall_ms"]:.1f}ms')
+	return regressions
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from typing import Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from project.models import FeedbackRequest, User
+
+FeedbackRequestAssignment = FeedbackRequest.assigned_editors.through
+
+
+class FeedbackRequestQueueCache:
+	""" Caches each editor's serialized FeedbackRequest queue through Django's cache framework.
+
+		Entries are keyed by a generation per user and a global generation. Invalidating a user deletes their
+		generation, so the next read starts a new one and older entries are never read again, including entries
+		written by a read that raced with the invalidation. Invalidations inside a transaction are repeated when it
+		commits, so that a read between the invalidation and the commit cannot cache the old queue.
+
+		Hits and misses are counted in process memory, and added to counts in the cache at most every
+		STATS_FLUSH_INTERVAL seconds, so that reads do not write to the cache while the counts are still shared by
+		every process using it.
+	"""
+
+	PREFIX = 'feedback-request-queue'
+	GLOBAL_GENERATION_KEY = f'{PREFIX}:generation'
+	HITS_KEY = f'{PREFIX}:hits'
+	MISSES_KEY = f'{PREFIX}:misses'
+	TIMEOUT = 60 * 60
+	STATS_FLUSH_INTERVAL = 60
+
+	_stats_lock = threading.Lock()
+	_unflushed_stats = {HITS_KEY: 0, MISSES_KEY: 0}
+	_stats_flushed = time.monotonic()
+
+	@staticmethod
+	def get_generation_key(user_id: int) -> str:
+		return f'{FeedbackRequestQueueCache.PREFIX}:{user_id}:generation'
+
+	@staticmethod
+	def get_generations(user_id: int) -> List[int]:
+		""" The global generation and the user's generation, starting new ones where there are none. Generations are
+			the nanosecond timestamps they were started at, so a generation that was deleted is never repeated.
+		"""
+		keys = [FeedbackRequestQueueCache.GLOBAL_GENERATION_KEY, FeedbackRequestQueueCache.get_generation_key(user_id)]
+		generations = cache.get_many(keys)
+		for key in keys:
+			if key not in generations:
+				cache.add(key, time.time_ns(), None)
+				generations[key] = cache.get(key) or time.time_ns()
+		return [generations[key] for key in keys]
+
+	@staticmethod
+	def get_generation(user_id: int) -> int:
+		""" A number that changes whenever the user's queue may have changed, which is the time it last changed, or
+			later, in nanoseconds.
+		"""
+		return max(FeedbackRequestQueueCache.get_generations(user_id))
+
+	@staticmethod
+	def get_data_key(user_id: int) -> str:
+		""" The key of the user's current entry. """
+		global_generation, generation = FeedbackRequestQueueCache.get_generations(user_id)
+		return f'{FeedbackRequestQueueCache.PREFIX}:{user_id}:{global_generation}:{generation}'
+
+	@staticmethod
+	def count(key: str):
+		with FeedbackRequestQueueCache._stats_lock:
+			FeedbackRequestQueueCache._unflushed_stats[key] += 1
+			elapsed = time.monotonic() - FeedbackRequestQueueCache._stats_flushed
+		if elapsed >= FeedbackRequestQueueCache.STATS_FLUSH_INTERVAL:
+			FeedbackRequestQueueCache.flush_stats()
+
+	@staticmethod
+	def flush_stats():
+		""" Add the counts of this process to the counts in the cache. """
+		with FeedbackRequestQueueCache._stats_lock:
+			counts = FeedbackRequestQueueCache._unflushed_stats
+			FeedbackRequestQueueCache._unflushed_stats = dict.fromkeys(counts, 0)
+			FeedbackRequestQueueCache._stats_flushed = time.monotonic()
+		for key, count in counts.items():
+			if count:
+				cache.add(key, 0, None)
+				try:
+					cache.incr(key, count)
+				except ValueError:
+					pass
+
+	@staticmethod
+	def get_or_set(user: User, load) -> tuple:
+		""" Get the user's cached queue, or cache the result of calling `load`. Returns (queue, whether it was a hit).
+		"""
+		key = FeedbackRequestQueueCache.get_data_key(user.pk)
+		data = cache.get(key)
+		if data is not None:
+			FeedbackRequestQueueCache.count(FeedbackRequestQueueCache.HITS_KEY)
+			return data, True
+		FeedbackRequestQueueCache.count(FeedbackRequestQueueCache.MISSES_KEY)
+		data = load()
+		cache.set(key, data, FeedbackRequestQueueCache.TIMEOUT)
+		return data, False
+
+	@staticmethod
+	def invalidate_users(user_ids: Iterable[Optional[int]]):
+		""" Invalidate the queues of the specified users. """
+		keys = [FeedbackRequestQueueCache.get_generation_key(user_id) for user_id in set(user_ids) if user_id]
+		if not keys:
+			return
+		cache.delete_many(keys)
+		if connection.in_atomic_block:
+			transaction.on_commit(lambda: cache.delete_many(keys))
+
+	@staticmethod
+	def invalidate_feedback_requests(feedback_request_ids: Iterable[int]):
+		""" Invalidate the queues of every editor assigned to the specified FeedbackRequests. """
+		FeedbackRequestQueueCache.invalidate_users(
+			FeedbackRequestAssignment.objects.filter(feedbackrequest_id__in=list(feedback_request_ids)
+													).values_list('user_id', flat=True)
+		)
+
+	@staticmethod
+	def invalidate_essays(essay_ids: Iterable[int]):
+		""" Invalidate the queues of every editor assigned to a FeedbackRequest on the specified Essays. """
+		FeedbackRequestQueueCache.invalidate_users(
+			FeedbackRequestAssignment.objects.filter(feedbackrequest__essay_id__in=list(essay_ids)
+													).values_list('user_id', flat=True)
+		)
+
+	@staticmethod
+	def invalidate_all():
+		""" Invalidate every queue. """
+		cache.delete(FeedbackRequestQueueCache.GLOBAL_GENERATION_KEY)
+		if connection.in_atomic_block:
+			transaction.on_commit(lambda: cache.delete(FeedbackRequestQueueCache.GLOBAL_GENERATION_KEY))
+
+	@staticmethod
+	def get_stats() -> dict:
+		""" Hit and miss counts since the counters were last reset. Counts of other processes are only included once
+			they have been flushed.
+		"""
+		FeedbackRequestQueueCache.flush_stats()
+		counts = cache.get_many([FeedbackRequestQueueCache.HITS_KEY, FeedbackRequestQueueCache.MISSES_KEY])
+		return {
+			'hits': counts.get(FeedbackRequestQueueCache.HITS_KEY, 0),
+			'misses': counts.get(FeedbackRequestQueueCache.MISSES_KEY, 0),
+		}
+
+	@staticmethod
+	def reset_stats():
+		with FeedbackRequestQueueCache._stats_lock:
+			FeedbackRequestQueueCache._unflushed_stats = dict.fromkeys(FeedbackRequestQueueCache._unflushed_stats, 0)
+		cache.delete_many([FeedbackRequestQueueCache.HITS_KEY, FeedbackRequestQueueCache.MISSES_KEY])
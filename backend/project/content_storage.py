@@ -0,0 +1,250 @@
+""" Optional delta-compressed storage of essay content.
+
+	With settings.ESSAY_CONTENT_STORAGE = 'delta', a revision (an Essay with `revision_of`) is stored as a compressed
+	line diff against the content of the essay it revises, with its `content` column left null. Every
+	settings.ESSAY_CONTENT_KEYFRAME_INTERVAL revisions along a chain, and whenever the diff would not be smaller, the
+	full text is stored instead, as a keyframe, so reading a revision applies at most that many diffs.
+
+	RevisionContentField reconstructs the text when `Essay.content` is read, so readers of the attribute never see how
+	it is stored. Reconstructed text is cached per essay. `.values()` and raw SQL see the stored columns, so code that
+	reads content that way must use instances while delta storage is enabled. Existing essays are converted in either
+	direction with the `convert_essay_content` management command.
+"""
+
+import difflib
+import json
+import zlib
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models.base import DEFERRED
+from django.db.models.query_utils import DeferredAttribute
+
+from project.routing import is_reading_from_replica
+
+FULL = 'full'
+DELTA = 'delta'
+STORAGE_MODES = (FULL, DELTA)
+# The columns RevisionContentField stores content in
+STORAGE_FIELDS = ('content', 'content_delta', 'content_keyframe_distance')
+# Where instances keep the `revision_of_id` their stored delta is against
+STORED_PARENT_ATTNAME = '_stored_revision_of_id'
+
+
+def encode_delta(base: str, content: str) -> bytes:
+	""" A compressed diff that turns `base` into `content`, by line. Lines are the paragraphs of most essays. """
+	base_lines = base.splitlines(keepends=True)
+	lines = content.splitlines(keepends=True)
+	operations: List[Union[str, Tuple[int, int]]] = []
+	matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+	for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+		if tag == 'equal':
+			operations.append((i1, i2))
+		elif j1 != j2:
+			operations.append(''.join(lines[j1:j2]))
+	return zlib.compress(json.dumps(operations, separators=(',', ':')).encode(), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+	""" Apply a diff from encode_delta to `base`. """
+	base_lines = base.splitlines(keepends=True)
+	pieces = []
+	for operation in json.loads(zlib.decompress(bytes(delta))):
+		pieces.append(operation if isinstance(operation, str) else ''.join(base_lines[operation[0]:operation[1]]))
+	return ''.join(pieces)
+
+
+def encode_content(content: str, parent_content: Optional[str], parent_distance: int,
+					storage: str) -> Tuple[Optional[str], Optional[bytes], int]:
+	""" How to store `content`, given the content of the essay it revises (None if it is not a revision) and that
+		essay's distance from a keyframe. Returns the values of the STORAGE_FIELDS.
+	"""
+	if storage != DELTA or parent_content is None:
+		return content, None, 0
+	distance = parent_distance + 1
+	if distance >= settings.ESSAY_CONTENT_KEYFRAME_INTERVAL:
+		return content, None, 0
+	delta = encode_delta(parent_content, content)
+	if len(delta) >= len(content.encode()):
+		return content, None, 0
+	return None, delta, distance
+
+
+class EssayContentStore:
+	""" Encodes, reconstructs and converts the stored content of Essays. See the module docstring. """
+
+	PREFIX = 'essay-content'
+	TIMEOUT = 60 * 60
+
+	@staticmethod
+	def get_cache_key(essay_id: int) -> str:
+		return f'{EssayContentStore.PREFIX}:{essay_id}'
+
+	@staticmethod
+	def encode(essay: models.Model, content: str) -> Optional[str]:
+		""" Set the essay's delta columns for storing `content` with the configured storage, and return the value to
+			store in its content column. The column is only null for deltas, so `content` may not be None.
+		"""
+		if content is None:
+			raise ValidationError(f'Essay {essay.pk} has no content.')
+		parent_content, parent_distance = None, 0
+		if settings.ESSAY_CONTENT_STORAGE == DELTA and essay.revision_of_id is not None:
+			try:
+				parent = essay.revision_of
+			except ObjectDoesNotExist:
+				# The parent is not saved yet, as in bulk inserts that insert whole chains at once
+				pass
+			else:
+				parent_content, parent_distance = parent.content, parent.content_keyframe_distance
+		stored, essay.content_delta, essay.content_keyframe_distance = encode_content(
+			content, parent_content, parent_distance, settings.ESSAY_CONTENT_STORAGE
+		)
+		return stored
+
+	@staticmethod
+	def reconstruct(essay: models.Model) -> str:
+		""" The content of an essay stored as a delta, from the cache or by applying its delta to its parent's. The
+			parent is the one the delta was stored against, even if `revision_of` has changed since the essay was loaded.
+		"""
+		key = EssayContentStore.get_cache_key(essay.pk)
+		content = cache.get(key)
+		if content is not None:
+			return content
+		deferred = essay.get_deferred_fields() & {'content_delta', 'revision_of_id'}
+		if deferred:
+			essay.refresh_from_db(fields=list(deferred))
+		parent_id = essay.__dict__.get(STORED_PARENT_ATTNAME, DEFERRED)
+		if parent_id is DEFERRED:
+			if 'revision_of_id' in deferred:
+				parent_id = essay.revision_of_id
+			else:
+				# Loaded without `revision_of`, which has been assigned since
+				parent_id = type(essay)._default_manager.values_list('revision_of', flat=True).get(pk=essay.pk)
+			essay.__dict__[STORED_PARENT_ATTNAME] = parent_id
+		if essay.content_delta is None or parent_id is None:
+			raise ValueError(f'Essay {essay.pk} has neither content nor a delta to reconstruct it from.')
+		parent = type(essay)._default_manager.only(*STORAGE_FIELDS, 'revision_of').get(pk=parent_id)
+		content = apply_delta(parent.content, essay.content_delta)
+		# Reads from a lagging replica could cache content the essay no longer has. See project.routing.
+		if not is_reading_from_replica():
+			cache.set(key, content, EssayContentStore.TIMEOUT)
+		return content
+
+	@staticmethod
+	def invalidate(essay_ids: Iterable[int]):
+		cache.delete_many([EssayContentStore.get_cache_key(essay_id) for essay_id in essay_ids])
+
+	@staticmethod
+	def materialize(queryset: models.QuerySet) -> int:
+		""" Store the content of the essays in queryset in full, as keyframes, without changing it. Used before the
+			essays they are diffs against change or are deleted. Returns the number of essays changed.
+		"""
+		count = 0
+		for essay in queryset.filter(content__isnull=True).only(*STORAGE_FIELDS, 'revision_of'):
+			queryset.model._default_manager.filter(pk=essay.pk).update(
+				content=essay.content, content_delta=None, content_keyframe_distance=0
+			)
+			count += 1
+		return count
+
+	@staticmethod
+	def convert(model, storage: str, batch_size: int = 500, on_batch=None) -> int:
+		""" Store the content of every essay with `storage`, without changing it. Chains are converted from their
+			root down, a batch of roots at a time, so that each revision is encoded against its parent's final
+			storage. `on_batch`, if given, is called with the running number of essays converted after each batch.
+			Returns the number of essays whose storage changed.
+		"""
+		if storage not in STORAGE_MODES:
+			raise ValueError(f'Unknown essay content storage: {storage}')
+		manager = model._default_manager
+		root_ids = list(manager.filter(revision_of__isnull=True).order_by('pk').values_list('pk', flat=True))
+		count = 0
+		for start in range(0, len(root_ids), batch_size):
+			with transaction.atomic():
+				# The content and keyframe distance of the last generation converted, by id. Roots are keyframes.
+				parents: Dict[int, Tuple[str, int]] = {
+					pk: (content, 0)
+					for pk, content in manager.filter(pk__in=root_ids[start:start + batch_size]
+														).values_list('pk', 'content')
+				}
+				while parents:
+					children = {}
+					rows = manager.filter(revision_of__in=list(parents)
+											).values_list('pk', 'revision_of', *STORAGE_FIELDS)
+					for pk, parent_id, *current in rows:
+						parent_content, parent_distance = parents[parent_id]
+						content, delta, _ = current
+						if delta is not None:
+							current[1] = bytes(delta)
+							content = apply_delta(parent_content, delta)
+						stored = encode_content(content, parent_content, parent_distance, storage)
+						if list(stored) != current:
+							manager.filter(pk=pk).update(**dict(zip(STORAGE_FIELDS, stored)))
+							count += 1
+						children[pk] = (content, stored[2])
+					parents = children
+			if on_batch is not None:
+				on_batch(count)
+		return count
+
+
+class RevisionContentDescriptor(DeferredAttribute):
+	""" Reads the content of an essay stored as a delta by reconstructing it, and keeps it on the instance. """
+
+	def __get__(self, instance, cls=None):
+		if instance is None:
+			return self
+		value = super().__get__(instance, cls)
+		if value is None:
+			value = instance.__dict__[self.field.attname] = EssayContentStore.reconstruct(instance)
+		return value
+
+	def __set__(self, instance, value):
+		# Defining __set__ makes this a data descriptor, so __get__ is called even when the instance has a value
+		instance.__dict__[self.field.attname] = value
+
+
+class RevisionContentField(models.TextField):
+	""" A text field stored in full or as a delta against the same field of the `revision_of` instance. The model
+		also needs the other STORAGE_FIELDS, declared after this one, since saving this field sets them.
+	"""
+
+	descriptor_class = RevisionContentDescriptor
+
+	def __init__(self, *args, **kwargs):
+		kwargs['null'] = True
+		super().__init__(*args, **kwargs)
+
+	def deconstruct(self):
+		name, path, args, kwargs = super().deconstruct()
+		del kwargs['null']
+		return name, path, args, kwargs
+
+	def contribute_to_class(self, cls, name, **kwargs):
+		super().contribute_to_class(cls, name, **kwargs)
+		if not cls._meta.abstract:
+			models.signals.post_init.connect(self.record_stored_parent, sender=cls)
+
+	@staticmethod
+	def record_stored_parent(instance, **kwargs):
+		""" Remember the parent the instance was loaded with, which a stored delta is against, so that the content
+			can still be reconstructed after `revision_of` is reassigned.
+		"""
+		instance.__dict__[STORED_PARENT_ATTNAME] = instance.__dict__.get('revision_of_id', DEFERRED)
+
+	@property
+	def readable_from_values(self) -> bool:
+		""" Whether `.values()` rows hold the content. See project.fast_serializers. """
+		return settings.ESSAY_CONTENT_STORAGE != DELTA
+
+	def pre_save(self, model_instance, add):
+		# Reading the attribute of a new instance without content would try to reconstruct it
+		if model_instance.__dict__.get(self.attname) is None and (add or model_instance._state.adding):
+			raise ValidationError(f'{type(model_instance).__name__} {self.name} may not be None.')
+		stored = EssayContentStore.encode(model_instance, super().pre_save(model_instance, add))
+		model_instance.__dict__[STORED_PARENT_ATTNAME] = model_instance.revision_of_id
+		return stored
@@ -0,0 +1,54 @@
+""" SQLite tuning, applied to every new database connection.
+
+	settings.SQLITE_PROFILE names one of SQLITE_PROFILES, and settings.SQLITE_PRAGMAS overrides any of its pragmas, so
+	each environment can pick a profile and adjust it (both can be set from the environment; see prompt/settings.py).
+	Profiles set every pragma they care about, since some, like journal_mode, are stored in the database file and would
+	otherwise carry over from the last profile used.
+
+	`production` uses write-ahead logging, so readers and the writer do not block each other, and commits do not wait for
+	the disk, only checkpoints do. Pair it with a CONN_MAX_AGE, so these pragmas and the page cache are kept across
+	requests rather than set up for each one.
+"""
+
+from typing import Dict
+
+from django.conf import settings
+
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+	# SQLite's defaults, as Django uses it
+	'baseline': {
+		'journal_mode': 'DELETE',
+		'synchronous': 'FULL',
+		'cache_size': -2000,
+		'mmap_size': 0,
+		'busy_timeout': 5000,
+		'temp_store': 'DEFAULT',
+	},
+	'production': {
+		'journal_mode': 'WAL',
+		# Durable as of the last checkpoint rather than the last commit, which is safe with WAL
+		'synchronous': 'NORMAL',
+		# Negative sizes are in KiB: 64 MiB of page cache per connection
+		'cache_size': -64000,
+		'mmap_size': 256 * 2 ** 20,
+		# Wait up to 5s for the write lock rather than failing with `database is locked`
+		'busy_timeout': 5000,
+		'temp_store': 'MEMORY',
+	},
+}
+
+
+def get_sqlite_pragmas() -> Dict[str, object]:
+	""" The pragmas of the configured profile, with the configured overrides. """
+	if settings.SQLITE_PROFILE not in SQLITE_PROFILES:
+		raise ValueError(f'Unknown SQLite profile: {settings.SQLITE_PROFILE}')
+	return {**SQLITE_PROFILES[settings.SQLITE_PROFILE], **settings.SQLITE_PRAGMAS}
+
+
+def configure_connection(connection):
+	""" Apply the configured pragmas to a new connection, if it is to SQLite. """
+	if connection.vendor != 'sqlite':
+		return
+	with connection.cursor() as cursor:
+		for name, value in get_sqlite_pragmas().items():
+			cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,92 @@
+""" Line diffs between an essay and its ancestors, computed once and cached. """
+
+import difflib
+
+from typing import Dict, Iterable, List
+
+from django.core.cache import cache
+
+from project.content_storage import STORAGE_FIELDS
+from project.models import Essay
+
+
+def diff_content(old: str, new: str) -> List[dict]:
+	""" A compact diff from `old` to `new`, by line, for clients that already have `new`.
+
+		Each operation covers the next lines of `new`, or the lines of `old` removed at that point:
+			{"op": "equal", "lines": <int>}: lines that are in both.
+			{"op": "insert", "lines": <int>}: lines only in `new`.
+			{"op": "delete", "text": <str>}: the text of lines only in `old`, which `new` does not have.
+		Lines include their line endings, so joining `new`'s lines and the deleted text in order gives back `old`
+		when the inserted lines are skipped.
+	"""
+	old_lines = old.splitlines(keepends=True)
+	new_lines = new.splitlines(keepends=True)
+	operations = []
+	matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+	for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+		if tag == 'equal':
+			operations.append({'op': 'equal', 'lines': j2 - j1})
+			continue
+		if i1 != i2:
+			operations.append({'op': 'delete', 'text': ''.join(old_lines[i1:i2])})
+		if j1 != j2:
+			operations.append({'op': 'insert', 'lines': j2 - j1})
+	return operations
+
+
+class EssayDiffCache:
+	""" Caches diffs from ancestors of an Essay to the Essay. Entries are keyed by both essays and when each was last
+		modified, so editing either one makes a new entry rather than needing an invalidation.
+	"""
+
+	PREFIX = 'essay-diff'
+	TIMEOUT = 24 * 60 * 60
+
+	@staticmethod
+	def get_key(essay: Essay, ancestor: Essay) -> str:
+		return (
+			f'{EssayDiffCache.PREFIX}:{essay.pk}:{essay.modified.timestamp()}:{ancestor.pk}:'
+			f'{ancestor.modified.timestamp()}'
+		)
+
+	@staticmethod
+	def get_diffs(essay: Essay, ancestors: Iterable[Essay]) -> Dict[int, List[dict]]:
+		""" Get the diffs from each of the specified ancestors to the Essay, keyed by ancestor id. Only `modified` has
+			to be loaded on the ancestors. The content of ancestors missing from the cache is loaded in one query.
+		"""
+		return EssayDiffCache.get_many_diffs({essay: ancestors}).get(essay.pk, {})
+
+	@staticmethod
+	def get_many_diffs(ancestors_by_essay: Dict[Essay, Iterable[Essay]]) -> Dict[int, Dict[int, List[dict]]]:
+		""" Get the diffs from ancestors to each of many Essays, keyed by essay id and then ancestor id, as get_diffs
+			does for one Essay. The cache is read in one call, and the content of missing ancestors in one query.
+		"""
+		keys = {
+			EssayDiffCache.get_key(essay, ancestor): (essay, ancestor.pk)
+			for essay, ancestors in ancestors_by_essay.items()
+			for ancestor in ancestors
+		}
+		if not keys:
+			return {}
+		diffs: Dict[int, Dict[int, List[dict]]] = {}
+		for key, diff in cache.get_many(list(keys)).items():
+			essay, ancestor_id = keys[key]
+			diffs.setdefault(essay.pk, {})[ancestor_id] = diff
+
+		missing = [
+			(essay, ancestor_id) for essay, ancestor_id in keys.values() if ancestor_id not in diffs.get(essay.pk, {})
+		]
+		if missing:
+			ancestors = Essay.objects.only(*STORAGE_FIELDS, 'revision_of', 'modified').in_bulk(
+				{ancestor_id for _, ancestor_id in missing}
+			)
+			computed = {}
+			for essay, ancestor_id in missing:
+				ancestor = ancestors.get(ancestor_id)
+				if ancestor is None:
+					continue
+				diff = diffs.setdefault(essay.pk, {})[ancestor_id] = diff_content(ancestor.content, essay.content)
+				computed[EssayDiffCache.get_key(essay, ancestor)] = diff
+			cache.set_many(computed, EssayDiffCache.TIMEOUT)
+		return diffs
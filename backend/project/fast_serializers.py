@@ -0,0 +1,169 @@
+""" A fast, read-only path for DRF serializers.
+
+	CompiledSerializer turns a configured DRF serializer (after sparse fieldsets have been applied) into a flat list of
+	per-field accessors, once per request, and then serializes each object by calling them. This skips the per-field
+	`get_attribute` machinery and the per-object generator and exception handling of `Serializer.to_representation`.
+	When every field is a plain model field, querysets are read with `.values()`, which also skips building model
+	instances. The output is identical to the DRF serializer's.
+"""
+
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Callable, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from project.timing import timed
+
+
+def _identity(value):
+	return value
+
+
+class CompiledSerializer:
+	""" Serializes objects, or `.values()` rows, with the fields of a DRF serializer.
+
+		Fields on the model (including foreign keys as primary keys and nested serializers of related models) get
+		direct accessors. Any other field falls back to its own `get_attribute` and `to_representation`, and prevents
+		`.values()` from being used.
+	"""
+
+	def __init__(self, serializer: serializers.Serializer, prefix: str = ''):
+		self.serializer = serializer
+		self.model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+		# (field name, accessor, to_representation, `.values()` lookup or None, nested CompiledSerializer or None)
+		self.fields: List[Tuple[str, Callable, Callable, Optional[str], Optional['CompiledSerializer']]] = []
+		for field in serializer.fields.values():
+			if not field.write_only:
+				self.fields.append(self.compile_field(field, prefix))
+
+	@property
+	def supports_values(self) -> bool:
+		""" Whether every field can be read from a `.values()` row. """
+		return all(
+			lookup is not None and (nested is None or nested.supports_values) for _, _, _, lookup, nested in self.fields
+		)
+
+	def get_model_field(self, name: str) -> Optional[models.Field]:
+		""" The concrete model field named by a serializer field's source, if there is one. """
+		if self.model is None:
+			return None
+		if name == 'pk':
+			return self.model._meta.pk
+		try:
+			model_field = self.model._meta.get_field(name)
+		except FieldDoesNotExist:
+			return None
+		return model_field if model_field.concrete and not model_field.many_to_many else None
+
+	def compile_field(self, field: serializers.Field, prefix: str):
+		source = field.source
+		model_field = self.get_model_field(source) if len(field.source_attrs) == 1 else None
+		# Fields like RevisionContentField may only be readable from instances
+		if model_field is None or not getattr(model_field, 'readable_from_values', True):
+			return field.field_name, self.get_fallback_accessor(field), _identity, None, None
+
+		lookup = f'{prefix}{source}'
+		if isinstance(field, serializers.Serializer) and model_field.is_relation:
+			nested = CompiledSerializer(field, f'{lookup}__')
+			return field.field_name, attrgetter(source), nested.to_representation, f'{lookup}__pk', nested
+		if isinstance(field, serializers.BaseSerializer):
+			return field.field_name, self.get_fallback_accessor(field), _identity, None, None
+		if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+			return field.field_name, attrgetter(model_field.attname), _identity, lookup, None
+		# The exact types whose to_representation is a plain conversion
+		to_representation = {
+			serializers.IntegerField: int,
+			serializers.CharField: str,
+			serializers.ReadOnlyField: _identity,
+		}.get(type(field), field.to_representation)
+		return field.field_name, attrgetter(source), to_representation, lookup, None
+
+	@staticmethod
+	def get_fallback_accessor(field: serializers.Field) -> Callable:
+		""" Read a field the way Serializer.to_representation does. """
+
+		def get(instance):
+			try:
+				attribute = field.get_attribute(instance)
+			except serializers.SkipField:
+				return serializers.SkipField
+			check_for_none = attribute.pk if isinstance(attribute, serializers.PKOnlyObject) else attribute
+			return None if check_for_none is None else field.to_representation(attribute)
+
+		return get
+
+	def to_representation(self, instance) -> OrderedDict:
+		ret = OrderedDict()
+		for name, get, to_representation, _, _ in self.fields:
+			value = get(instance)
+			if value is serializers.SkipField:
+				continue
+			ret[name] = None if value is None else to_representation(value)
+		return ret
+
+	def row_to_representation(self, row: dict) -> OrderedDict:
+		ret = OrderedDict()
+		for name, _, to_representation, lookup, nested in self.fields:
+			value = row[lookup]
+			if nested is not None:
+				ret[name] = None if value is None else nested.row_to_representation(row)
+			else:
+				ret[name] = None if value is None else to_representation(value)
+		return ret
+
+	def get_value_lookups(self) -> List[str]:
+		""" The `.values()` lookups for every field, including the pk lookup of each nested serializer. """
+		lookups = []
+		for _, _, _, lookup, nested in self.fields:
+			lookups.append(lookup)
+			if nested is not None:
+				lookups += nested.get_value_lookups()
+		return lookups
+
+	@property
+	def data(self):
+		""" Mirror `Serializer.data` for a single instance. """
+		with timed('serialize'):
+			return ReturnDict(self.to_representation(self.serializer.instance), serializer=self.serializer)
+
+
+class CompiledListSerializer:
+	""" Mirror `ListSerializer.data` with a CompiledSerializer for the child.
+
+		If the list serializer has a `prepare(data)` method, it is called first, to load anything shared by all the
+		items, and what it returns is serialized.
+	"""
+
+	def __init__(self, serializer: serializers.ListSerializer):
+		self.serializer = serializer
+		self.child = CompiledSerializer(serializer.child)
+
+	@property
+	def data(self):
+		with timed('serialize'):
+			data = self.serializer.instance
+			prepare = getattr(self.serializer, 'prepare', None)
+			if prepare is not None:
+				data = prepare(data)
+			if isinstance(data, models.Manager):
+				data = data.all()
+			if isinstance(data, models.QuerySet) and self.child.supports_values:
+				rows = data.values(*self.child.get_value_lookups())
+				items = [self.child.row_to_representation(row) for row in rows]
+			else:
+				items = [self.child.to_representation(item) for item in data]
+			return ReturnList(items, serializer=self.serializer)
+
+
+def compile_serializer(serializer: serializers.BaseSerializer):
+	""" Wrap a DRF serializer that was constructed to serialize an instance or a list of them in its compiled
+		equivalent.
+	"""
+	if isinstance(serializer, serializers.ListSerializer):
+		return CompiledListSerializer(serializer)
+	return CompiledSerializer(serializer)
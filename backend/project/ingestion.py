@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import time
+
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from project.caching import FeedbackRequestQueueCache
+from project.models import Essay, FeedbackRequest, User
+from project.search import SearchIndex
+
+FeedbackRequestAssignment = FeedbackRequest.assigned_editors.through
+
+JSONL = 'jsonl'
+CSV = 'csv'
+FORMATS = (JSONL, CSV)
+
+
+class IngestionError(Exception):
+	""" Error raised when a record cannot be imported. Rows before the failing batch have been committed. """
+
+	def __init__(self, message: str, rows_committed: int):
+		super().__init__(message)
+		self.rows_committed = rows_committed
+
+
+@dataclass
+class IngestionResult:
+	""" Counts and timing for an ingestion run. `rows` includes the `start` rows skipped when resuming. """
+
+	start: int = 0
+	rows: int = 0
+	essays: int = 0
+	feedback_requests: int = 0
+	assignments: int = 0
+	elapsed: float = 0.0
+
+	@property
+	def rows_per_second(self) -> float:
+		return (self.rows - self.start) / self.elapsed if self.elapsed else 0.0
+
+
+def read_records(lines: Iterable[str], record_format: str = JSONL) -> Iterator[dict]:
+	""" Parse records from lines of JSONL or CSV.
+
+		Each record has an `id` (the essay's external id), `name` and `content`, and optionally `revision_of` (the
+		external id of an essay in this or an earlier import), `uploaded_by` (a username), `deadline` (an ISO 8601
+		datetime; a FeedbackRequest is created if given) and `assigned_editors` (usernames, semicolon separated in CSV).
+	"""
+	if record_format == CSV:
+		for record in csv.DictReader(lines):
+			editors = record.get('assigned_editors') or ''
+			record['assigned_editors'] = [username for username in editors.split(';') if username]
+			yield record
+	else:
+		for line in lines:
+			if line.strip():
+				yield json.loads(line)
+
+
+class EssayIngester:
+	""" Bulk imports Essays, FeedbackRequests and assignments from a stream of records.
+
+		Records are read and written `batch_size` at a time, each batch in its own transaction, so memory use does not
+		grow with the size of the input. `revision_of` may refer to an essay earlier in the same batch: essays are
+		inserted in generations, parents first, and their ids are looked up by external id after each generation.
+
+		Records whose external id has already been imported are skipped, so a failed import can be re-run safely. With
+		a checkpoint file, the number of committed rows is saved after every batch and the next run resumes after them.
+	"""
+
+	def __init__(self, uploaded_by: User, batch_size: int = 1000, checkpoint_path: Optional[str] = None):
+		self.uploaded_by = uploaded_by
+		self.batch_size = batch_size
+		self.checkpoint_path = checkpoint_path
+		self.user_ids: Dict[str, int] = {}
+
+	def read_checkpoint(self) -> int:
+		""" Get the number of rows committed by a previous run, according to the checkpoint file. """
+		if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+			return 0
+		with open(self.checkpoint_path) as f:
+			return json.load(f)['rows']
+
+	def write_checkpoint(self, rows: int):
+		if not self.checkpoint_path:
+			return
+		temporary_path = f'{self.checkpoint_path}.tmp'
+		with open(temporary_path, 'w') as f:
+			json.dump({'rows': rows}, f)
+		os.replace(temporary_path, self.checkpoint_path)
+
+	def ingest(self, records: Iterable[dict], start: int = 0, on_batch=None) -> IngestionResult:
+		""" Import the records, skipping the first `start` of them. `on_batch`, if given, is called with the running
+			IngestionResult after each committed batch.
+		"""
+		result = IngestionResult(start=start, rows=start)
+		records = islice(iter(records), start, None)
+		started = time.perf_counter()
+		while True:
+			try:
+				batch = list(islice(records, self.batch_size))
+				if not batch:
+					break
+				with transaction.atomic():
+					self.ingest_batch(batch, result)
+			except (IntegrityError, ValidationError, KeyError, ValueError, TypeError, csv.Error) as e:
+				raise IngestionError(f'Could not import the batch starting at row {result.rows}: {e!r}', result.rows)
+			result.rows += len(batch)
+			result.elapsed = time.perf_counter() - started
+			self.write_checkpoint(result.rows)
+			if on_batch:
+				on_batch(result)
+		result.elapsed = time.perf_counter() - started
+		return result
+
+	def get_user_ids(self, usernames: Iterable[str]) -> Dict[str, int]:
+		""" Look up users by username, caching them across batches. Unknown usernames are an error. """
+		missing = set(usernames) - set(self.user_ids)
+		if missing:
+			self.user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+			unknown = missing - set(self.user_ids)
+			if unknown:
+				raise ValueError(f'Unknown usernames: {", ".join(sorted(unknown))}')
+		return self.user_ids
+
+	def ingest_batch(self, batch: List[dict], result: IngestionResult):
+		for record in batch:
+			record['id'] = str(record['id'])
+			record['revision_of'] = str(record['revision_of']) if record.get('revision_of') else None
+		referenced_ids = {record['id'] for record in batch} | {record['revision_of'] for record in batch}
+		referenced_ids.discard(None)
+		essay_ids = dict(Essay.objects.filter(external_id__in=referenced_ids).values_list('external_id', 'pk'))
+		user_ids = self.get_user_ids(
+			{
+				username
+				for record in batch
+				for username in [record.get('uploaded_by'), *record.get('assigned_editors', [])]
+				if username
+			}
+		)
+
+		# Insert essays a generation at a time, so that each generation's parents have ids
+		new_records = [record for record in batch if record['id'] not in essay_ids]
+		pending = new_records
+		while pending:
+			ready = [record for record in pending if not record['revision_of'] or record['revision_of'] in essay_ids]
+			if not ready:
+				unknown = ', '.join(record['revision_of'] for record in pending)
+				raise ValueError(f'revision_of does not match an imported essay: {unknown}')
+			Essay.objects.bulk_create(
+				[
+					Essay(
+						external_id=record['id'],
+						name=record['name'],
+						content=record['content'],
+						uploaded_by_id=user_ids[record['uploaded_by']]
+						if record.get('uploaded_by') else self.uploaded_by.pk,
+						revision_of_id=essay_ids[record['revision_of']] if record['revision_of'] else None,
+					) for record in ready
+				]
+			)
+			ready_ids = [record['id'] for record in ready]
+			essay_ids.update(Essay.objects.filter(external_id__in=ready_ids).values_list('external_id', 'pk'))
+			pending = [record for record in pending if record['id'] not in essay_ids]
+		result.essays += len(new_records)
+		# As does bulk_create for the search index
+		SearchIndex.index_essay_ids(essay_ids[record['id']] for record in new_records)
+
+		# Feedback requests and their assignments, for new essays with a deadline
+		requested = [record for record in new_records if record.get('deadline')]
+		FeedbackRequest.objects.bulk_create(
+			[
+				FeedbackRequest(essay_id=essay_ids[record['id']], deadline=self.parse_deadline(record['deadline']))
+				for record in requested
+			]
+		)
+		requested_essay_ids = [essay_ids[record['id']] for record in requested]
+		feedback_request_ids = dict(
+			FeedbackRequest.objects.filter(essay_id__in=requested_essay_ids).values_list('essay_id', 'pk')
+		)
+		assignments = [
+			FeedbackRequestAssignment(
+				feedbackrequest_id=feedback_request_ids[essay_ids[record['id']]], user_id=user_ids[username]
+			) for record in requested for username in record.get('assigned_editors', [])
+		]
+		FeedbackRequestAssignment.objects.bulk_create(assignments, ignore_conflicts=True)
+		# bulk_create bypasses the signals that invalidate the queue cache
+		FeedbackRequestQueueCache.invalidate_users(assignment.user_id for assignment in assignments)
+		result.feedback_requests += len(requested)
+		result.assignments += len(assignments)
+
+	@staticmethod
+	def parse_deadline(value: str):
+		deadline = parse_datetime(value)
+		if deadline is None:
+			raise ValueError(f'Invalid deadline: {value!r}')
+		return timezone.make_aware(deadline) if timezone.is_naive(deadline) else deadline
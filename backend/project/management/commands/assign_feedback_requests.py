@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from project.assignment import FeedbackRequestAssigner
+from project.models import User
+
+
+class Command(BaseCommand):
+	help = 'Assign unassigned FeedbackRequests to editors, balancing open work across them.'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--editor',
+			action='append',
+			dest='editors',
+			help='Username of an editor to assign to. May be repeated. Defaults to all active staff users.'
+		)
+		parser.add_argument('--editors-per-request', type=int, default=1)
+		parser.add_argument(
+			'--max-open-per-editor',
+			type=int,
+			default=None,
+			help='Stop assigning to an editor once they have this many unfinished requests assigned.'
+		)
+		parser.add_argument('--batch-size', type=int, default=1000)
+
+	def handle(self, *args, **options):
+		editors = None
+		if options['editors']:
+			editors = User.objects.filter(username__in=options['editors'])
+		assigner = FeedbackRequestAssigner(
+			editors=editors,
+			editors_per_request=options['editors_per_request'],
+			max_open_per_editor=options['max_open_per_editor'],
+			batch_size=options['batch_size'],
+		)
+		start = time.perf_counter()
+		created = assigner.assign()
+		elapsed = time.perf_counter() - start
+		self.stdout.write(self.style.SUCCESS(f'Created {created} assignments in {elapsed:.2f}s.'))
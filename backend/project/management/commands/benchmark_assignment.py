@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from project.assignment import FeedbackRequestAssigner
+from project.benchmarking import benchmark_database, create_benchmark_users
+from project.models import Essay, FeedbackRequest, User
+
+
+class Command(BaseCommand):
+	help = 'Benchmark the FeedbackRequest assignment engine against a throwaway database.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--requests', type=int, default=100000)
+		parser.add_argument('--editors', type=int, default=500)
+		parser.add_argument('--editors-per-request', type=int, default=1)
+		parser.add_argument('--batch-size', type=int, default=1000)
+
+	def handle(self, *args, **options):
+		with benchmark_database():
+			editors = create_benchmark_users(options['editors'], is_staff=True)
+			now = timezone.now()
+			for start in range(0, options['requests'], options['batch_size']):
+				count = min(options['batch_size'], options['requests'] - start)
+				Essay.objects.bulk_create(
+					[Essay(name=f'Essay {start + i}', uploaded_by=editors[0], content='') for i in range(count)]
+				)
+			essay_ids = Essay.objects.values_list('pk', flat=True).iterator()
+			FeedbackRequest.objects.bulk_create(
+				(
+					FeedbackRequest(essay_id=essay_id, deadline=now + timezone.timedelta(minutes=i % 10000))
+					for i, essay_id in enumerate(essay_ids)
+				),
+				batch_size=options['batch_size']
+			)
+
+			assigner = FeedbackRequestAssigner(
+				editors_per_request=options['editors_per_request'], batch_size=options['batch_size']
+			)
+			start = time.perf_counter()
+			created = assigner.assign()
+			elapsed = time.perf_counter() - start
+
+			loads = User.objects.filter(is_staff=True).annotate(load=Count('assigned_feedback_requests'))
+			loads = list(loads.values_list('load', flat=True))
+			self.stdout.write(
+				f'Assigned {options["requests"]} requests ({created} assignments) to {len(editors)} editors in'
+				f' {elapsed:.2f}s ({options["requests"] / elapsed:.0f} requests/sec). Load per editor:'
+				f' min {min(loads)}, max {max(loads)}.'
+			)
@@ -0,0 +1,172 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from project.benchmarking import benchmark_database, create_benchmark_users
+from project.models import Essay, FeedbackRequest, FeedbackResponse
+
+# How each path is served: the sync views in threads, as a threaded WSGI server does, and the sync and async views
+# under Django's async request handling, as an ASGI server does
+PATHS = ('wsgi', 'asgi-sync', 'asgi-async')
+ENDPOINTS = ('queue', 'response-list', 'response-detail', 'autosave')
+
+
+class Command(BaseCommand):
+	help = (
+		'Compare the throughput of concurrent requests to the endpoints with async versions (see project.async_views)'
+		' when served by WSGI and ASGI, against a throwaway database.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--editors', type=int, default=16, help='Number of editors making requests concurrently.')
+		parser.add_argument('--requests', type=int, default=50, help='Number of requests per editor and endpoint.')
+		parser.add_argument('--feedback-requests', type=int, default=40, help='Size of each editor\'s queue.')
+		parser.add_argument(
+			'--query-latency',
+			type=float,
+			default=0,
+			help='Milliseconds to wait before each query, to stand in for the round trip to a database server.'
+		)
+
+	def handle(self, *args, **options):
+		if connection.vendor != 'sqlite':
+			raise CommandError('The benchmark database needs the SQLite backend.')
+		with benchmark_database():
+			editors, feedback_responses = self.create_data(options['editors'], options['feedback_requests'])
+			latency = options['query_latency'] / 1000
+
+			def delay(execute, sql, params, many, context):
+				time.sleep(latency)
+				return execute(sql, params, many, context)
+
+			def add_latency(sender, connection, **kwargs):
+				connection.execute_wrappers.append(delay)
+
+			if latency:
+				connection_created.connect(add_latency)
+				connection.execute_wrappers.append(delay)
+			try:
+				self.stdout.write(f'{"endpoint":<17}{"path":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}')
+				for endpoint in ENDPOINTS:
+					for path in PATHS:
+						durations, elapsed = self.run(path, endpoint, editors, feedback_responses, options['requests'])
+						durations.sort()
+						self.stdout.write(
+							f'{endpoint:<17}{path:<12}{len(durations) / elapsed:>9.1f}'
+							f'{statistics.median(durations) * 1000:>9.1f}'
+							f'{durations[int(len(durations) * 0.95)] * 1000:>9.1f}'
+						)
+			finally:
+				connection_created.disconnect(add_latency)
+
+	@staticmethod
+	def create_data(num_editors: int, num_feedback_requests: int):
+		""" Editors assigned to every FeedbackRequest, each with an unfinished FeedbackResponse. """
+		editors = create_benchmark_users(num_editors)
+		Essay.objects.bulk_create(
+			[
+				Essay(name=f'Essay {i}', uploaded_by=editors[0], content='Lorem ipsum.\n' * 200)
+				for i in range(num_feedback_requests + num_editors)
+			]
+		)
+		FeedbackRequest.objects.bulk_create(
+			[FeedbackRequest(essay=essay, deadline=timezone.now()) for essay in Essay.objects.all()]
+		)
+		FeedbackRequest.assigned_editors.through.objects.bulk_create(
+			[
+				FeedbackRequest.assigned_editors.through(feedbackrequest_id=feedback_request_id, user_id=editor.pk)
+				for feedback_request_id in FeedbackRequest.objects.values_list('pk', flat=True)
+				for editor in editors
+			]
+		)
+		feedback_responses = []
+		for editor, feedback_request in zip(editors, FeedbackRequest.objects.order_by('-pk')):
+			feedback_responses.append(
+				FeedbackResponse.objects.create(editor=editor, feedback_request=feedback_request)
+			)
+		return editors, feedback_responses
+
+	@staticmethod
+	def get_requests(path: str, endpoint: str, feedback_response: FeedbackResponse, count: int):
+		""" The (method, url, kwargs) of each request an editor makes. """
+		prefix = 'async-' if path == 'asgi-async' else ''
+		if endpoint == 'queue':
+			return [('get', reverse(f'{prefix}feedback-request-list'), {})] * count
+		if endpoint == 'response-list':
+			return [('get', reverse(f'{prefix}feedback-response-list'), {})] * count
+		if endpoint == 'response-detail':
+			url = reverse(f'{prefix}feedback-response-detail', kwargs={'pk': feedback_response.pk})
+			return [('get', url, {})] * count
+		url = reverse(f'{prefix}feedback-response-delta', kwargs={'pk': feedback_response.pk})
+		feedback_response.refresh_from_db()
+		return [
+			(
+				'patch', url, {
+					'data': {
+						'version': feedback_response.version + i,
+						'operations': [{
+							'offset': 0,
+							'delete': 0,
+							'insert': 'a'
+						}]
+					},
+					'content_type': 'application/json',
+				}
+			) for i in range(count)
+		]
+
+	def run(self, path: str, endpoint: str, editors, feedback_responses, count: int):
+		""" Have every editor make `count` requests, one after another. Returns the duration of each request and the
+			total time, in seconds.
+		"""
+		client_class = Client if path == 'wsgi' else AsyncClient
+		sessions = []
+		for editor, feedback_response in zip(editors, feedback_responses):
+			client = client_class()
+			client.force_login(editor)
+			sessions.append((client, self.get_requests(path, endpoint, feedback_response, count)))
+		durations = []
+
+		def check(response):
+			if response.status_code != 200:
+				raise CommandError(f'{path} {endpoint}: {response.status_code} {response.content[:200]}')
+
+		if path == 'wsgi':
+
+			def work(client, requests):
+				try:
+					for method, url, kwargs in requests:
+						start = time.perf_counter()
+						check(getattr(client, method)(url, **kwargs))
+						durations.append(time.perf_counter() - start)
+				finally:
+					connection.close()
+
+			threads = [threading.Thread(target=work, args=session) for session in sessions]
+			start = time.perf_counter()
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+			return durations, time.perf_counter() - start
+
+		async def work(client, requests):
+			for method, url, kwargs in requests:
+				start = time.perf_counter()
+				check(await getattr(client, method)(url, **kwargs))
+				durations.append(time.perf_counter() - start)
+
+		async def main():
+			await asyncio.gather(*(work(*session) for session in sessions))
+
+		start = time.perf_counter()
+		asyncio.run(main())
+		return durations, time.perf_counter() - start
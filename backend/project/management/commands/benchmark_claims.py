@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from project.benchmarking import benchmark_database, create_benchmark_users
+from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+from project.utilities import EditorHasOpenFeedbackResponseError, EditorNotAssignedToFeedbackRequestError, FeedbackResponseExistsError, FeedbackResponseManager
+
+
+def claim_with_locks(user: User, feedback_request: FeedbackRequest):
+	""" The previous claim path, kept for comparison: lock the request and the editor, then check and insert. """
+	with transaction.atomic():
+		_ = FeedbackRequest.objects.filter(pk=feedback_request.pk).select_for_update()[0]
+		_ = User.objects.filter(pk=user.pk).select_for_update()[0]
+		if feedback_request.feedback_responses.exists():
+			raise FeedbackResponseExistsError()
+		elif user.feedback_responses.filter(finished=False).exists():
+			raise EditorHasOpenFeedbackResponseError()
+		elif not feedback_request.assigned_editors.filter(pk=user.pk).exists():
+			raise EditorNotAssignedToFeedbackRequestError()
+		return FeedbackResponse.objects.create(editor=user, feedback_request=feedback_request)
+
+
+STRATEGIES = {
+	'constraints': FeedbackResponseManager.create_for_feedback_request,
+	'locks': claim_with_locks,
+	# Let the server pick the request; see FeedbackResponseManager.claim_next_for_user
+	'claim_next': None,
+}
+
+
+class Command(BaseCommand):
+	help = 'Benchmark concurrent FeedbackResponse claims by many editors against a throwaway database.'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--editors', type=int, default=8, help='Number of editors, each claiming in its own thread.'
+		)
+		parser.add_argument('--requests', type=int, default=400, help='Number of FeedbackRequests to claim.')
+		parser.add_argument(
+			'--strategy',
+			choices=sorted(STRATEGIES) + ['all'],
+			default='all',
+			help='Claim implementation to benchmark. `locks` is the previous select_for_update implementation.'
+		)
+		parser.add_argument('--seed', type=int, default=0)
+
+	def handle(self, *args, **options):
+		strategies = sorted(STRATEGIES) if options['strategy'] == 'all' else [options['strategy']]
+		for strategy in strategies:
+			with benchmark_database():
+				self.run(strategy, options['editors'], options['requests'], options['seed'])
+
+	def run(self, strategy: str, num_editors: int, num_requests: int, seed: int):
+		editors = create_benchmark_users(num_editors)
+		Essay.objects.bulk_create(
+			[Essay(name=f'Essay {i}', uploaded_by=editors[0], content='') for i in range(num_requests)]
+		)
+		FeedbackRequest.objects.bulk_create(
+			[FeedbackRequest(essay=essay, deadline=timezone.now()) for essay in Essay.objects.all()]
+		)
+		feedback_request_ids = list(FeedbackRequest.objects.values_list('pk', flat=True))
+		FeedbackRequest.assigned_editors.through.objects.bulk_create(
+			[
+				FeedbackRequest.assigned_editors.through(feedbackrequest_id=feedback_request_id, user_id=editor.pk)
+				for feedback_request_id in feedback_request_ids
+				for editor in editors
+			]
+		)
+
+		claim = STRATEGIES[strategy]
+		results = {'claims': 0, 'collisions': 0, 'errors': 0}
+		lock = threading.Lock()
+
+		def work(editor: User, rng: random.Random):
+			candidates = list(feedback_request_ids)
+			rng.shuffle(candidates)
+			counts = {'claims': 0, 'collisions': 0, 'errors': 0}
+			try:
+				while claim is None:
+					try:
+						feedback_response = FeedbackResponseManager.claim_next_for_user(editor)
+					except DatabaseError:
+						counts['errors'] += 1
+						continue
+					if feedback_response is None:
+						break
+					counts['claims'] += 1
+					FeedbackResponseManager(feedback_response).finish()
+				while claim is not None and candidates:
+					feedback_request = FeedbackRequest(pk=candidates.pop())
+					try:
+						feedback_response = claim(editor, feedback_request)
+					except FeedbackResponseExistsError:
+						counts['collisions'] += 1
+						continue
+					except DatabaseError:
+						# e.g. lock timeouts, or unique violations that the previous implementation did not expect
+						counts['errors'] += 1
+						continue
+					counts['claims'] += 1
+					FeedbackResponseManager(feedback_response).finish()
+			finally:
+				connection.close()
+				with lock:
+					for key, value in counts.items():
+						results[key] += value
+
+		threads = [
+			threading.Thread(target=work, args=(editor, random.Random(seed + i))) for i, editor in enumerate(editors)
+		]
+		start = time.perf_counter()
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		elapsed = time.perf_counter() - start
+
+		# Every request must have been claimed exactly once
+		responses = FeedbackResponse.objects.count()
+		claimed = FeedbackResponse.objects.values('feedback_request').distinct().count()
+		correct = responses == claimed == results['claims'] == num_requests
+		self.stdout.write(
+			f'{strategy}: {results["claims"]} claims in {elapsed:.2f}s ({results["claims"] / elapsed:.1f} claims/sec),'
+			f' {results["collisions"]} collisions, {results["errors"]} errors, {responses} responses on'
+			f' {claimed}/{num_requests} requests: {"correct" if correct else "INCORRECT"}'
+		)
+		if not correct and strategy != 'locks':
+			raise CommandError('The current claim implementation did not claim every request exactly once.')
@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+from project.benchmarking import benchmark_database
+from project.content_storage import DELTA, FULL, EssayContentStore
+from project.models import Essay
+from project.seeding import ScaleSeeder
+
+
+class Command(BaseCommand):
+	help = (
+		'Compare the disk size and read latency of essay content stored in full and as deltas (see'
+		' project.content_storage) in a seeded throwaway SQLite database.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--essays', type=int, default=20000)
+		parser.add_argument('--mean-chain-length', type=float, default=6.0)
+		parser.add_argument('--content-sentences', type=int, default=20)
+		parser.add_argument('--reads', type=int, default=2000, help='Number of revisions to read in each pass.')
+		parser.add_argument('--seed', type=int, default=0)
+
+	def handle(self, *args, **options):
+		if connection.vendor != 'sqlite':
+			raise CommandError('The disk size comparison needs the SQLite backend.')
+		with benchmark_database():
+			ScaleSeeder(
+				seed=options['seed'],
+				essays=options['essays'],
+				mean_chain_length=options['mean_chain_length'],
+				request_fraction=0,
+				content_sentences=options['content_sentences'],
+			).seed()
+			rng = random.Random(options['seed'])
+			revision_ids = list(Essay.objects.filter(revision_of__isnull=False).values_list('pk', flat=True))
+			sample = rng.sample(revision_ids, min(options['reads'], len(revision_ids)))
+			expected = {essay.pk: essay.content for essay in Essay.objects.filter(pk__in=sample)}
+
+			self.stdout.write(
+				f'{"storage":<8}{"db MB":>9}{"content MB":>12}{"keyframes":>11}{"cold read ms":>14}'
+				f'{"warm read ms":>14}'
+			)
+			for storage in (FULL, DELTA):
+				start = time.perf_counter()
+				converted = EssayContentStore.convert(Essay, storage)
+				convert_seconds = time.perf_counter() - start
+				size = self.get_database_size()
+				stored = Essay.objects.aggregate(content=Sum(Length('content')), deltas=Sum(Length('content_delta')))
+				stored_size = (stored['content'] or 0) + (stored['deltas'] or 0)
+				keyframes = Essay.objects.filter(content__isnull=False).count()
+				cache.clear()
+				cold = self.read(sample, expected)
+				warm = self.read(sample, expected)
+				self.stdout.write(
+					f'{storage:<8}{size / 2 ** 20:>9.1f}{stored_size / 2 ** 20:>12.1f}'
+					f'{keyframes:>11}{cold:>14.3f}{warm:>14.3f}'
+				)
+				if converted and options['verbosity'] > 1:
+					self.stdout.write(f'  converted {converted} essays in {convert_seconds:.1f}s')
+
+	@staticmethod
+	def get_database_size() -> int:
+		with connection.cursor() as cursor:
+			cursor.execute('VACUUM')
+			cursor.execute('PRAGMA page_count')
+			page_count = cursor.fetchone()[0]
+			cursor.execute('PRAGMA page_size')
+			return page_count * cursor.fetchone()[0]
+
+	@staticmethod
+	def read(essay_ids, expected: dict) -> float:
+		""" Read each essay's content on its own, as the essay content endpoint does. Returns the median in ms. """
+		durations = []
+		for essay_id in essay_ids:
+			start = time.perf_counter()
+			content = Essay.objects.only('pk', 'content').get(pk=essay_id).content
+			durations.append(time.perf_counter() - start)
+			if content != expected[essay_id]:
+				raise CommandError(f'Essay {essay_id} did not read back the same content.')
+		return statistics.median(durations) * 1000
@@ -0,0 +1,183 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from project.benchmarking import BENCHMARK_PASSWORD, benchmark_database, compare_to_baseline, measure_request, summarize_measurements
+from project.models import FeedbackRequest, User
+from project.seeding import ScaleSeeder
+from project.utilities import FeedbackRequestManager, FeedbackResponseManager
+
+JSON = 'application/json'
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'endpoints.json')
+
+
+class Command(BaseCommand):
+	help = (
+		'Benchmark every endpoint against a seeded throwaway database, recording wall time, SQL query count and SQL'
+		' time, and compare the results to a JSON baseline.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--seed', type=int, default=0)
+		parser.add_argument('--essays', type=int, default=20000)
+		parser.add_argument('--editors', type=int, default=200)
+		parser.add_argument('--uploaders', type=int, default=2000)
+		parser.add_argument(
+			'--repeat', type=int, default=5, help='Number of editors to run the flow as. Times are medians.'
+		)
+		parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+		parser.add_argument(
+			'--write-baseline', action='store_true', help='Write the results to the baseline instead of comparing.'
+		)
+		parser.add_argument(
+			'--time-tolerance',
+			type=float,
+			default=1.5,
+			help='Fail if an endpoint is this many times slower than the baseline. 0 only checks query counts.'
+		)
+		parser.add_argument('--min-time-delta-ms', type=float, default=5.0)
+		parser.add_argument('--query-tolerance', type=int, default=0)
+
+	def handle(self, *args, **options):
+		dataset = {
+			'seed': options['seed'],
+			'essays': options['essays'],
+			'editors': options['editors'],
+			'uploaders': options['uploaders'],
+		}
+		baseline = None
+		if not options['write_baseline']:
+			if not os.path.exists(options['baseline']):
+				raise CommandError(f'No baseline at {options["baseline"]}. Run with --write-baseline to record one.')
+			with open(options['baseline']) as f:
+				baseline = json.load(f)
+			if baseline['dataset'] != dataset:
+				raise CommandError(
+					f'The baseline was recorded against a different dataset: {baseline["dataset"]}. Pass the same'
+					' options, or record a new baseline.'
+				)
+
+		with benchmark_database():
+			ScaleSeeder(password=BENCHMARK_PASSWORD, **dataset).seed()
+			editors = list(User.objects.filter(is_staff=True).order_by('pk')[:options['repeat']])
+			measurements = {}
+			for editor in editors:
+				for name, measurement in self.run_flow(editor):
+					measurements.setdefault(name, []).append(measurement)
+		results = {name: summarize_measurements(value) for name, value in measurements.items()}
+
+		self.stdout.write(f'{"endpoint":<44}{"status":>8}{"wall ms":>10}{"queries":>9}{"sql ms":>10}')
+		for name, result in results.items():
+			self.stdout.write(
+				f'{name:<44}{result["status_code"]:>8}{result["wall_ms"]:>10.1f}{result["queries"]:>9}'
+				f'{result["sql_ms"]:>10.1f}'
+			)
+
+		if options['write_baseline']:
+			os.makedirs(os.path.dirname(os.path.abspath(options['baseline'])), exist_ok=True)
+			with open(options['baseline'], 'w') as f:
+				json.dump({'dataset': dataset, 'endpoints': results}, f, indent=2, sort_keys=True)
+				f.write('\n')
+			self.stdout.write(self.style.SUCCESS(f'Wrote baseline to {options["baseline"]}.'))
+			return
+
+		missing = sorted(set(baseline['endpoints']) - set(results))
+		if missing:
+			self.stdout.write(self.style.WARNING(f'Not measured, but in the baseline: {", ".join(missing)}'))
+		regressions = compare_to_baseline(
+			baseline['endpoints'],
+			results,
+			time_tolerance=options['time_tolerance'],
+			min_time_delta_ms=options['min_time_delta_ms'],
+			query_tolerance=options['query_tolerance'],
+		)
+		if regressions:
+			raise CommandError('Endpoint regressions:\n' + '\n'.join(regressions))
+		self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+	def run_flow(self, editor: User):
+		""" Run through every endpoint as the specified editor. Returns a list of (name, measurement) pairs. """
+		# Set up without measuring: the editor must not have an open response, so that they can start one
+		for feedback_response in editor.feedback_responses.filter(finished=False):
+			FeedbackResponseManager(feedback_response).finish()
+		feedback_request = FeedbackRequestManager.query_for_user(editor).filter(
+			status=FeedbackRequest.Status.UNSTARTED
+		).order_by('deadline', 'pk').first()
+		if feedback_request is None:
+			raise CommandError(f'{editor.username} has nothing in their queue. Seed a larger dataset.')
+
+		client = Client()
+
+		def measure(name, method, path, **kwargs):
+			response, measurement = measure_request(client, method, path, **kwargs)
+			if response.status_code >= 400:
+				raise CommandError(f'{name}: {method.upper()} {path} returned {response.status_code}.')
+			measurements.append((name, measurement))
+			return response
+
+		measurements = []
+		measure(
+			'login', 'post', reverse('user-login'), data={
+				'username': editor.username,
+				'password': BENCHMARK_PASSWORD
+			}
+		)
+		measure('home', 'get', reverse('home'))
+		measure('platform', 'get', reverse('platform'))
+		measure('feedback-request-list', 'get', reverse('feedback-request-list'))
+		response = measure('feedback-request-list-cached', 'get', reverse('feedback-request-list'))
+		measure(
+			'feedback-request-list-not-modified',
+			'get',
+			reverse('feedback-request-list'),
+			HTTP_IF_NONE_MATCH=response['ETag']
+		)
+		measure('feedback-request-list-paginated', 'get', reverse('feedback-request-list'), data={'page_size': 50})
+
+		response = measure(
+			'feedback-request-start-response',
+			'post',
+			reverse('feedback-request-start-response', kwargs={'pk': feedback_request.pk}),
+		)
+		pk = response.json()['pk']
+		detail_url = reverse('feedback-response-detail', kwargs={'pk': pk})
+		measure('feedback-response-list', 'get', reverse('feedback-response-list'))
+		measure('feedback-response-list-paginated', 'get', reverse('feedback-response-list'), data={'page_size': 50})
+		measure(
+			'feedback-response-list-previous-revisions',
+			'get',
+			reverse('feedback-response-list'),
+			data={'previous_revisions': 'true'}
+		)
+		response = measure('feedback-response-detail', 'get', detail_url)
+		measure('feedback-response-detail-not-modified', 'get', detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+		data = response.json()
+		data['content'] = 'The quick brown fox.'
+		data = measure('feedback-response-update', 'put', detail_url, data=json.dumps(data), content_type=JSON).json()
+		measure(
+			'feedback-response-delta',
+			'patch',
+			reverse('feedback-response-delta', kwargs={'pk': pk}),
+			data=json.dumps(
+				{
+					'version': data['version'],
+					'operations': [{
+						'offset': 4,
+						'delete': 5,
+						'insert': 'slow'
+					}]
+				}
+			),
+			content_type=JSON
+		)
+		measure('feedback-response-finish', 'post', reverse('feedback-response-finish', kwargs={'pk': pk}))
+		data = measure('feedback-request-claim-next', 'post', reverse('feedback-request-claim-next')).json()
+		essay_pk = data['feedback_request']['essay']['pk']
+		measure('essay-content', 'get', reverse('essay-content', kwargs={'pk': essay_pk}))
+		client.post(reverse('feedback-response-finish', kwargs={'pk': data['pk']}))
+		measure('logout', 'post', reverse('user-logout'))
+		return measurements
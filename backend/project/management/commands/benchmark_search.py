@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from project.benchmarking import benchmark_database
+from project.models import Essay, User
+from project.search import SearchIndex, build_match_query
+from project.seeding import ScaleSeeder
+
+
+class Command(BaseCommand):
+	help = (
+		'Time rebuilding the full-text search index (see project.search) of a seeded throwaway SQLite database, and'
+		' compare search latency against filtering essays with icontains.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--essays', type=int, default=1000000)
+		parser.add_argument('--content-sentences', type=int, default=20)
+		parser.add_argument('--queries', type=int, default=20, help='Number of queries of each shape.')
+		parser.add_argument(
+			'--scan-queries', type=int, default=5, help='Number of queries of each shape to also run with icontains.'
+		)
+		parser.add_argument('--seed', type=int, default=0)
+
+	def handle(self, *args, **options):
+		if connection.vendor != 'sqlite':
+			raise CommandError('Search needs the SQLite backend.')
+		with benchmark_database():
+			seeder = ScaleSeeder(
+				seed=options['seed'],
+				editors=100,
+				uploaders=1000,
+				essays=options['essays'],
+				content_sentences=options['content_sentences'],
+			)
+			start = time.perf_counter()
+			seeder.seed()
+			self.stdout.write(f'Seeded {seeder.result.essays} essays in {time.perf_counter() - start:.1f}s.')
+
+			start = time.perf_counter()
+			rows = SearchIndex.rebuild()
+			self.stdout.write(
+				f'Indexed {rows} rows in {time.perf_counter() - start:.1f}s ({self.get_index_size() / 2 ** 20:.1f} MB).'
+			)
+
+			rng = random.Random(options['seed'])
+			essay_count = seeder.result.essays
+			phrases = []
+			for essay_id in rng.sample(range(1, essay_count + 1), options['queries']):
+				words = Essay.objects.only('pk', 'content').get(pk=essay_id).content.split()
+				index = rng.randrange(len(words) - 1)
+				phrases.append(f'"{words[index]} {words[index + 1]}"'.replace('.', ''))
+			shapes = {
+				'one term': [rng.choice(seeder.words) for _ in range(options['queries'])],
+				'two terms': [' '.join(rng.sample(seeder.words, 2)) for _ in range(options['queries'])],
+				'phrase': phrases,
+			}
+			editor = User.objects.filter(username__startswith=f'{seeder.prefix}-editor').first()
+
+			# Search ranks every match, so it is compared with both a page of unranked matches and all of them
+			self.stdout.write(
+				f'{"query":<12}{"matches":>10}{"search ms":>11}{"as editor ms":>14}{"icontains 20 ms":>16}'
+				f'{"icontains ms":>15}'
+			)
+			for shape, queries in shapes.items():
+				matches = statistics.median(self.count_matches(query) for query in queries)
+				search = self.time(queries, lambda query: SearchIndex.search(query))
+				as_editor = self.time(queries, lambda query: SearchIndex.search(query, editor))
+				scan_page = self.time(queries[:options['scan_queries']], lambda query: list(self.scan(query)[:20]))
+				scan_all = self.time(queries[:options['scan_queries']], lambda query: self.scan(query).count())
+				self.stdout.write(
+					f'{shape:<12}{matches:>10.0f}{search:>11.2f}{as_editor:>14.2f}{scan_page:>16.2f}{scan_all:>15.2f}'
+				)
+
+	@staticmethod
+	def time(queries, search) -> float:
+		""" The median time of running each query, in ms. """
+		durations = []
+		for query in queries:
+			start = time.perf_counter()
+			search(query)
+			durations.append(time.perf_counter() - start)
+		return statistics.median(durations) * 1000
+
+	@staticmethod
+	def scan(query: str):
+		""" The closest search without the index: essays with every term in the name or content, unranked. """
+		filters = Q()
+		for term in [query.strip('"')] if query.startswith('"') else query.split():
+			filters &= Q(name__icontains=term) | Q(content__icontains=term)
+		return Essay.objects.filter(filters).values_list('pk', flat=True)
+
+	@staticmethod
+	def count_matches(query: str) -> int:
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f'SELECT COUNT(*) FROM {SearchIndex.TABLE} WHERE {SearchIndex.TABLE} MATCH %s',
+				[build_match_query(query)]
+			)
+			return cursor.fetchone()[0]
+
+	@staticmethod
+	def get_index_size() -> int:
+		with connection.cursor() as cursor:
+			cursor.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name LIKE '{SearchIndex.TABLE}%%'")
+			return cursor.fetchone()[0] or 0
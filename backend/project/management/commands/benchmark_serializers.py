@@ -0,0 +1,94 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from project.benchmarking import benchmark_database
+from project.fast_serializers import compile_serializer
+from project.models import FeedbackRequest, FeedbackResponse
+from project.seeding import ScaleSeeder
+from project.serializers import FeedbackRequestSerializer, FeedbackResponseSerializer
+
+
+class Command(BaseCommand):
+	help = (
+		'Benchmark the DRF serializers against their compiled equivalents (see project.fast_serializers) on large'
+		' lists in a seeded throwaway database, and check that they render identical JSON.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--rows', type=int, default=10000, help='Number of FeedbackRequests and FeedbackResponses.'
+		)
+		parser.add_argument('--repeat', type=int, default=5, help='Times are medians over this many runs.')
+		parser.add_argument('--seed', type=int, default=0)
+
+	def handle(self, *args, **options):
+		rows = options['rows']
+		with benchmark_database():
+			ScaleSeeder(
+				seed=options['seed'],
+				essays=rows,
+				request_fraction=1.0,
+				finished_fraction=0.9,
+				in_progress_fraction=0.1,
+				content_sentences=5,
+			).seed()
+			cases = [
+				(
+					'feedback-requests',
+					FeedbackRequestSerializer,
+					FeedbackRequest.objects.select_related('essay').order_by('pk')[:rows],
+					{},
+				),
+				(
+					'feedback-responses',
+					FeedbackResponseSerializer,
+					FeedbackResponse.objects.select_related('feedback_request__essay').order_by('pk')[:rows],
+					{},
+				),
+				(
+					'feedback-responses-previous-revisions',
+					FeedbackResponseSerializer,
+					FeedbackResponse.objects.select_related('feedback_request__essay').order_by('pk')[:rows],
+					{
+						FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS: True
+					},
+				),
+			]
+
+			self.stdout.write(
+				f'{"list":<40}{"rows":>7}{"drf ms":>10}{"instances ms":>14}{"values ms":>11}{"speedup":>9}'
+			)
+			for name, serializer_class, queryset, context in cases:
+				self.run(name, serializer_class, queryset, context, options['repeat'])
+
+	def run(self, name: str, serializer_class, queryset, context: dict, repeat: int):
+		renderer = JSONRenderer()
+		variants = {
+			# Instances are loaded inside each timing, since the values variant does not load them at all
+			'drf': lambda: serializer_class(list(queryset.all()), many=True, context=context).data,
+			'instances':
+			lambda: compile_serializer(serializer_class(list(queryset.all()), many=True, context=context)).data,
+			'values': lambda: compile_serializer(serializer_class(queryset.all(), many=True, context=context)).data,
+		}
+		timings = {}
+		outputs = {}
+		for variant, serialize in variants.items():
+			durations = []
+			for _ in range(repeat):
+				start = time.perf_counter()
+				data = serialize()
+				durations.append(time.perf_counter() - start)
+			timings[variant] = statistics.median(durations) * 1000
+			outputs[variant] = renderer.render(data)
+
+		for variant, output in outputs.items():
+			if output != outputs['drf']:
+				raise CommandError(f'{name}: the {variant} output differs from the DRF serializer\'s.')
+		fastest = min(timings['instances'], timings['values'])
+		self.stdout.write(
+			f'{name:<40}{queryset.count():>7}{timings["drf"]:>10.1f}'
+			f'{timings["instances"]:>14.1f}{timings["values"]:>11.1f}{timings["drf"] / fastest:>8.1f}x'
+		)
@@ -0,0 +1,143 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from project.benchmarking import benchmark_database, create_benchmark_users
+from project.models import Essay, FeedbackRequest, FeedbackResponse
+from project.utilities import FeedbackRequestManager, FeedbackResponseManager
+
+# (SQLite profile, CONN_MAX_AGE) pairs to compare
+CONFIGURATIONS = (('baseline', 0), ('production', 0), ('production', 600))
+
+
+class Command(BaseCommand):
+	help = (
+		'Compare SQLite profiles (see project.database) and connection persistence under concurrent queue reads and'
+		' autosave writes, against a throwaway database.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--readers', type=int, default=8, help='Number of threads reading editing queues.')
+		parser.add_argument('--writers', type=int, default=4, help='Number of threads autosaving feedback responses.')
+		parser.add_argument('--seconds', type=float, default=5.0, help='How long to run each configuration.')
+		parser.add_argument('--feedback-requests', type=int, default=2000)
+
+	def handle(self, *args, **options):
+		if connection.vendor != 'sqlite':
+			raise CommandError('This benchmark needs the SQLite backend.')
+		self.stdout.write(
+			f'{"profile":<12}{"max age":>8}{"reads/s":>10}{"read p95 ms":>13}{"writes/s":>10}{"write p95 ms":>14}'
+			f'{"errors":>8}'
+		)
+		for profile, max_age in CONFIGURATIONS:
+			settings_dict = connections.databases['default']
+			old_max_age = settings_dict.get('CONN_MAX_AGE', 0)
+			settings_dict['CONN_MAX_AGE'] = max_age
+			try:
+				# A database per profile, since the journal mode is stored in the file
+				with override_settings(SQLITE_PROFILE=profile, SQLITE_PRAGMAS={}), benchmark_database():
+					reads, writes, errors = self.run(options)
+			finally:
+				settings_dict['CONN_MAX_AGE'] = old_max_age
+			self.stdout.write(
+				f'{profile:<12}{max_age:>8}{len(reads) / options["seconds"]:>10.1f}{self.p95(reads):>13.1f}'
+				f'{len(writes) / options["seconds"]:>10.1f}{self.p95(writes):>14.1f}{errors:>8}'
+			)
+
+	@staticmethod
+	def p95(durations) -> float:
+		return statistics.quantiles(durations, n=20)[-1] * 1000 if len(durations) > 1 else 0.0
+
+	def run(self, options):
+		""" Run readers and writers for the configured time. Returns the read and write durations, in seconds, and
+			the number of failed operations.
+		"""
+		editors = create_benchmark_users(options['readers'] + options['writers'])
+		Essay.objects.bulk_create(
+			[
+				Essay(name=f'Essay {i}', uploaded_by=editors[0], content='Lorem ipsum.\n' * 50)
+				for i in range(options['feedback_requests'])
+			]
+		)
+		FeedbackRequest.objects.bulk_create(
+			[FeedbackRequest(essay=essay, deadline=timezone.now()) for essay in Essay.objects.all()]
+		)
+		FeedbackRequest.assigned_editors.through.objects.bulk_create(
+			[
+				FeedbackRequest.assigned_editors.through(feedbackrequest_id=feedback_request_id, user_id=editor.pk)
+				for feedback_request_id in FeedbackRequest.objects.values_list('pk', flat=True)
+				for editor in editors
+			]
+		)
+		writers = editors[options['readers']:]
+		feedback_responses = [
+			FeedbackResponse.objects.create(editor=editor, feedback_request=feedback_request)
+			for editor, feedback_request in zip(writers, FeedbackRequest.objects.order_by('-pk'))
+		]
+		connection.close()
+
+		reads, writes = [], []
+		errors = [0]
+		lock = threading.Lock()
+		deadline = time.perf_counter() + options['seconds']
+
+		def request(durations, operation):
+			""" Run an operation as a request would: connections are closed or kept around it according to
+				CONN_MAX_AGE, as Django does on request_started and request_finished.
+			"""
+			close_old_connections()
+			start = time.perf_counter()
+			try:
+				operation()
+			except DatabaseError:
+				with lock:
+					errors[0] += 1
+			else:
+				with lock:
+					durations.append(time.perf_counter() - start)
+			finally:
+				close_old_connections()
+
+		def read(editor):
+			try:
+				while time.perf_counter() < deadline:
+					request(
+						reads, lambda: list(
+							FeedbackRequestManager.query_for_user(editor).select_related('essay').
+							defer('essay__content').order_by('deadline')[:50]
+						)
+					)
+			finally:
+				connection.close()
+
+		def write(feedback_response):
+			version = [0]
+
+			def autosave():
+				version[0] = FeedbackResponseManager.apply_delta(
+					FeedbackResponse.objects.all(), feedback_response.pk, version[0],
+					[{
+						'offset': 0,
+						'delete': 0,
+						'insert': 'a'
+					}]
+				)
+
+			try:
+				while time.perf_counter() < deadline:
+					request(writes, autosave)
+			finally:
+				connection.close()
+
+		threads = [threading.Thread(target=read, args=(editor,)) for editor in editors[:options['readers']]]
+		threads += [threading.Thread(target=write, args=(response,)) for response in feedback_responses]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		return reads, writes, errors[0]
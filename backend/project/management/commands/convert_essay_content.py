@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from project.content_storage import STORAGE_MODES, EssayContentStore
+from project.models import Essay
+
+
+class Command(BaseCommand):
+	help = (
+		'Store the content of every essay in full or as deltas, without changing it. Run after changing'
+		' settings.ESSAY_CONTENT_STORAGE. See project.content_storage.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'storage', nargs='?', choices=STORAGE_MODES, help='Defaults to settings.ESSAY_CONTENT_STORAGE.'
+		)
+		parser.add_argument('--batch-size', type=int, default=500, help='Number of revision chains per transaction.')
+
+	def handle(self, *args, **options):
+		storage = options['storage'] or settings.ESSAY_CONTENT_STORAGE
+		start = time.perf_counter()
+
+		def on_batch(count):
+			if options['verbosity'] > 1:
+				self.stdout.write(f'{count} essays converted ({time.perf_counter() - start:.1f}s)')
+
+		count = EssayContentStore.convert(Essay, storage, batch_size=options['batch_size'], on_batch=on_batch)
+		self.stdout.write(
+			self.style.SUCCESS(f'Converted {count} essays to {storage} storage in {time.perf_counter() - start:.1f}s.')
+		)
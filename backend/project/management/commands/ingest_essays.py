@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from project.ingestion import CSV, FORMATS, JSONL, EssayIngester, IngestionError, read_records
+from project.models import User
+
+
+class Command(BaseCommand):
+	help = 'Bulk import essays, with optional feedback requests and assignments, from a JSONL or CSV file.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('path', help='The file to import. See project.ingestion.read_records for the format.')
+		parser.add_argument(
+			'--format', choices=FORMATS, help='Defaults to csv for .csv files and jsonl for everything else.'
+		)
+		parser.add_argument(
+			'--uploaded-by',
+			required=True,
+			help='Username of the user that essays are uploaded by, unless a record names one.'
+		)
+		parser.add_argument('--batch-size', type=int, default=1000)
+		parser.add_argument(
+			'--checkpoint',
+			help='File recording how many rows have been committed. If it exists, the import resumes after them.'
+		)
+
+	def handle(self, *args, **options):
+		record_format = options['format'] or (CSV if options['path'].endswith('.csv') else JSONL)
+		try:
+			uploaded_by = User.objects.get(username=options['uploaded_by'])
+		except User.DoesNotExist:
+			raise CommandError(f'No user with username {options["uploaded_by"]!r}.')
+
+		ingester = EssayIngester(uploaded_by, options['batch_size'], options['checkpoint'])
+		start = ingester.read_checkpoint()
+		if start:
+			self.stdout.write(f'Resuming after row {start}.')
+
+		def report(result):
+			self.stdout.write(f'{result.rows} rows committed ({result.rows_per_second:.0f} rows/sec).')
+
+		with open(options['path'], newline='') as f:
+			try:
+				result = ingester.ingest(read_records(f, record_format), start=start, on_batch=report)
+			except IngestionError as e:
+				raise CommandError(f'{e} Re-run the command to resume after row {e.rows_committed}.')
+		self.stdout.write(
+			self.style.SUCCESS(
+				f'Imported {result.essays} essays, {result.feedback_requests} feedback requests and'
+				f' {result.assignments} assignments from {result.rows - start} rows in {result.elapsed:.2f}s'
+				f' ({result.rows_per_second:.0f} rows/sec).'
+			)
+		)
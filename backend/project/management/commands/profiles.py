@@ -0,0 +1,52 @@
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project.profiling import list_profiles
+
+
+class Command(BaseCommand):
+	help = 'List the request profiles saved by ProfilingMiddleware, or summarize one of them.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('profile_id', nargs='?', help='Summarize this profile instead of listing them.')
+		parser.add_argument('--view', help='Only list profiles of this view name.')
+		parser.add_argument('--limit', type=int, default=20)
+		parser.add_argument('--sort', default='cumulative', help='pstats sort key for the summary.')
+		parser.add_argument('--top', type=int, default=25, help='Number of functions and queries to summarize.')
+
+	def handle(self, *args, **options):
+		profiles = list_profiles()
+		if options['profile_id']:
+			profile = next((profile for profile in profiles if profile['id'] == options['profile_id']), None)
+			if profile is None:
+				raise CommandError(f'No profile {options["profile_id"]!r} in {settings.PROFILING_DIR}.')
+			self.summarize(profile, options['sort'], options['top'])
+			return
+
+		if options['view']:
+			profiles = [profile for profile in profiles if profile['view'] == options['view']]
+		self.stdout.write(f'{"id":<64}{"status":>7}{"wall ms":>10}{"queries":>9}{"sql ms":>10}')
+		for profile in profiles[:options['limit']]:
+			self.stdout.write(
+				f'{profile["id"]:<64}{profile["status"]:>7}{profile["wall_ms"]:>10.1f}{len(profile["queries"]):>9}'
+				f'{profile["sql_ms"]:>10.1f}'
+			)
+
+	def summarize(self, profile: dict, sort: str, top: int):
+		self.stdout.write(
+			f'{profile["method"]} {profile["path"]} ({profile["view"]}) -> {profile["status"]} at {profile["started"]}:'
+			f' {profile["wall_ms"]:.1f}ms, {len(profile["queries"])} queries in {profile["sql_ms"]:.1f}ms'
+		)
+
+		self.stdout.write('\nSlowest queries:')
+		for query in sorted(profile['queries'], key=lambda query: query['duration'], reverse=True)[:top]:
+			self.stdout.write(f'{query["duration"] * 1000:>8.2f}ms  {query["sql"]}')
+
+		output = io.StringIO()
+		stats = pstats.Stats(os.path.join(settings.PROFILING_DIR, f'{profile["id"]}.prof'), stream=output)
+		stats.strip_dirs().sort_stats(sort).print_stats(top)
+		self.stdout.write(output.getvalue())
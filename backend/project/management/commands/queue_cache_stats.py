@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from project.caching import FeedbackRequestQueueCache
+
+
+class Command(BaseCommand):
+	help = 'Show the hit and miss counts of the editor queue cache.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--reset', action='store_true', help='Reset the counts after showing them.')
+
+	def handle(self, *args, **options):
+		stats = FeedbackRequestQueueCache.get_stats()
+		total = stats['hits'] + stats['misses']
+		hit_rate = f'{stats["hits"] / total:.1%}' if total else 'n/a'
+		self.stdout.write(f'{stats["hits"]} hits, {stats["misses"]} misses (hit rate {hit_rate}).')
+		if options['reset']:
+			FeedbackRequestQueueCache.reset_stats()
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project.search import SearchIndex, SearchNotSupportedError
+
+
+class Command(BaseCommand):
+	help = (
+		'Rebuild the full-text search index of essays and feedback responses from scratch. Run after bulk changes'
+		' that bypass signals, like seed_scale. See project.search.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size', type=int, default=2000, help='Number of delta stored essays to reconstruct at a time.'
+		)
+
+	def handle(self, *args, **options):
+		start = time.perf_counter()
+
+		def on_batch(count):
+			if options['verbosity'] > 1:
+				self.stdout.write(f'{count} delta stored essays indexed ({time.perf_counter() - start:.1f}s)')
+
+		try:
+			count = SearchIndex.rebuild(batch_size=options['batch_size'], on_batch=on_batch)
+		except SearchNotSupportedError:
+			raise CommandError('Search needs the SQLite backend.')
+		self.stdout.write(self.style.SUCCESS(f'Indexed {count} rows in {time.perf_counter() - start:.1f}s.'))
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project.models import User
+from project.search import SearchIndex
+from project.seeding import CHAIN_LENGTH_DISTRIBUTIONS, ScaleSeeder
+
+
+class Command(BaseCommand):
+	help = 'Seed the database with a large, deterministic dataset for load and performance testing.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--seed', type=int, default=0)
+		parser.add_argument('--editors', type=int, default=1000)
+		parser.add_argument('--uploaders', type=int, default=1000000)
+		parser.add_argument('--essays', type=int, default=1000000)
+		parser.add_argument('--chain-length-distribution', choices=CHAIN_LENGTH_DISTRIBUTIONS, default='geometric')
+		parser.add_argument(
+			'--mean-chain-length', type=float, default=3.0, help='Mean revision chain length for `geometric`.'
+		)
+		parser.add_argument('--max-chain-length', type=int, default=40)
+		parser.add_argument(
+			'--request-fraction', type=float, default=0.9, help='Fraction of essays with a FeedbackRequest.'
+		)
+		parser.add_argument('--editors-per-request', type=int, default=2)
+		parser.add_argument(
+			'--finished-fraction',
+			type=float,
+			default=0.3,
+			help='Fraction of the latest revisions in each chain whose FeedbackRequest is finished.'
+		)
+		parser.add_argument(
+			'--in-progress-fraction',
+			type=float,
+			default=0.1,
+			help='Fraction of the latest revisions in each chain whose FeedbackRequest is in progress.'
+		)
+		parser.add_argument('--content-sentences', type=int, default=20)
+		parser.add_argument('--password', default='password', help='Password for every seeded user.')
+		parser.add_argument('--prefix', help='Username prefix. Defaults to `seed<seed>`.')
+		parser.add_argument('--batch-size', type=int, default=5000)
+
+	def handle(self, *args, **options):
+		seeder = ScaleSeeder(
+			seed=options['seed'],
+			editors=options['editors'],
+			uploaders=options['uploaders'],
+			essays=options['essays'],
+			chain_length_distribution=options['chain_length_distribution'],
+			mean_chain_length=options['mean_chain_length'],
+			max_chain_length=options['max_chain_length'],
+			request_fraction=options['request_fraction'],
+			editors_per_request=options['editors_per_request'],
+			finished_fraction=options['finished_fraction'],
+			in_progress_fraction=options['in_progress_fraction'],
+			content_sentences=options['content_sentences'],
+			password=options['password'],
+			prefix=options['prefix'],
+			batch_size=options['batch_size'],
+		)
+		if User.objects.filter(username__startswith=f'{seeder.prefix}-').exists():
+			raise CommandError(f'Users prefixed `{seeder.prefix}-` already exist. Pass a different --seed or --prefix.')
+
+		start = time.perf_counter()
+
+		def on_batch(result):
+			if options['verbosity'] > 1:
+				self.stdout.write(f'{result.essays} essays ({time.perf_counter() - start:.1f}s)')
+
+		result = seeder.seed(on_batch=on_batch)
+		# Bulk inserts bypass the signals that keep the search index in sync
+		if SearchIndex.is_supported():
+			SearchIndex.rebuild()
+		self.stdout.write(
+			self.style.SUCCESS(
+				f'Created {result.users} users, {result.essays} essays, {result.feedback_requests} feedback requests,'
+				f' {result.assignments} assignments and {result.feedback_responses} feedback responses in'
+				f' {time.perf_counter() - start:.1f}s.'
+			)
+		)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from project.models import FeedbackRequest
+from project.utilities import FeedbackRequestManager
+
+
+class Command(BaseCommand):
+	help = 'Backfill or repair FeedbackRequest.status and active_editor from the FeedbackResponses on each request.'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=10000,
+			help='Number of FeedbackRequests (by primary key range) repaired per transaction.'
+		)
+
+	def handle(self, *args, **options):
+		batch_size = options['batch_size']
+		max_pk = FeedbackRequest.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+		repaired = 0
+		for start in range(0, max_pk, batch_size):
+			with transaction.atomic():
+				repaired += FeedbackRequestManager.repair_statuses(
+					FeedbackRequest.objects.filter(pk__gt=start, pk__lte=start + batch_size)
+				)
+		self.stdout.write(self.style.SUCCESS(f'Repaired the status of {repaired} feedback requests.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from project.routing import get_replica_alias
+
+
+class Command(BaseCommand):
+	help = (
+		'Copy the primary SQLite database into the SQLite file standing in for the read replica locally. Run it'
+		' periodically to simulate replication lag. See project.routing.'
+	)
+
+	def handle(self, *args, **options):
+		alias = get_replica_alias()
+		if alias is None:
+			raise CommandError('No replica is configured. Set DATABASE_REPLICA_NAME to the path of a SQLite file.')
+		source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+		if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+			raise CommandError('Only SQLite databases can be copied into the replica.')
+		start = time.perf_counter()
+		source.ensure_connection()
+		target.ensure_connection()
+		source.connection.backup(target.connection)
+		self.stdout.write(self.style.SUCCESS(f'Copied the primary into `{alias}` in {time.perf_counter() - start:.2f}s.'))
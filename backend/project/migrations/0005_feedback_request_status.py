@@ -0,0 +1,49 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_status(apps, schema_editor):
+    FeedbackRequest = apps.get_model('project', 'FeedbackRequest')
+    FeedbackResponse = apps.get_model('project', 'FeedbackResponse')
+
+    responses = FeedbackResponse.objects.filter(feedback_request=models.OuterRef('pk')).order_by('pk')
+    finished_responses = responses.filter(finished=True)
+    unfinished_responses = responses.filter(finished=False)
+    FeedbackRequest.objects.filter(models.Exists(finished_responses)).update(
+        status='finished', active_editor_id=models.Subquery(finished_responses.values('editor_id')[:1])
+    )
+    FeedbackRequest.objects.filter(~models.Exists(finished_responses), models.Exists(unfinished_responses)).update(
+        status='in_progress', active_editor_id=models.Subquery(unfinished_responses.values('editor_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0004_auto_20210205_1951'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackrequest',
+            name='active_editor',
+            field=models.ForeignKey(blank=True, help_text='The editor of the FeedbackResponse on this request, if one has been started. Otherwise, null.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='active_feedback_requests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='feedbackrequest',
+            name='status',
+            field=models.CharField(choices=[('unstarted', 'Unstarted'), ('in_progress', 'In progress'), ('finished', 'Finished')], default='unstarted', help_text='Where the request is in the editing queue. Denormalized from its FeedbackResponses and kept in sync as they are created, finished and deleted.', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackrequest',
+            index=models.Index(fields=['status', 'deadline'], name='feedback_request_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackrequest',
+            index=models.Index(fields=['active_editor', 'status', 'deadline'], name='feedback_request_editor_idx'),
+        ),
+        migrations.RunPython(backfill_status, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0005_feedback_request_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedbackresponse',
+            index=models.Index(fields=['editor', 'created'], name='feedback_response_editor_idx'),
+        ),
+    ]
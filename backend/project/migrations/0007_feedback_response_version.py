@@ -0,0 +1,18 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0006_feedback_response_editor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented every time the content is saved. Delta updates must name the version they apply to.'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+def check_duplicate_claims(apps, schema_editor):
+    """ Refuse to add the constraints while FeedbackResponses violate them, listing the conflicting responses so that
+        they can be resolved by hand. Responses may hold editors' work, so they are never deleted here.
+    """
+    FeedbackResponse = apps.get_model('project', 'FeedbackResponse')
+
+    conflicts = []
+    responses = FeedbackResponse.objects.order_by()
+    duplicate_requests = responses.values('feedback_request_id').annotate(count=models.Count('pk')).filter(count__gt=1)
+    for row in duplicate_requests:
+        pks = responses.filter(feedback_request_id=row['feedback_request_id']).order_by('pk')
+        pks = pks.values_list('pk', flat=True)
+        conflicts.append(f'FeedbackRequest {row["feedback_request_id"]} has FeedbackResponses {list(pks)}')
+    unfinished = responses.filter(finished=False)
+    duplicate_editors = unfinished.values('editor_id').annotate(count=models.Count('pk')).filter(count__gt=1)
+    for row in duplicate_editors:
+        pks = unfinished.filter(editor_id=row['editor_id']).order_by('pk')
+        pks = pks.values_list('pk', flat=True)
+        conflicts.append(f'Editor {row["editor_id"]} has unfinished FeedbackResponses {list(pks)}')
+    if conflicts:
+        raise Exception(
+            'Cannot add the FeedbackResponse claim constraints. Each FeedbackRequest may have one FeedbackResponse and'
+            ' each editor one unfinished FeedbackResponse. Finish or delete the extra responses and re-run'
+            ' migrations:\n' + '\n'.join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0007_feedback_response_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_claims, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='feedbackresponse',
+            constraint=models.UniqueConstraint(fields=('feedback_request',), name='unique_feedback_response_per_request'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedbackresponse',
+            constraint=models.UniqueConstraint(condition=models.Q(finished=False), fields=('editor',), name='unique_open_feedback_response_per_editor'),
+        ),
+    ]
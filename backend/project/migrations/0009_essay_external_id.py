@@ -0,0 +1,18 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0008_feedback_response_claim_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='essay',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='The identifier of the essay in the system it was imported from, if it was bulk imported. Used to resolve revisions within an import and to make re-running an import safe.', max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0009_essay_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='essay',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='When the essay was last saved. Used to answer conditional GETs.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='feedbackrequest',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='When the request, including its status, was last changed. Used to answer conditional GETs.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='When the response was last saved. Used to answer conditional GETs.'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:39
+
+from django.db import migrations, models
+import project.content_storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0010_modified_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='essay',
+            name='content_delta',
+            field=models.BinaryField(help_text='If the content is stored as a delta, the compressed diff from the content of revision_of. Otherwise, null.', null=True),
+        ),
+        migrations.AddField(
+            model_name='essay',
+            name='content_keyframe_distance',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='The number of deltas to apply to reconstruct the content from the nearest ancestor stored in full.'),
+        ),
+        migrations.AlterField(
+            model_name='essay',
+            name='content',
+            field=project.content_storage.RevisionContentField(help_text='The content of the essay. You may treat this as plain text for the purposes of this project. This plain text may contain newlines and tabs, both of which should be rendered. Null in the database if the content is stored as a delta. See project.content_storage.'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import DEFAULT_DB_ALIAS, migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS project_search_index USING fts5(title, body, tokenize='porter unicode61')"
+        )
+
+
+def populate_search_index(apps, schema_editor):
+    # Replicas get the index when sync_replica copies the default database
+    if schema_editor.connection.vendor == 'sqlite' and schema_editor.connection.alias == DEFAULT_DB_ALIAS:
+        # Imported here so that loading the migration does not import the models
+        from project.search import SearchIndex
+
+        SearchIndex.rebuild(
+            essay_model=apps.get_model('project', 'Essay'),
+            feedback_response_model=apps.get_model('project', 'FeedbackResponse'),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS project_search_index')
+
+
+class Migration(migrations.Migration):
+    """ Create the full-text search index (see project.search) and index the existing essays and feedback responses.
+        `rebuild_search_index` rebuilds it later.
+    """
+
+    dependencies = [
+        ('project', '0011_essay_content_delta'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ from typing import Optional, cast
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from project.content_storage import RevisionContentField
+
 
 class User(AbstractUser):
 	""" A user in the system. Users in this system can all theoretically upload or edit essays. Everyone has the
@@ -24,15 +26,19 @@ class User(AbstractUser):
 	feedback_responses: 'django.db.models.manager.RelatedManager["FeedbackResponse"]' = cast(
 		'django.db.models.manager.RelatedManager["FeedbackResponse"]', None
 	)
+	active_feedback_requests: 'django.db.models.manager.RelatedManager["FeedbackRequest"]' = cast(
+		'django.db.models.manager.RelatedManager["FeedbackRequest"]', None
+	)
 
 
 class Essay(models.Model):
 	""" An essay is structured text that can be uploaded into our system and later submitted for feedback. """
 	name = models.TextField(help_text='A helpful name for the essay.')
 	uploaded_by = models.ForeignKey('project.User', related_name='essays_uploaded', on_delete=models.CASCADE)
-	content = models.TextField(
+	content = RevisionContentField(
 		help_text='The content of the essay. You may treat this as plain text for the' +
-		' purposes of this project. This plain text may contain newlines and tabs, both of which should be rendered.'
+		' purposes of this project. This plain text may contain newlines and tabs, both of which should be rendered.' +
+		' Null in the database if the content is stored as a delta. See project.content_storage.'
 	)
 	revision_of = models.ForeignKey(
 		'project.Essay',
@@ -43,6 +49,28 @@ class Essay(models.Model):
 		help_text='If this is a revision of a previously uploaded essay (or list of essays), the most recently uploaded'
 		+ ' ancestor essay. Otherwise, null.'
 	)
+	external_id = models.CharField(
+		max_length=255,
+		unique=True,
+		null=True,
+		blank=True,
+		help_text='The identifier of the essay in the system it was imported from, if it was bulk imported. Used to' +
+		' resolve revisions within an import and to make re-running an import safe.'
+	)
+	modified = models.DateTimeField(
+		auto_now=True, help_text='When the essay was last saved. Used to answer conditional GETs.'
+	)
+	content_delta = models.BinaryField(
+		null=True,
+		editable=False,
+		help_text='If the content is stored as a delta, the compressed diff from the content of revision_of.' +
+		' Otherwise, null.'
+	)
+	content_keyframe_distance = models.PositiveSmallIntegerField(
+		default=0,
+		editable=False,
+		help_text='The number of deltas to apply to reconstruct the content from the nearest ancestor stored in full.'
+	)
 
 	# Incoming fields (defined for intellisense)
 	feedback_request: Optional['FeedbackRequest'] = None
@@ -50,10 +78,22 @@ class Essay(models.Model):
 		'django.db.models.manager.RelatedManager["Essay"]', None
 	)
 
+	def save(self, *args, update_fields=None, **kwargs):
+		# Saving the content also sets the columns it may be stored in, and a delta must be re-encoded against a new
+		# parent
+		if update_fields is not None and {'content', 'revision_of'} & set(update_fields):
+			update_fields = {*update_fields, 'content', 'content_delta', 'content_keyframe_distance'}
+		super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class FeedbackRequest(models.Model):
 	""" A request for feedback on an essay. """
 
+	class Status(models.TextChoices):
+		UNSTARTED = 'unstarted', 'Unstarted'
+		IN_PROGRESS = 'in_progress', 'In progress'
+		FINISHED = 'finished', 'Finished'
+
 	essay = models.OneToOneField(
 		'project.Essay',
 		on_delete=models.CASCADE,
@@ -63,11 +103,37 @@ class FeedbackRequest(models.Model):
 	)
 	assigned_editors = models.ManyToManyField('project.User', related_name='assigned_feedback_requests')
 	deadline = models.DateTimeField()
+	status = models.CharField(
+		max_length=16,
+		choices=Status.choices,
+		default=Status.UNSTARTED,
+		help_text='Where the request is in the editing queue. Denormalized from its FeedbackResponses and kept in sync' +
+		' as they are created, finished and deleted.'
+	)
+	active_editor = models.ForeignKey(
+		'project.User',
+		related_name='active_feedback_requests',
+		null=True,
+		blank=True,
+		on_delete=models.SET_NULL,
+		help_text='The editor of the FeedbackResponse on this request, if one has been started. Otherwise, null.'
+	)
+	modified = models.DateTimeField(
+		auto_now=True, help_text='When the request, including its status, was last changed. Used to answer conditional GETs.'
+	)
 
 	feedback_responses: 'django.db.models.manager.RelatedManager["FeedbackResponse"]' = cast(
 		'django.db.models.manager.RelatedManager["FeedbackResponse"]', None
 	)
 
+	class Meta:
+		indexes = [
+			# Unstarted requests in the editing queue, by deadline
+			models.Index(fields=['status', 'deadline'], name='feedback_request_queue_idx'),
+			# Requests an editor is working on, by deadline
+			models.Index(fields=['active_editor', 'status', 'deadline'], name='feedback_request_editor_idx'),
+		]
+
 
 class FeedbackResponse(models.Model):
 	""" Feedback provided in response to a FeedbackRequest. """
@@ -93,3 +159,23 @@ class FeedbackResponse(models.Model):
 		blank=True,
 		default=''
 	)
+	version = models.PositiveIntegerField(
+		default=0,
+		help_text='Incremented every time the content is saved. Delta updates must name the version they apply to.'
+	)
+	modified = models.DateTimeField(
+		auto_now=True, help_text='When the response was last saved. Used to answer conditional GETs.'
+	)
+
+	class Meta:
+		indexes = [
+			# An editor's responses, newest first (see FeedbackResponsePagination)
+			models.Index(fields=['editor', 'created'], name='feedback_response_editor_idx'),
+		]
+		constraints = [
+			# These arbitrate concurrent claims; see FeedbackResponseManager.create_for_feedback_request
+			models.UniqueConstraint(fields=['feedback_request'], name='unique_feedback_response_per_request'),
+			models.UniqueConstraint(
+				fields=['editor'], condition=models.Q(finished=False), name='unique_open_feedback_response_per_editor'
+			),
+		]
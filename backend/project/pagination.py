@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+
+from typing import Any, List, Optional, Tuple
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q
+from django.db.models.query import QuerySet
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+	""" Keyset (cursor) pagination over a fixed ordering.
+
+		Each page is fetched with a `WHERE (ordering) > (last row of the previous page)` filter rather than an offset,
+		so with an index on the ordering every page costs the same as the first. The last ordering field must be
+		unique (normally the primary key) so that the order is total and pages are stable under concurrent inserts.
+
+		Pagination is opt-in: a request is only paginated if it has a `cursor` or `page_size` query param. Otherwise
+		the full, unpaginated list is returned as before.
+
+		Paginated responses look like `{"next": <url or null>, "results": [...]}`.
+	"""
+
+	ordering: Tuple[str, ...] = ('pk',)
+	cursor_query_param = 'cursor'
+	page_size_query_param = 'page_size'
+	page_size = 50
+	max_page_size = 500
+	invalid_cursor_message = 'Invalid cursor.'
+
+	def __init__(self):
+		self.request = None
+		self.next_cursor: Optional[str] = None
+
+	def is_requested(self, request) -> bool:
+		""" Whether the request asked for pagination. """
+		return self.cursor_query_param in request.query_params or self.page_size_query_param in request.query_params
+
+	def get_page_size(self, request) -> int:
+		try:
+			page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+		except ValueError:
+			return self.page_size
+		return max(1, min(page_size, self.max_page_size))
+
+	def get_ordering_fields(self, model: Model) -> list:
+		fields = []
+		for field_name in self.ordering:
+			field_name = field_name.lstrip('-')
+			fields.append(model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name))
+		return fields
+
+	def encode_cursor(self, instance) -> str:
+		values = [field.value_to_string(instance) for field in self.get_ordering_fields(instance)]
+		return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+	def decode_cursor(self, cursor: str, model: Model) -> List[Any]:
+		""" The values of the ordering fields in `cursor`, converted to Python. Raises NotFound for any cursor that
+			encode_cursor could not have produced.
+		"""
+		try:
+			values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		except (binascii.Error, ValueError):
+			raise NotFound(self.invalid_cursor_message)
+		if not isinstance(values, list) or len(values) != len(self.ordering):
+			raise NotFound(self.invalid_cursor_message)
+		fields = self.get_ordering_fields(model)
+		if not all(isinstance(value, str) for value in values):
+			raise NotFound(self.invalid_cursor_message)
+		try:
+			values = [field.to_python(value) for field, value in zip(fields, values)]
+		except (ValidationError, ValueError, TypeError):
+			raise NotFound(self.invalid_cursor_message)
+		if any(value is None for value in values):
+			raise NotFound(self.invalid_cursor_message)
+		return values
+
+	def get_keyset_filter(self, values: List[Any]) -> Q:
+		""" Build the filter matching rows strictly after `values` in `self.ordering`. """
+		keyset_filter = Q()
+		for i, field_name in enumerate(self.ordering):
+			lookup = 'lt' if field_name.startswith('-') else 'gt'
+			condition = Q(**{f'{field_name.lstrip("-")}__{lookup}': values[i]})
+			for previous_field_name, previous_value in zip(self.ordering[:i], values[:i]):
+				condition &= Q(**{previous_field_name.lstrip('-'): previous_value})
+			keyset_filter |= condition
+		return keyset_filter
+
+	def paginate_queryset(self, queryset: QuerySet, request, view=None):
+		if not self.is_requested(request):
+			return None
+		self.request = request
+		page_size = self.get_page_size(request)
+
+		queryset = queryset.order_by(*self.ordering)
+		cursor = request.query_params.get(self.cursor_query_param)
+		if cursor:
+			queryset = queryset.filter(self.get_keyset_filter(self.decode_cursor(cursor, queryset.model)))
+
+		# Fetch one extra row to find out whether there is a next page
+		page = list(queryset[:page_size + 1])
+		self.next_cursor = self.encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+		return page[:page_size]
+
+	def get_next_link(self) -> Optional[str]:
+		if self.next_cursor is None:
+			return None
+		return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+	def get_paginated_response(self, data):
+		return Response({'next': self.get_next_link(), 'results': data})
+
+
+class FeedbackRequestPagination(KeysetPagination):
+	""" Paginate the editing queue by deadline. """
+
+	ordering = ('deadline', 'pk')
+
+
+class FeedbackResponsePagination(KeysetPagination):
+	""" Paginate FeedbackResponses, most recently created first.
+
+		`created` is used rather than `finish_time` because it is never null, which keeps the keyset comparison total.
+	"""
+
+	ordering = ('-created', '-pk')
@@ -0,0 +1,139 @@
+""" On-demand profiling of individual requests.
+
+	ProfilingMiddleware runs a request's view under cProfile when the request carries the X-Profile-Token header with
+	settings.PROFILING_TOKEN, or when it is sampled at settings.PROFILING_SAMPLE_RATE. The profile is saved to
+	settings.PROFILING_DIR as `<id>.prof`, readable with pstats, next to `<id>.json` recording the view, timings and
+	the text of every SQL query. Query parameters are not recorded, as they include session keys and user content.
+	The `profiles` management command lists and summarizes them.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+
+from contextlib import ExitStack
+from typing import List, Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PROFILE_TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+
+
+class SQLTrace:
+	""" A database execute wrapper that records every query with its duration, in seconds. Only the SQL text is
+		recorded, never the parameters bound to it.
+	"""
+
+	def __init__(self):
+		self.queries: List[dict] = []
+
+	def __call__(self, execute, sql, params, many, context):
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.queries.append({
+				'alias': context['connection'].alias,
+				'sql': sql,
+				'many': many,
+				'duration': time.perf_counter() - start,
+			})
+
+
+def should_profile(request) -> bool:
+	""" Whether the request asked to be profiled with the right token, or was sampled. """
+	token = settings.PROFILING_TOKEN
+	if token and PROFILE_TOKEN_HEADER in request.META:
+		# Compare bytes, as compare_digest raises a TypeError for str with non-ASCII characters
+		return hmac.compare_digest(request.META[PROFILE_TOKEN_HEADER].encode(), token.encode())
+	sample_rate = settings.PROFILING_SAMPLE_RATE
+	return bool(sample_rate) and random.random() < sample_rate
+
+
+def list_profiles(directory: Optional[str] = None) -> List[dict]:
+	""" Load the metadata of every saved profile, newest first. """
+	directory = directory or settings.PROFILING_DIR
+	if not os.path.isdir(directory):
+		return []
+	profiles = []
+	for name in os.listdir(directory):
+		if name.endswith('.json'):
+			with open(os.path.join(directory, name)) as f:
+				profiles.append(json.load(f))
+	return sorted(profiles, key=lambda profile: profile['started'], reverse=True)
+
+
+class ProfilingMiddleware:
+	""" Profile requests that ask for it or are sampled. Responses to profiled requests name the saved profile in
+		an `X-Profile-Id` header. This should be one of the last middleware, so that the profile covers the view.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if asyncio.iscoroutinefunction(get_response):
+			# Mark the instance as a coroutine function, as Django's MiddlewareMixin does
+			self._is_coroutine = asyncio.coroutines._is_coroutine
+
+	def __call__(self, request):
+		if asyncio.iscoroutinefunction(self.get_response):
+			return self.__acall__(request)
+		if not should_profile(request):
+			return self.get_response(request)
+		return self.profile(request, self.get_response)
+
+	async def __acall__(self, request):
+		if not should_profile(request):
+			return await self.get_response(request)
+		# cProfile and the SQL trace only cover the current thread, so profiled requests are handled in a sync thread
+		return await sync_to_async(self.profile, thread_sensitive=True)(request, async_to_sync(self.get_response))
+
+	@staticmethod
+	def profile(request, get_response):
+		trace = SQLTrace()
+		profiler = cProfile.Profile()
+		started = timezone.now()
+		with ExitStack() as stack:
+			for connection in connections.all():
+				stack.enter_context(connection.execute_wrapper(trace))
+			start = time.perf_counter()
+			profiler.enable()
+			try:
+				response = get_response(request)
+			finally:
+				profiler.disable()
+			wall = time.perf_counter() - start
+
+		view = request.resolver_match.view_name if request.resolver_match else None
+		profile_id = f'{started:%Y%m%dT%H%M%S}-{view or "unresolved"}-{uuid.uuid4().hex[:8]}'
+		directory = settings.PROFILING_DIR
+		os.makedirs(directory, exist_ok=True)
+		profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+		with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+			json.dump(
+				{
+					'id': profile_id,
+					'started': started.isoformat(),
+					'method': request.method,
+					'path': request.get_full_path(),
+					'view': view,
+					'status': response.status_code,
+					'wall_ms': wall * 1000,
+					'sql_ms': sum(query['duration'] for query in trace.queries) * 1000,
+					'queries': trace.queries,
+				},
+				f,
+				indent=2,
+			)
+		response['X-Profile-Id'] = profile_id
+		return response
@@ -0,0 +1,97 @@
+""" Routing of reads to a read replica.
+
+	Views opt in to reading from the replica for a request (see ReplicaReadViewMixin), and ReplicaRouter sends that
+	request's reads to settings.DATABASE_REPLICA. Everything else, including every write, uses the primary `default`
+	database. Without a replica configured, everything uses the primary.
+
+	The replica may lag behind the primary, so after a user writes, their reads stay on the primary for
+	settings.READ_YOUR_WRITES_WINDOW seconds (see RecentWrites). Data that is cached for other requests should be read
+	from the primary (see `read_from_primary`), so that a lagging read is not cached.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_read_database: ContextVar[str] = ContextVar('read_database', default=DEFAULT_DB_ALIAS)
+
+
+def get_replica_alias():
+	""" The alias of the replica, or None if there is none. """
+	alias = settings.DATABASE_REPLICA
+	return alias if alias in settings.DATABASES else None
+
+
+def is_reading_from_replica() -> bool:
+	return _read_database.get() != DEFAULT_DB_ALIAS
+
+
+def start_replica_reads():
+	""" Read from the replica, if there is one, until `end_replica_reads`. For views, whose reads are not one block.
+	"""
+	_read_database.set(get_replica_alias() or DEFAULT_DB_ALIAS)
+
+
+def end_replica_reads():
+	_read_database.set(DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def read_from_replica():
+	""" Read from the replica in the enclosed block, if there is one. """
+	token = _read_database.set(get_replica_alias() or DEFAULT_DB_ALIAS)
+	try:
+		yield
+	finally:
+		_read_database.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+	""" Read from the primary in the enclosed block, even within `read_from_replica`. """
+	token = _read_database.set(DEFAULT_DB_ALIAS)
+	try:
+		yield
+	finally:
+		_read_database.reset(token)
+
+
+class ReplicaRouter:
+	""" Database router that sends reads in `read_from_replica` blocks to the replica. The replica is never written to
+		or migrated; it is kept in sync from the primary (locally with the `sync_replica` command).
+	"""
+
+	def db_for_read(self, model, **hints):
+		return _read_database.get()
+
+	def db_for_write(self, model, **hints):
+		# Explicitly, since Django would otherwise write instances read from the replica back to it
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1, obj2, **hints):
+		# The replica holds the same rows as the primary
+		return True
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		return db != get_replica_alias()
+
+
+class RecentWrites:
+	""" Remembers, in the cache, which users wrote within the last settings.READ_YOUR_WRITES_WINDOW seconds. """
+
+	PREFIX = 'recent-write'
+
+	@staticmethod
+	def get_key(user_id: int) -> str:
+		return f'{RecentWrites.PREFIX}:{user_id}'
+
+	@staticmethod
+	def record(user):
+		cache.set(RecentWrites.get_key(user.pk), True, settings.READ_YOUR_WRITES_WINDOW)
+
+	@staticmethod
+	def has_written(user) -> bool:
+		return cache.get(RecentWrites.get_key(user.pk), False)
@@ -0,0 +1,243 @@
+""" Full-text search over essays and feedback responses, with an SQLite FTS5 index.
+
+	Essays and FeedbackResponses share one FTS5 table, with Essay names as titles. Each row's rowid encodes the object
+	(see SearchIndex.get_rowid), so updating or removing an object is a single lookup by rowid. The index is kept in
+	sync by the signal receivers in project.signals, and explicitly by code that bypasses signals, like bulk inserts
+	and FeedbackResponseManager.apply_delta. `rebuild_search_index` rebuilds it from scratch.
+
+	On databases other than SQLite the index does not exist, syncing it does nothing and searching raises
+	SearchNotSupportedError.
+"""
+
+import html
+import re
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from project.content_storage import STORAGE_FIELDS
+from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+
+ESSAY = 'essay'
+FEEDBACK_RESPONSE = 'feedback_response'
+KINDS = (ESSAY, FEEDBACK_RESPONSE)
+
+# Markers around matches in snippets, replaced after the rest of the snippet is escaped
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+
+class SearchNotSupportedError(Exception):
+	""" Error raised when searching on a database without FTS5. """
+
+
+class InvalidSearchQueryError(Exception):
+	""" Error raised for a search query without any terms. """
+
+
+@dataclass
+class SearchHit:
+	""" An object matching a search, with its bm25 score (lower is better) and an HTML snippet of the match. """
+
+	kind: str
+	pk: int
+	score: float
+	snippet: str
+
+
+def build_match_query(query: str) -> str:
+	""" Turn user input into an FTS5 query matching every term. Double-quoted parts are matched as phrases, and
+		nothing in the input is interpreted as FTS5 syntax.
+	"""
+	phrases = [phrase or term for phrase, term in re.findall(r'"([^"]*)"|(\S+)', query)]
+	phrases = [phrase for phrase in phrases if phrase.strip()]
+	if not phrases:
+		raise InvalidSearchQueryError()
+	return ' '.join('"' + phrase.replace('"', '""') + '"' for phrase in phrases)
+
+
+def format_snippet(snippet: str) -> str:
+	""" Escape a snippet for HTML, with matches wrapped in <mark>. """
+	return html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+class SearchIndex:
+	""" Maintains and queries the FTS5 index. See the module docstring. """
+
+	TABLE = 'project_search_index'
+	# bm25 weights of the title and body columns
+	WEIGHTS = (5.0, 1.0)
+	SNIPPET_TOKENS = 16
+
+	@staticmethod
+	def is_supported() -> bool:
+		return connection.vendor == 'sqlite'
+
+	@staticmethod
+	def create_table(database=None):
+		""" Create the index on a database connection (by default the default one), if it is SQLite and the index
+			does not exist.
+		"""
+		database = database or connection
+		if database.vendor != 'sqlite':
+			return
+		with database.cursor() as cursor:
+			cursor.execute(
+				f'CREATE VIRTUAL TABLE IF NOT EXISTS {SearchIndex.TABLE} USING fts5(title, body,'
+				f" tokenize='porter unicode61')"
+			)
+
+	@staticmethod
+	def get_rowid(kind: str, pk: int) -> int:
+		return pk * 2 + KINDS.index(kind)
+
+	@staticmethod
+	def index_essays(essays: Iterable[Essay]):
+		""" Add or update the specified Essays, whose names and content are read from the instances. """
+		if SearchIndex.is_supported():
+			SearchIndex._replace(
+				[(SearchIndex.get_rowid(ESSAY, essay.pk), essay.name, essay.content) for essay in essays]
+			)
+
+	@staticmethod
+	def index_essay_ids(essay_ids: Iterable[int]):
+		""" Add or update the specified Essays, loading them in one query. """
+		if SearchIndex.is_supported():
+			SearchIndex.index_essays(
+				Essay.objects.filter(pk__in=list(essay_ids)).only('pk', 'name', *STORAGE_FIELDS, 'revision_of')
+			)
+
+	@staticmethod
+	def index_feedback_responses(feedback_responses: Iterable[FeedbackResponse]):
+		""" Add or update the specified FeedbackResponses, whose content is read from the instances. """
+		if SearchIndex.is_supported():
+			SearchIndex._replace(
+				[
+					(SearchIndex.get_rowid(FEEDBACK_RESPONSE, feedback_response.pk), '', feedback_response.content)
+					for feedback_response in feedback_responses
+				]
+			)
+
+	@staticmethod
+	def index_feedback_response_ids(feedback_response_ids: Iterable[int]):
+		""" Add or update the specified FeedbackResponses in a single statement, without loading them. """
+		feedback_response_ids = list(feedback_response_ids)
+		if not SearchIndex.is_supported() or not feedback_response_ids:
+			return
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f'INSERT OR REPLACE INTO {SearchIndex.TABLE} (rowid, title, body)'
+				f' SELECT id * 2 + %s, \'\', content FROM {FeedbackResponse._meta.db_table}'
+				f' WHERE id IN ({", ".join(["%s"] * len(feedback_response_ids))})',
+				[KINDS.index(FEEDBACK_RESPONSE), *feedback_response_ids],
+			)
+
+	@staticmethod
+	def _replace(rows: List[tuple]):
+		if rows:
+			with connection.cursor() as cursor:
+				cursor.executemany(
+					f'INSERT OR REPLACE INTO {SearchIndex.TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows
+				)
+
+	@staticmethod
+	def remove(kind: str, pks: Iterable[int]):
+		rowids = [SearchIndex.get_rowid(kind, pk) for pk in pks]
+		if not SearchIndex.is_supported() or not rowids:
+			return
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f'DELETE FROM {SearchIndex.TABLE} WHERE rowid IN ({", ".join(["%s"] * len(rowids))})', rowids
+			)
+
+	@staticmethod
+	def rebuild(
+		batch_size: int = 2000, on_batch=None, essay_model=Essay, feedback_response_model=FeedbackResponse
+	) -> int:
+		""" Rebuild the index from scratch. Rows are copied with INSERT ... SELECT, except for essays whose content
+			is stored as a delta (see project.content_storage), which are reconstructed a batch at a time. `on_batch`,
+			if given, is called with the number of delta stored essays indexed so far. Migrations pass their
+			historical models. Returns the number of rows.
+		"""
+		if not SearchIndex.is_supported():
+			raise SearchNotSupportedError()
+		SearchIndex.create_table()
+		with transaction.atomic(), connection.cursor() as cursor:
+			cursor.execute(f'DELETE FROM {SearchIndex.TABLE}')
+			cursor.execute(
+				f'INSERT INTO {SearchIndex.TABLE} (rowid, title, body) SELECT id * 2 + %s, name, content'
+				f' FROM {essay_model._meta.db_table} WHERE content IS NOT NULL',
+				[KINDS.index(ESSAY)],
+			)
+			cursor.execute(
+				f'INSERT INTO {SearchIndex.TABLE} (rowid, title, body) SELECT id * 2 + %s, \'\', content'
+				f' FROM {feedback_response_model._meta.db_table}',
+				[KINDS.index(FEEDBACK_RESPONSE)],
+			)
+			essays = essay_model._default_manager.only('pk', 'name', *STORAGE_FIELDS, 'revision_of')
+			delta_ids = list(essays.filter(content__isnull=True).order_by('pk').values_list('pk', flat=True))
+			for start in range(0, len(delta_ids), batch_size):
+				SearchIndex.index_essays(essays.filter(pk__in=delta_ids[start:start + batch_size]))
+				if on_batch is not None:
+					on_batch(min(start + batch_size, len(delta_ids)))
+			cursor.execute(f"INSERT INTO {SearchIndex.TABLE} ({SearchIndex.TABLE}) VALUES ('optimize')")
+			cursor.execute(f'SELECT COUNT(*) FROM {SearchIndex.TABLE}')
+			return cursor.fetchone()[0]
+
+	@staticmethod
+	def get_readable_essays(user: User) -> QuerySet:
+		""" The ids of the Essays in EssayManager.query_for_user, as a union of two index lookups. Its OR across a join
+			scans every essay, which costs more than the search itself on large tables.
+		"""
+		return Essay.objects.filter(uploaded_by=user).values('pk').union(
+			FeedbackRequest.objects.filter(assigned_editors=user).values('essay')
+		)
+
+	@staticmethod
+	def search(query: str,
+				user: Optional[User] = None,
+				kind: Optional[str] = None,
+				limit: int = 20,
+				offset: int = 0) -> List[SearchHit]:
+		""" Search for `query` (see build_match_query), best matches first.
+
+			If `user` is given, only objects they can read are returned: Essays from EssayManager.query_for_user (see
+			get_readable_essays) and FeedbackResponses from FeedbackResponseManager.query_for_user, or everything for
+			superusers. `kind` limits the results to essays or to feedback responses.
+		"""
+		# Imported here since project.utilities syncs the index
+		from project.utilities import FeedbackResponseManager
+
+		if not SearchIndex.is_supported():
+			raise SearchNotSupportedError()
+		where = [f'{SearchIndex.TABLE} MATCH %s']
+		params: list = [build_match_query(query)]
+		if kind is not None:
+			where.append('rowid %% 2 = %s')
+			params.append(KINDS.index(kind))
+		if user is not None and not user.is_superuser:
+			readable = []
+			for readable_kind, queryset in (
+				(ESSAY, SearchIndex.get_readable_essays(user)),
+				(FEEDBACK_RESPONSE, FeedbackResponseManager.query_for_user(user).values('pk')),
+			):
+				sql, sql_params = queryset.query.sql_with_params()
+				readable.append(f'(rowid %% 2 = %s AND rowid / 2 IN ({sql}))')
+				params += [KINDS.index(readable_kind), *sql_params]
+			where.append(f'({" OR ".join(readable)})')
+
+		weights = ', '.join(str(weight) for weight in SearchIndex.WEIGHTS)
+		sql = (
+			f'SELECT rowid, bm25({SearchIndex.TABLE}, {weights}) AS score,'
+			f" snippet({SearchIndex.TABLE}, -1, %s, %s, '…', {SearchIndex.SNIPPET_TOKENS})"
+			f' FROM {SearchIndex.TABLE} WHERE {" AND ".join(where)} ORDER BY score, rowid LIMIT %s OFFSET %s'
+		)
+		with connection.cursor() as cursor:
+			cursor.execute(sql, [_MATCH_START, _MATCH_END, *params, limit, offset])
+			return [
+				SearchHit(kind=KINDS[rowid % 2], pk=rowid // 2, score=score, snippet=format_snippet(snippet))
+				for rowid, score, snippet in cursor.fetchall()
+			]
@@ -0,0 +1,229 @@
+import random
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+
+FeedbackRequestAssignment = FeedbackRequest.assigned_editors.through
+
+CHAIN_LENGTH_DISTRIBUTIONS = ('geometric', 'uniform', 'fixed')
+
+
+@dataclass
+class SeedResult:
+	""" Counts of the rows created by a ScaleSeeder. """
+
+	users: int = 0
+	essays: int = 0
+	feedback_requests: int = 0
+	assignments: int = 0
+	feedback_responses: int = 0
+
+
+class ScaleSeeder:
+	""" Generates large, realistic datasets for load and performance testing.
+
+		Essays are generated as revision chains whose lengths follow a configurable distribution. Each revision changes
+		a few sentences of its parent, as real revisions do. Every essay but the last in a chain has a finished
+		FeedbackResponse; the last is finished, in progress or unstarted according to the configured fractions, with at
+		most one response in progress per editor.
+
+		Everything but the timestamps set on insert (`User.date_joined`, `FeedbackResponse.created` and the `modified`
+		fields, which are `auto_now`) is deterministic given the seed. Rows are written with `bulk_create` and explicit
+		primary keys, `batch_size` users or essays (and their related rows) at a time, and every user shares one
+		pre-hashed password.
+	"""
+
+	BASE_TIME = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+	def __init__(
+		self,
+		seed: int = 0,
+		editors: int = 100,
+		uploaders: int = 100,
+		essays: int = 10000,
+		chain_length_distribution: str = 'geometric',
+		mean_chain_length: float = 3.0,
+		max_chain_length: int = 40,
+		request_fraction: float = 0.9,
+		editors_per_request: int = 2,
+		finished_fraction: float = 0.3,
+		in_progress_fraction: float = 0.1,
+		content_sentences: int = 20,
+		password: str = 'password',
+		prefix: Optional[str] = None,
+		batch_size: int = 5000,
+	):
+		if chain_length_distribution not in CHAIN_LENGTH_DISTRIBUTIONS:
+			raise ValueError(f'Unknown chain length distribution: {chain_length_distribution}')
+		self.rng = random.Random(seed)
+		self.num_editors = editors
+		self.num_uploaders = uploaders
+		self.num_essays = essays
+		self.chain_length_distribution = chain_length_distribution
+		self.mean_chain_length = mean_chain_length
+		self.max_chain_length = max_chain_length
+		self.request_fraction = request_fraction
+		self.editors_per_request = min(editors_per_request, editors)
+		self.finished_fraction = finished_fraction
+		self.in_progress_fraction = in_progress_fraction
+		self.content_sentences = content_sentences
+		self.password = password
+		self.prefix = prefix if prefix is not None else f'seed{seed}'
+		self.batch_size = batch_size
+
+		fake = Faker()
+		fake.seed_instance(seed)
+		self.words = fake.words(nb=2000)
+
+		self.result = SeedResult()
+		self.editor_ids: List[int] = []
+		self.uploader_ids: List[int] = []
+		self.idle_editor_ids: List[int] = []
+		self.next_ids: Dict[type, int] = {}
+		self.pending: Dict[type, list] = {}
+
+	def sentence(self) -> str:
+		words = self.rng.choices(self.words, k=self.rng.randint(6, 18))
+		return ' '.join(words).capitalize() + '.'
+
+	def chain_length(self) -> int:
+		if self.chain_length_distribution == 'fixed':
+			return self.max_chain_length
+		if self.chain_length_distribution == 'uniform':
+			return self.rng.randint(1, self.max_chain_length)
+		# Geometric with the requested mean, truncated at the maximum
+		p = 1 / max(self.mean_chain_length, 1)
+		length = 1
+		while length < self.max_chain_length and self.rng.random() > p:
+			length += 1
+		return length
+
+	def allocate_id(self, model) -> int:
+		if model not in self.next_ids:
+			self.next_ids[model] = (model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+		pk = self.next_ids[model]
+		self.next_ids[model] += 1
+		return pk
+
+	def add(self, instance):
+		self.pending.setdefault(type(instance), []).append(instance)
+
+	def flush(self):
+		""" Write the pending rows, parents before children, in one transaction. """
+		with transaction.atomic():
+			for model in (Essay, FeedbackRequest, FeedbackRequestAssignment, FeedbackResponse):
+				rows = self.pending.pop(model, [])
+				model.objects.bulk_create(rows, batch_size=1000)
+		self.pending = {}
+
+	def create_users(self):
+		password = make_password(self.password)
+		for role, count, is_staff in (('editor', self.num_editors, True), ('uploader', self.num_uploaders, False)):
+			ids = self.editor_ids if is_staff else self.uploader_ids
+			for start in range(0, count, self.batch_size):
+				users = []
+				for i in range(start, min(start + self.batch_size, count)):
+					username = f'{self.prefix}-{role}-{i}@example.com'
+					users.append(
+						User(
+							pk=self.allocate_id(User),
+							username=username,
+							email=username,
+							first_name=self.rng.choice(self.words).capitalize(),
+							last_name=self.rng.choice(self.words).capitalize(),
+							password=password,
+							is_staff=is_staff,
+						)
+					)
+				User.objects.bulk_create(users)
+				ids.extend(user.pk for user in users)
+				self.result.users += len(users)
+		self.idle_editor_ids = list(self.editor_ids)
+		self.rng.shuffle(self.idle_editor_ids)
+
+	def create_chain(self, length: int):
+		sentences = [self.sentence() for _ in range(self.content_sentences)]
+		uploader_id = self.rng.choice(self.uploader_ids or self.editor_ids)
+		name = ' '.join(self.rng.choices(self.words, k=5))
+		created = self.BASE_TIME + timedelta(minutes=self.result.essays)
+		parent_id = None
+		for depth in range(length):
+			if depth:
+				# Revise a few sentences
+				for _ in range(self.rng.randint(1, 3)):
+					sentences[self.rng.randrange(len(sentences))] = self.sentence()
+			essay = Essay(
+				pk=self.allocate_id(Essay),
+				name=name + (f' (Revision {depth})' if depth else ''),
+				uploaded_by_id=uploader_id,
+				content='\n\n'.join(sentences),
+				revision_of_id=parent_id,
+			)
+			self.add(essay)
+			self.result.essays += 1
+			parent_id = essay.pk
+			if self.rng.random() < self.request_fraction:
+				self.create_feedback_request(essay, created + timedelta(days=depth), last=depth == length - 1)
+
+	def create_feedback_request(self, essay: Essay, created: datetime, last: bool):
+		editor_ids = self.rng.sample(self.editor_ids, self.editors_per_request)
+		feedback_request = FeedbackRequest(
+			pk=self.allocate_id(FeedbackRequest), essay_id=essay.pk, deadline=created + timedelta(days=3)
+		)
+		self.add(feedback_request)
+		for editor_id in editor_ids:
+			self.add(FeedbackRequestAssignment(feedbackrequest_id=feedback_request.pk, user_id=editor_id))
+		self.result.feedback_requests += 1
+		self.result.assignments += len(editor_ids)
+
+		roll = self.rng.random()
+		if not last or roll < self.finished_fraction:
+			editor_id = self.rng.choice(editor_ids)
+			finished = True
+		elif roll < self.finished_fraction + self.in_progress_fraction and self.idle_editor_ids:
+			# An editor can only have one unfinished response
+			editor_id = self.idle_editor_ids.pop()
+			finished = False
+			if editor_id not in editor_ids:
+				self.add(FeedbackRequestAssignment(feedbackrequest_id=feedback_request.pk, user_id=editor_id))
+				self.result.assignments += 1
+		else:
+			return
+		self.add(
+			FeedbackResponse(
+				pk=self.allocate_id(FeedbackResponse),
+				feedback_request_id=feedback_request.pk,
+				editor_id=editor_id,
+				finished=finished,
+				finish_time=created + timedelta(hours=2) if finished else None,
+				content=' '.join(self.sentence() for _ in range(3)),
+			)
+		)
+		feedback_request.status = FeedbackRequest.Status.FINISHED if finished else FeedbackRequest.Status.IN_PROGRESS
+		feedback_request.active_editor_id = editor_id
+		self.result.feedback_responses += 1
+
+	def seed(self, on_batch=None) -> SeedResult:
+		""" Generate the dataset. `on_batch`, if given, is called with the running SeedResult after each batch. """
+		self.create_users()
+		pending_essays = 0
+		while self.result.essays < self.num_essays:
+			before = self.result.essays
+			self.create_chain(min(self.chain_length(), self.num_essays - self.result.essays))
+			pending_essays += self.result.essays - before
+			if pending_essays >= self.batch_size:
+				self.flush()
+				pending_essays = 0
+				if on_batch:
+					on_batch(self.result)
+		self.flush()
+		return self.result
@@ -1,6 +1,91 @@
+from typing import Dict, Iterable, Optional, Set
+
+from django.db import models
 from rest_framework import serializers
 
+from project.diffs import EssayDiffCache
 from project.models import Essay, FeedbackRequest, FeedbackResponse
+from project.timing import timed
+from project.utilities import PreviousRevisionLoader
+
+
+class TimedSerializerMixin:
+	""" Serializer mixin that records the time spent building `data` as `serialize` in the request's timings.
+		See project.timing.
+	"""
+
+	@property
+	def data(self):
+		with timed('serialize'):
+			return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+	""" A ListSerializer that records serialization time. """
+
+
+class SparseFieldsetMixin:
+	""" Serializer mixin that limits output to the fields named in context['fields'] and context['exclude'].
+
+		Both are sets of field paths, where nested serializer fields are addressed with dots. For example,
+		{'pk', 'essay.name'} includes only the pk and the essay's name, while excluding {'essay.content'} keeps
+		everything but the essay's content. Naming a nested serializer includes or excludes it whole.
+	"""
+
+	FIELDS = 'fields'
+	EXCLUDE = 'exclude'
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		prune_fields(self, self.context.get(self.FIELDS), self.context.get(self.EXCLUDE))
+
+	@classmethod
+	def is_field_requested(cls, context: dict, path: str) -> bool:
+		""" Whether the field at the dotted path will be serialized, given the fieldsets in context. """
+		prefixes = {'.'.join(path.split('.')[:i + 1]) for i in range(path.count('.') + 1)}
+		fields = context.get(cls.FIELDS)
+		if fields is not None and not (prefixes & fields):
+			return False
+		return not (prefixes & context.get(cls.EXCLUDE, set()))
+
+
+def _group_field_paths(paths: Iterable[str]) -> Dict[str, Optional[Set[str]]]:
+	""" Group dotted field paths by their first component. A value of None means the whole field was named. """
+	groups: Dict[str, Optional[Set[str]]] = {}
+	for path in paths:
+		name, _, rest = path.partition('.')
+		if not rest:
+			groups[name] = None
+		elif groups.get(name, set()) is not None:
+			groups.setdefault(name, set()).add(rest)
+	return groups
+
+
+def _nested_serializer(field) -> Optional[serializers.Serializer]:
+	if isinstance(field, serializers.ListSerializer):
+		field = field.child
+	return field if isinstance(field, serializers.Serializer) else None
+
+
+def prune_fields(serializer: serializers.Serializer, fields: Optional[Set[str]], exclude: Optional[Set[str]]):
+	""" Remove fields from a serializer (and its nested serializers) according to dotted include/exclude paths. """
+	if fields is not None:
+		included = _group_field_paths(fields)
+		for name in list(serializer.fields):
+			if name not in included:
+				serializer.fields.pop(name)
+			elif included[name] is not None:
+				nested = _nested_serializer(serializer.fields[name])
+				if nested is not None:
+					prune_fields(nested, included[name], None)
+	for name, nested_exclude in _group_field_paths(exclude or ()).items():
+		if name not in serializer.fields:
+			continue
+		nested = _nested_serializer(serializer.fields[name])
+		if nested_exclude is None:
+			serializer.fields.pop(name)
+		elif nested is not None:
+			prune_fields(nested, None, nested_exclude)
 
 
 class EssaySerializer(serializers.ModelSerializer):
@@ -17,25 +102,65 @@ class EssaySerializer(serializers.ModelSerializer):
 		)
 
 
-class FeedbackRequestSerializer(serializers.ModelSerializer):
+class EssayContentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+	""" Serialize only the content of an Essay, for loading it on demand. """
+
+	class Meta:
+		model = Essay
+		fields = ('pk', 'content')
+
+
+class FeedbackRequestSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
 	""" Serialize a FeedbackRequest. """
 
 	essay = EssaySerializer()
 
 	class Meta:
 		model = FeedbackRequest
+		list_serializer_class = TimedListSerializer
 		fields = ('pk', 'essay', 'deadline')
 
 
-class FeedbackResponseSerializer(serializers.ModelSerializer):
+class FeedbackResponseListSerializer(TimedListSerializer):
+	""" Serialize many FeedbackResponses, loading feedback on previous revisions for all of them at once. """
+
+	def prepare(self, data):
+		""" Load feedback on previous revisions for all of the data, if it is requested. Returns the data to serialize.
+		"""
+		if self.context.get(FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS):
+			data = list(data.all() if isinstance(data, models.Manager) else data)
+			include_diffs = self.context.get(FeedbackResponseSerializer.PREVIOUS_REVISION_DIFFS)
+			loader = self.child.previous_revision_loader = PreviousRevisionLoader.for_feedback_responses(
+				data, include_content=not include_diffs
+			)
+			if include_diffs:
+				essays = [feedback_response.feedback_request.essay for feedback_response in data]
+				self.child.previous_revision_diffs = EssayDiffCache.get_many_diffs({
+					essay: [feedback_request.essay for feedback_request in loader.get_feedback_requests(essay)]
+					for essay in essays
+				})
+		return data
+
+	def to_representation(self, data):
+		return super().to_representation(self.prepare(data))
+
+
+class FeedbackResponseSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
 	""" Serialize a FeedbackResponse. """
 
 	INCLUDE_PREVIOUS_REVISIONS = 'previous_revisions'
+	# Replace the content of previous revisions with diffs to the essay being edited
+	PREVIOUS_REVISION_DIFFS = 'previous_revision_diffs'
 
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		if not self.context.get(self.INCLUDE_PREVIOUS_REVISIONS):
-			self.fields.pop('previous_revision_feedback')
+			self.fields.pop('previous_revision_feedback', None)
+
+	# Set by FeedbackResponseListSerializer to share one PreviousRevisionLoader, and the diffs it loaded for every
+	# object, across many objects
+	previous_revision_loader = None
+	previous_revision_diffs = None
 
 	previous_revision_feedback = serializers.SerializerMethodField()
 	feedback_request = FeedbackRequestSerializer(read_only=True)
@@ -45,22 +170,65 @@ class FeedbackResponseSerializer(serializers.ModelSerializer):
 
 			This is represented as a list of FeedbackRequests on Essays of which the essay being edited is a revision.
 
-			This field is only included if context['previous_revisions'] == True.
+			This field is only included if context['previous_revisions'] == True. If
+			context['previous_revision_diffs'] == True, each Essay has a `diff` from it to the essay being edited
+			instead of its content. See diff_content.
 		"""
-		previous_feedback_requests = []
-		essay: Essay = obj.feedback_request.essay
-		while essay.revision_of:
-			essay = essay.revision_of
-			if hasattr(essay, 'feedback_request') and essay.feedback_request is not None:
-				previous_feedback_requests.append(essay.feedback_request)
-		return FeedbackRequestSerializer(previous_feedback_requests, many=True).data
+		essay = obj.feedback_request.essay
+		include_diffs = self.context.get(self.PREVIOUS_REVISION_DIFFS, False)
+		loader = self.previous_revision_loader or PreviousRevisionLoader([essay], include_content=not include_diffs)
+		previous_feedback_requests = loader.get_feedback_requests(essay)
+		if not include_diffs:
+			return FeedbackRequestSerializer(previous_feedback_requests, many=True).data
+
+		data = FeedbackRequestSerializer(
+			previous_feedback_requests, many=True, context={'exclude': {'essay.content'}}
+		).data
+		if self.previous_revision_diffs is not None:
+			diffs = self.previous_revision_diffs.get(essay.pk, {})
+		else:
+			diffs = EssayDiffCache.get_diffs(
+				essay, (feedback_request.essay for feedback_request in previous_feedback_requests)
+			)
+		for feedback_request in data:
+			feedback_request['essay']['diff'] = diffs[feedback_request['essay']['pk']]
+		return data
 
 	class Meta:
 		model = FeedbackResponse
+		list_serializer_class = FeedbackResponseListSerializer
 		fields = (
-			'pk', 'feedback_request', 'created', 'finished', 'finish_time', 'editor', 'content',
+			'pk', 'feedback_request', 'created', 'finished', 'finish_time', 'editor', 'content', 'version',
 			'previous_revision_feedback'
 		)
 		read_only_fields = (
-			'pk', 'feedback_request', 'created', 'finished', 'finish_time', 'editor', 'previous_revision_feedback'
+			'pk', 'feedback_request', 'created', 'finished', 'finish_time', 'editor', 'version',
+			'previous_revision_feedback'
 		)
+
+
+class TextOperationSerializer(serializers.Serializer):
+	""" Deserialize a single text operation: replace `delete` characters at `offset` with `insert`. """
+
+	offset = serializers.IntegerField(min_value=0)
+	delete = serializers.IntegerField(min_value=0, default=0)
+	insert = serializers.CharField(allow_blank=True, trim_whitespace=False, default='')
+
+
+class FeedbackResponseDeltaSerializer(serializers.Serializer):
+	""" Deserialize a delta update to the content of a FeedbackResponse. See FeedbackResponseManager.apply_delta. """
+
+	MAX_OPERATIONS = 100
+
+	version = serializers.IntegerField(min_value=0)
+	operations = serializers.ListField(
+		child=TextOperationSerializer(), min_length=1, max_length=MAX_OPERATIONS
+	)
+
+	def validate_operations(self, operations):
+		position = 0
+		for operation in operations:
+			if operation['offset'] < position:
+				raise serializers.ValidationError('Operations must be sorted by offset and must not overlap.')
+			position = operation['offset'] + operation['delete']
+		return operations
@@ -0,0 +1,116 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from project.authentication import UserCache
+from project.caching import FeedbackRequestQueueCache
+from project.content_storage import EssayContentStore
+from project.database import configure_connection
+from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+from project.search import ESSAY, FEEDBACK_RESPONSE, SearchIndex
+from project.utilities import FeedbackRequestManager
+
+
+@receiver(post_save, sender=FeedbackResponse)
+def sync_feedback_request_status(sender, instance: FeedbackResponse, **kwargs):
+	""" Keep FeedbackRequest.status in sync when a FeedbackResponse is created, finished or reassigned. """
+	FeedbackRequestManager.sync_status_for_response(instance)
+
+
+@receiver(post_delete, sender=FeedbackResponse)
+def refresh_feedback_request_status(sender, instance: FeedbackResponse, **kwargs):
+	""" Recompute FeedbackRequest.status when a FeedbackResponse is deleted. """
+	FeedbackRequestManager.refresh_status(instance.feedback_request_id)
+
+
+@receiver(post_save, sender=FeedbackRequest)
+@receiver(pre_delete, sender=FeedbackRequest)
+def invalidate_queues_for_feedback_request(sender, instance: FeedbackRequest, **kwargs):
+	""" Invalidate the cached queues of the editors assigned to a FeedbackRequest that is edited or deleted. """
+	if not kwargs.get('created'):
+		FeedbackRequestQueueCache.invalidate_feedback_requests([instance.pk])
+
+
+@receiver(post_save, sender=Essay)
+def invalidate_queues_for_essay(sender, instance: Essay, created: bool, **kwargs):
+	""" Invalidate the cached queues that include an Essay that is edited. """
+	if not created:
+		FeedbackRequestQueueCache.invalidate_essays([instance.pk])
+
+
+@receiver(pre_save, sender=Essay)
+@receiver(pre_delete, sender=Essay)
+def materialize_essay_revisions(sender, instance: Essay, update_fields=None, **kwargs):
+	""" Store the revisions that are deltas against an Essay in full before its content changes or it is deleted. """
+	if instance._state.adding or (update_fields is not None and 'content' not in update_fields):
+		return
+	EssayContentStore.materialize(Essay.objects.filter(revision_of=instance.pk))
+
+
+@receiver(post_save, sender=Essay)
+@receiver(post_delete, sender=Essay)
+def invalidate_essay_content(sender, instance: Essay, **kwargs):
+	""" Drop the cached reconstruction of an Essay's content when it is saved or deleted. """
+	EssayContentStore.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=FeedbackRequest.assigned_editors.through)
+def invalidate_queues_for_assignments(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+	""" Invalidate the cached queues of editors who are assigned or unassigned. """
+	if action not in ('post_add', 'post_remove', 'pre_clear'):
+		return
+	if reverse:
+		FeedbackRequestQueueCache.invalidate_users([instance.pk])
+	elif action == 'pre_clear':
+		FeedbackRequestQueueCache.invalidate_feedback_requests([instance.pk])
+	else:
+		FeedbackRequestQueueCache.invalidate_users(pk_set)
+
+
+@receiver(post_save, sender=Essay)
+def index_essay(sender, instance: Essay, **kwargs):
+	""" Add or update an Essay in the search index. """
+	SearchIndex.index_essays([instance])
+
+
+@receiver(post_save, sender=FeedbackResponse)
+def index_feedback_response(sender, instance: FeedbackResponse, **kwargs):
+	""" Add or update a FeedbackResponse in the search index. """
+	SearchIndex.index_feedback_responses([instance])
+
+
+@receiver(post_delete, sender=Essay)
+def unindex_essay(sender, instance: Essay, **kwargs):
+	SearchIndex.remove(ESSAY, [instance.pk])
+
+
+@receiver(post_delete, sender=FeedbackResponse)
+def unindex_feedback_response(sender, instance: FeedbackResponse, **kwargs):
+	SearchIndex.remove(FEEDBACK_RESPONSE, [instance.pk])
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using: str, **kwargs):
+	""" Create the search index where the schema is created without migrations, as in tests. """
+	if sender.name == 'project':
+		SearchIndex.create_table(connections[using])
+
+
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+	configure_connection(connection)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+	""" Saving a user, e.g. to change their password, must not leave sessions authenticated with the old one. """
+	UserCache.invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+	if user is not None:
+		UserCache.invalidate(user.pk)
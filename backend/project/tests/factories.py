@@ -0,0 +1,43 @@
+from typing import Optional
+from django.utils import timezone
+from faker import Faker
+
+from project.models import Essay, FeedbackRequest, User
+
+USER_PASSWORD = '12345'
+JSON = 'application/json'
+
+
+def user_factory(is_superuser=False) -> User:
+	fake = Faker()
+	email = fake.email()
+	u = User.objects.create(
+		first_name=fake.first_name(),
+		last_name=fake.last_name(),
+		username=email,
+		email=email,
+		is_superuser=is_superuser,
+		is_staff=is_superuser
+	)
+	u.set_password(USER_PASSWORD)
+	u.save()
+	return u
+
+
+def essay_factory(revision_of: Optional[Essay] = None, content: Optional[str] = None) -> Essay:
+	fake = Faker()
+	admin_user = User.objects.filter(is_superuser=True).first() or user_factory(is_superuser=True)
+	return Essay.objects.create(
+		name=' '.join(fake.words(nb=5)),
+		uploaded_by=admin_user,
+		content=fake.paragraph(nb_sentences=5) if content is None else content,
+		revision_of=revision_of,
+	)
+
+
+def feedback_request_factory(essay: Essay, assign=False) -> FeedbackRequest:
+	""" Create a feedback request. """
+	feedback_request = FeedbackRequest.objects.create(essay=essay, deadline=timezone.now())
+	if assign:
+		feedback_request.assigned_editors.add(*User.objects.all())
+	return feedback_request
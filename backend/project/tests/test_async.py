@@ -0,0 +1,136 @@
+import json
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+
+from project.models import FeedbackResponse
+from project.utilities import FeedbackResponseManager
+from prompt.asgi import application
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestAsyncViews(TestCase):
+	""" Test that the async views behave as the sync views do. """
+
+	def setUp(self):
+		self.user = user_factory()
+		essays = [essay_factory() for _ in range(3)]
+		for essay in essays:
+			feedback_request_factory(essay, assign=True)
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, essays[0].feedback_request
+		)
+		self.async_client = AsyncClient()
+		self.async_client.force_login(self.user)
+		self.client.force_login(self.user)
+
+	@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+	async def test_reads(self):
+		""" Test that the async list and detail endpoints return what the sync ones do, and answer conditional GETs.
+		"""
+		cache.clear()
+		for async_name, name, kwargs in [
+			('async-feedback-request-list', 'feedback-request-list', {}),
+			('async-feedback-response-list', 'feedback-response-list', {}),
+			('async-feedback-response-detail', 'feedback-response-detail', {
+				'pk': self.feedback_response.pk
+			}),
+		]:
+			response = await self.async_client.get(reverse(async_name, kwargs=kwargs))
+			self.assertEqual(response.status_code, 200)
+			expected = await sync_to_async(self.client.get)(reverse(name, kwargs=kwargs))
+			self.assertEqual(response.json(), expected.json())
+			not_modified = await self.async_client.get(
+				reverse(async_name, kwargs=kwargs), **{'If-None-Match': response['ETag']}
+			)
+			self.assertEqual(not_modified.status_code, 304)
+
+	async def test_delta(self):
+		""" Test autosaving with the async delta endpoint. """
+		url = reverse('async-feedback-response-delta', kwargs={'pk': self.feedback_response.pk})
+		body = {'version': 0, 'operations': [{'offset': 0, 'delete': 0, 'insert': 'Hello'}]}
+		response = await self.async_client.patch(url, body, content_type='application/json')
+		self.assertEqual(response.json(), {'pk': self.feedback_response.pk, 'version': 1})
+		response = await self.async_client.patch(url, body, content_type='application/json')
+		self.assertEqual(response.status_code, 409)
+		feedback_response = await sync_to_async(FeedbackResponse.objects.get)(pk=self.feedback_response.pk)
+		self.assertEqual(feedback_response.content, 'Hello')
+
+	async def asgi_get(self, path: str, query_string: bytes = b'') -> bytes:
+		""" GET the path from the ASGI application, which sends responses as it would to a server, and return the body.
+		"""
+		cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+		scope = {
+			'type': 'http',
+			'method': 'GET',
+			'path': path,
+			'query_string': query_string,
+			'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+		}
+		messages = []
+
+		async def receive():
+			return {'type': 'http.request'}
+
+		async def send(message):
+			messages.append(message)
+
+		# As the test client does, so that the test's transaction is not closed
+		request_started.disconnect(close_old_connections)
+		request_finished.disconnect(close_old_connections)
+		try:
+			await application(scope, receive, send)
+		finally:
+			request_started.connect(close_old_connections)
+			request_finished.connect(close_old_connections)
+		self.assertEqual(messages[0]['status'], 200)
+		return b''.join(message.get('body', b'') for message in messages[1:])
+
+	async def test_streamed_lists(self):
+		""" Test that `?stream=true` lists can be served under ASGI, by the async views and the sync ones. """
+		for async_name, name in [
+			('async-feedback-request-list', 'feedback-request-list'),
+			('async-feedback-response-list', 'feedback-response-list'),
+		]:
+			expected = (await sync_to_async(self.client.get)(reverse(name))).json()
+			self.assertEqual(json.loads(await self.asgi_get(reverse(async_name), b'stream=true')), expected)
+			self.assertEqual(json.loads(await self.asgi_get(reverse(name), b'stream=true')), expected)
+
+	@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+	async def test_server_timing(self):
+		""" Test that sampled requests count the queries of async views. """
+		with self.assertLogs('project.timing') as logs:
+			response = await self.async_client.get(reverse('async-feedback-response-list'))
+		metrics = {metric.split(';')[0] for metric in response['Server-Timing'].split(', ')}
+		self.assertEqual(metrics, {'db', 'serialize', 'view', 'total'})
+		self.assertGreater(logs.records[0].timings['db_queries'], 0)
+
+	async def test_permissions(self):
+		""" Test that the async views require authentication and scope objects to the user. """
+		response = await AsyncClient().get(reverse('async-feedback-request-list'))
+		self.assertEqual(response.status_code, 403)
+		other = await sync_to_async(user_factory)()
+		client = AsyncClient()
+		await sync_to_async(client.force_login)(other)
+		response = await client.get(
+			reverse('async-feedback-response-detail', kwargs={'pk': self.feedback_response.pk})
+		)
+		self.assertEqual(response.status_code, 404)
+		response = await client.patch(
+			reverse('async-feedback-response-delta', kwargs={'pk': self.feedback_response.pk}), {
+				'version': 0,
+				'operations': [{
+					'offset': 0,
+					'delete': 0,
+					'insert': 'Hello'
+				}]
+			},
+			content_type='application/json'
+		)
+		self.assertEqual(response.status_code, 404)
@@ -0,0 +1,222 @@
+import json
+
+from io import StringIO
+
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+
+from project.assignment import FeedbackRequestAssigner
+from project.authentication import UserCache
+from project.caching import FeedbackRequestQueueCache
+from project.models import FeedbackRequest
+from project.serializers import FeedbackResponseSerializer
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import JSON, user_factory, essay_factory, feedback_request_factory
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestFeedbackRequestQueueCache(TestCase):
+	""" Test caching of editor queues. """
+
+	def setUp(self):
+		cache.clear()
+		FeedbackRequestQueueCache.reset_stats()
+		self.user = user_factory()
+		self.other_user = user_factory()
+		self.bystander = user_factory()
+		self.feedback_request = feedback_request_factory(essay_factory(), assign=True)
+		self.feedback_request.assigned_editors.remove(self.bystander)
+		self.url = reverse('feedback-request-list')
+
+	def get_queue(self, user):
+		self.client.force_login(user)
+		response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		return response['X-Cache'], [feedback_request['pk'] for feedback_request in json.loads(response.content)]
+
+	def assertCached(self, *users):
+		for user in users:
+			self.assertEqual(self.get_queue(user)[0], 'HIT')
+
+	def test_queue_is_cached(self):
+		""" Test that queues are cached per user, and that parameterized lists are not cached. """
+		self.assertEqual(self.get_queue(self.user), ('MISS', [self.feedback_request.pk]))
+		with self.assertNumQueries(0):  # The session and user are cached too
+			response = self.client.get(self.url)
+		self.assertEqual(response['X-Cache'], 'HIT')
+		self.assertEqual(self.get_queue(self.user), ('HIT', [self.feedback_request.pk]))
+		self.assertEqual(self.get_queue(self.bystander), ('MISS', []))
+		self.assertNotIn('X-Cache', self.client.get(self.url, {'fields': 'pk'}))
+		self.assertEqual(FeedbackRequestQueueCache.get_stats(), {'hits': 2, 'misses': 2})
+
+		out = StringIO()
+		call_command('queue_cache_stats', reset=True, stdout=out)
+		self.assertIn('2 hits, 2 misses', out.getvalue())
+		self.assertEqual(FeedbackRequestQueueCache.get_stats(), {'hits': 0, 'misses': 0})
+
+	def test_invalidated_by_responses(self):
+		""" Test that starting and finishing responses invalidates the queues of the request's editors only. """
+		for user in (self.user, self.other_user, self.bystander):
+			self.get_queue(user)
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		self.assertEqual(self.get_queue(self.user), ('MISS', [self.feedback_request.pk]))
+		self.assertEqual(self.get_queue(self.other_user), ('MISS', []))
+		self.assertCached(self.bystander)
+
+		FeedbackResponseManager(feedback_response).finish()
+		self.assertEqual(self.get_queue(self.user), ('MISS', []))
+		self.assertCached(self.other_user, self.bystander)
+
+	def test_invalidated_by_edits(self):
+		""" Test that assignment changes and Essay and FeedbackRequest edits invalidate the affected queues. """
+		for user in (self.user, self.other_user, self.bystander):
+			self.get_queue(user)
+		self.feedback_request.assigned_editors.add(self.bystander)
+		self.assertEqual(self.get_queue(self.bystander), ('MISS', [self.feedback_request.pk]))
+		self.assertCached(self.user, self.other_user)
+
+		self.bystander.assigned_feedback_requests.remove(self.feedback_request)
+		self.assertEqual(self.get_queue(self.bystander), ('MISS', []))
+
+		essay = self.feedback_request.essay
+		essay.name = 'Renamed'
+		essay.save()
+		self.client.force_login(self.user)
+		response = self.client.get(self.url)
+		self.assertEqual(response['X-Cache'], 'MISS')
+		self.assertEqual(json.loads(response.content)[0]['essay']['name'], 'Renamed')
+		self.assertCached(self.bystander)
+
+		self.feedback_request.deadline = timezone.now()
+		self.feedback_request.save()
+		self.assertEqual(self.get_queue(self.user)[0], 'MISS')
+		self.assertEqual(self.get_queue(self.other_user)[0], 'MISS')
+
+		FeedbackRequestAssigner(editors=[self.bystander]).assign(FeedbackRequest.objects.all())
+		self.assertEqual(self.get_queue(self.bystander), ('MISS', [self.feedback_request.pk]))
+		self.assertCached(self.user)
+
+		self.feedback_request.delete()
+		self.assertEqual(self.get_queue(self.user), ('MISS', []))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestConditionalGets(TestCase):
+	""" Test ETag and Last-Modified handling in the feedback request and response viewsets. """
+
+	def setUp(self):
+		cache.clear()
+		FeedbackRequestQueueCache.reset_stats()
+		self.user = user_factory()
+		self.other_user = user_factory()
+		self.previous_essay = essay_factory()
+		feedback_request_factory(self.previous_essay, assign=True)
+		self.feedback_request = feedback_request_factory(essay_factory(revision_of=self.previous_essay), assign=True)
+		self.client.force_login(self.user)
+
+	def assertNotModified(self, url, num_queries=0, **headers):
+		with self.assertNumQueries(num_queries):  # Anything the version needs; the session and user are cached
+			response = self.client.get(url, **headers)
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response.content, b'')
+
+	def test_queue(self):
+		""" Test that the queue's ETag changes when a request leaves it. """
+		url = reverse('feedback-request-list')
+		response = self.client.get(url)
+		etag = response['ETag']
+		self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertNotModified(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+		self.assertNotEqual(self.client.get(url, {'fields': 'pk'})['ETag'], etag)
+
+		FeedbackResponseManager.create_for_feedback_request(self.other_user, self.feedback_request)
+		response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response['ETag'], etag)
+		self.assertEqual(len(json.loads(response.content)), 1)
+
+	def test_feedback_response(self):
+		""" Test that response ETags change with the response, its essay and feedback on previous revisions. """
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		url = reverse('feedback-response-detail', kwargs={'pk': feedback_response.pk})
+		list_url = reverse('feedback-response-list')
+		etag = self.client.get(url)['ETag']
+		list_etag = self.client.get(list_url)['ETag']
+		self.assertNotEqual(etag, list_etag)
+		# The response and its essay, then the previous revisions' essays and their feedback requests
+		self.assertNotModified(url, num_queries=4, HTTP_IF_NONE_MATCH=etag)
+		self.assertNotModified(list_url, num_queries=1, HTTP_IF_NONE_MATCH=list_etag)
+		self.client.force_login(self.other_user)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+		self.client.force_login(self.user)
+
+		def assertChanged():
+			nonlocal etag, list_etag
+			response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+			self.assertEqual(response.status_code, 200)
+			self.assertNotEqual(response['ETag'], etag)
+			etag = response['ETag']
+			response = self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+			list_etag = response['ETag']
+			return response
+
+		data = FeedbackResponseSerializer(feedback_response).data
+		data['content'] = 'Edited'
+		self.client.put(url, json.dumps(data), content_type=JSON)
+		self.assertEqual(assertChanged().status_code, 200)
+
+		self.client.patch(
+			reverse('feedback-response-delta', kwargs={'pk': feedback_response.pk}),
+			json.dumps({
+				'version': 1,
+				'operations': [{
+					'offset': 0,
+					'insert': 'Re-'
+				}]
+			}),
+			content_type=JSON
+		)
+		self.assertEqual(assertChanged().status_code, 200)
+
+		self.feedback_request.essay.save()
+		self.assertEqual(assertChanged().status_code, 200)
+
+		# Only the detail view includes feedback on previous revisions
+		self.previous_essay.name = 'Renamed'
+		self.previous_essay.save()
+		self.assertEqual(assertChanged().status_code, 304)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestCachedAuthentication(TestCase):
+	""" Test that sessions and authenticated users are cached, and that the cached users are invalidated. """
+
+	def setUp(self):
+		cache.clear()
+		self.user = user_factory()
+		self.client.force_login(self.user)
+		self.url = reverse('platform')
+
+	def test_user_is_cached(self):
+		with self.assertNumQueries(1):  # The user
+			self.assertEqual(self.client.get(self.url).status_code, 200)
+		self.assertEqual(UserCache.get(self.user.pk), self.user)
+		with self.assertNumQueries(0):
+			self.assertEqual(self.client.get(self.url).status_code, 200)
+
+	def test_password_change(self):
+		""" Test that changing a password logs out the sessions authenticated with the old one. """
+		self.client.get(self.url)
+		self.user.set_password('changed')
+		self.user.save()
+		self.assertIsNone(UserCache.get(self.user.pk))
+		self.assertEqual(self.client.get(self.url).status_code, 403)
+
+	def test_logout(self):
+		self.client.get(self.url)
+		self.assertEqual(self.client.post(reverse('user-logout')).status_code, 204)
+		self.assertIsNone(UserCache.get(self.user.pk))
+		self.assertEqual(self.client.get(self.url).status_code, 403)
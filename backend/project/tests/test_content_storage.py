@@ -0,0 +1,219 @@
+from faker import Faker
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from project.diffs import diff_content
+from project.content_storage import DELTA, FULL, STORAGE_FIELDS, STORAGE_MODES, EssayContentStore, apply_delta, encode_delta
+from project.models import Essay, FeedbackRequest
+from project.fast_serializers import compile_serializer
+from project.serializers import FeedbackRequestSerializer
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+@override_settings(ESSAY_CONTENT_STORAGE=DELTA, ESSAY_CONTENT_KEYFRAME_INTERVAL=3)
+class TestEssayContentStorage(TestCase):
+	""" Test storing essay revisions as deltas. """
+
+	def setUp(self):
+		fake = Faker()
+		self.paragraphs = [fake.paragraph(nb_sentences=5) for _ in range(20)]
+		self.contents = []
+		self.essays = []
+		for i in range(7):
+			self.paragraphs[i] = fake.paragraph(nb_sentences=5)
+			self.contents.append('\n\n'.join(self.paragraphs))
+			self.essays.append(
+				essay_factory(revision_of=self.essays[-1] if self.essays else None, content=self.contents[-1])
+			)
+
+	def assertContents(self):
+		for essay, content in zip(self.essays, self.contents):
+			self.assertEqual(Essay.objects.get(pk=essay.pk).content, content)
+			self.assertEqual(Essay.objects.only('pk').get(pk=essay.pk).content, content)
+
+	def get_storage(self):
+		return list(Essay.objects.order_by('pk').values_list('content', 'content_keyframe_distance'))
+
+	def test_codec(self):
+		""" Test that deltas reproduce the content exactly, including line endings. """
+		for base, content in [('', ''), ('a\nb\n', 'a\nc\nb'), ('a\r\nb', 'a\r\nb\r\n'), ('x\n', '')]:
+			self.assertEqual(apply_delta(base, encode_delta(base, content)), content)
+
+	def test_revisions_are_deltas(self):
+		""" Test that revisions are stored as deltas between keyframes, and read back transparently. """
+		self.assertEqual([distance for _, distance in self.get_storage()], [0, 1, 2, 0, 1, 2, 0])
+		self.assertEqual([content is None for content, _ in self.get_storage()], [False, True, True] * 2 + [False])
+		self.assertContents()
+		self.client.force_login(self.essays[2].uploaded_by)
+		response = self.client.get(reverse('essay-content', kwargs={'pk': self.essays[2].pk}))
+		self.assertEqual(response.json()['content'], self.contents[2])
+
+		# A revision that shares nothing with its parent is stored in full
+		essay = essay_factory(revision_of=self.essays[-1], content='Something else entirely.')
+		self.assertEqual(
+			Essay.objects.filter(pk=essay.pk).values_list(*STORAGE_FIELDS).get(),
+			('Something else entirely.', None, 0)
+		)
+
+	def test_parent_changes(self):
+		""" Test that revisions keep their content when the essay they are a delta against is edited or deleted. """
+		self.essays[1].content = 'Rewritten.'
+		self.essays[1].save()
+		self.contents[1] = 'Rewritten.'
+		self.essays[4].delete()
+		del self.essays[4], self.contents[4]
+		self.assertContents()
+		self.assertIsNotNone(Essay.objects.get(pk=self.essays[2].pk).__dict__['content'])
+
+	def test_reparent(self):
+		""" Test that a revision keeps its content when it is moved to another parent or one is inserted before it. """
+		essay = Essay.objects.get(pk=self.essays[2].pk)
+		essay.revision_of = self.essays[4]
+		essay.save()
+		essay = Essay.objects.only('pk').get(pk=self.essays[5].pk)
+		essay.revision_of = essay_factory(revision_of=self.essays[4], content='Inserted.')
+		essay.save(update_fields=['revision_of'])
+		cache.clear()
+		self.assertContents()
+
+	def test_content_is_required(self):
+		""" Test that essays cannot be saved without content, even though the content column is nullable. """
+		for storage in STORAGE_MODES:
+			with override_settings(ESSAY_CONTENT_STORAGE=storage):
+				with self.assertRaises(ValidationError):
+					Essay.objects.create(
+						name='Empty', uploaded_by=self.essays[0].uploaded_by, revision_of=self.essays[-1]
+					)
+				with self.assertRaises(ValidationError):
+					Essay.objects.bulk_create([Essay(name='Empty', uploaded_by=self.essays[0].uploaded_by)])
+
+	@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+	def test_reconstruction_is_cached(self):
+		""" Test that reconstructed content is cached until the essay is saved. """
+		cache.clear()
+		with self.assertNumQueries(3):
+			self.assertEqual(Essay.objects.get(pk=self.essays[2].pk).content, self.contents[2])
+		with self.assertNumQueries(1):
+			self.assertEqual(Essay.objects.get(pk=self.essays[2].pk).content, self.contents[2])
+		Essay.objects.get(pk=self.essays[2].pk).save()
+		self.assertIsNone(cache.get(EssayContentStore.get_cache_key(self.essays[2].pk)))
+
+	def test_convert(self):
+		""" Test converting every essay to full storage and back. """
+		self.assertEqual(EssayContentStore.convert(Essay, FULL), 4)
+		self.assertEqual(self.get_storage(), [(content, 0) for content in self.contents])
+		self.assertEqual(EssayContentStore.convert(Essay, FULL), 0)
+		self.assertEqual(EssayContentStore.convert(Essay, DELTA), 4)
+		self.assertEqual([distance for _, distance in self.get_storage()], [0, 1, 2, 0, 1, 2, 0])
+		self.assertContents()
+
+	def test_compiled_serializers(self):
+		""" Test that compiled serializers read delta stored content from instances. """
+		for essay in self.essays:
+			feedback_request_factory(essay)
+		feedback_requests = FeedbackRequest.objects.select_related('essay').order_by('pk')
+		data = compile_serializer(FeedbackRequestSerializer(feedback_requests, many=True)).data
+		self.assertEqual([feedback_request['essay']['content'] for feedback_request in data], self.contents)
+
+
+class TestEssayDiffs(TestCase):
+	""" Test diffs between essays and their ancestors. """
+
+	def setUp(self):
+		self.user = user_factory()
+		fake = Faker()
+		paragraphs = [fake.paragraph(nb_sentences=5) for _ in range(10)]
+		self.essays = []
+		for i in range(3):
+			paragraphs[i * 3] = fake.paragraph(nb_sentences=5)
+			self.essays.append(
+				essay_factory(revision_of=self.essays[-1] if self.essays else None, content='\n'.join(paragraphs))
+			)
+			feedback_request_factory(self.essays[-1], assign=True)
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, self.essays[-1].feedback_request
+		)
+		self.client.force_login(self.user)
+
+	@staticmethod
+	def apply_diff(new: str, diff):
+		""" Rebuild the old content from the new content and a diff, as a client would. """
+		lines = iter(new.splitlines(keepends=True))
+		pieces = []
+		for operation in diff:
+			if operation['op'] == 'delete':
+				pieces.append(operation['text'])
+			else:
+				taken = [next(lines) for _ in range(operation['lines'])]
+				if operation['op'] == 'equal':
+					pieces += taken
+		return ''.join(pieces)
+
+	def test_diff_content(self):
+		""" Test that diffs describe the old content exactly. """
+		for old, new in [('', 'a'), ('a\nb\nc', 'a\nx\nc\n'), ('a\nb', ''), ('same', 'same')]:
+			self.assertEqual(self.apply_diff(new, diff_content(old, new)), old)
+		self.assertEqual(
+			diff_content('a\nb\n', 'a\nc\n'),
+			[{
+				'op': 'equal',
+				'lines': 1
+			}, {
+				'op': 'delete',
+				'text': 'b\n'
+			}, {
+				'op': 'insert',
+				'lines': 1
+			}]
+		)
+
+	@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+	def test_diff_endpoint(self):
+		""" Test getting a diff from an ancestor, which is cached until either essay changes. """
+		cache.clear()
+		essay = self.essays[-1]
+		url = reverse('essay-diff', kwargs={'pk': essay.pk})
+		response = self.client.get(url)
+		self.assertEqual(response.json()['ancestor'], self.essays[1].pk)
+		self.assertEqual(self.apply_diff(essay.content, response.json()['diff']), self.essays[1].content)
+
+		with CaptureQueriesContext(connection) as uncached:
+			response = self.client.get(url + f'?ancestor={self.essays[0].pk}')
+		self.assertEqual(self.apply_diff(essay.content, response.json()['diff']), self.essays[0].content)
+		with CaptureQueriesContext(connection) as cached:
+			self.assertEqual(self.client.get(url + f'?ancestor={self.essays[0].pk}').json(), response.json())
+		# The ancestor's content is not loaded again
+		self.assertEqual(len(cached), len(uncached) - 1)
+
+		self.essays[0].content = 'Rewritten.'
+		self.essays[0].save()
+		response = self.client.get(url + f'?ancestor={self.essays[0].pk}')
+		self.assertEqual(self.apply_diff(essay.content, response.json()['diff']), 'Rewritten.')
+
+		for query in (f'?ancestor={essay.pk}', '?ancestor=x'):
+			self.assertEqual(self.client.get(url + query).status_code, 400)
+		url = reverse('essay-diff', kwargs={'pk': self.essays[0].pk})
+		self.assertEqual(self.client.get(url).status_code, 400)
+		self.assertEqual(self.client.get(reverse('essay-diff', kwargs={'pk': 'abc'})).status_code, 404)
+
+	def test_previous_revision_diffs(self):
+		""" Test replacing the content of previous revisions with diffs in the history payload. """
+		url = reverse('feedback-response-detail', kwargs={'pk': self.feedback_response.pk})
+		full = self.client.get(url)
+		diffs = self.client.get(url + '?revision_diffs=true')
+		self.assertLess(len(diffs.content), len(full.content))
+		revisions = diffs.json()['previous_revision_feedback']
+		self.assertEqual([revision['essay']['pk'] for revision in revisions], [self.essays[1].pk, self.essays[0].pk])
+		for revision, essay in zip(revisions, [self.essays[1], self.essays[0]]):
+			self.assertNotIn('content', revision['essay'])
+			self.assertEqual(self.apply_diff(self.essays[-1].content, revision['essay']['diff']), essay.content)
+
+		# Lists load the diffs for each response's revisions
+		response = self.client.get(reverse('feedback-response-list') + '?previous_revisions=true&revision_diffs=true')
+		self.assertEqual(response.json()[0]['previous_revision_feedback'], revisions)
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from io import StringIO
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+
+from project.database import get_sqlite_pragmas
+from project.models import FeedbackRequest, FeedbackResponse
+from project.routing import RecentWrites, ReplicaRouter, read_from_primary, read_from_replica
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestDatabaseProfile(TestCase):
+	""" Test the SQLite pragmas applied to new connections. """
+
+	def connect(self, directory: str):
+		""" A new connection to a database file in `directory`. """
+		wrapper = type(
+			connections['default']
+		)({
+			**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')
+		}, alias='profile-test')
+		wrapper.ensure_connection()
+		self.addCleanup(wrapper.close)
+		return wrapper
+
+	def get_pragma(self, wrapper, name: str):
+		with wrapper.cursor() as cursor:
+			cursor.execute(f'PRAGMA {name}')
+			return cursor.fetchone()[0]
+
+	def test_profiles(self):
+		""" Test that connections get the pragmas of the configured profile, with overrides. """
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory)
+		with override_settings(SQLITE_PROFILE='production', SQLITE_PRAGMAS={'cache_size': '-1000'}):
+			wrapper = self.connect(directory)
+		self.assertEqual(self.get_pragma(wrapper, 'journal_mode'), 'wal')
+		self.assertEqual(self.get_pragma(wrapper, 'synchronous'), 1)
+		self.assertEqual(self.get_pragma(wrapper, 'cache_size'), -1000)
+		self.assertEqual(self.get_pragma(wrapper, 'busy_timeout'), 5000)
+		wrapper.close()
+
+		# The journal mode is stored in the file, so the baseline profile sets it back
+		with override_settings(SQLITE_PROFILE='baseline', SQLITE_PRAGMAS={}):
+			wrapper = self.connect(directory)
+		self.assertEqual(self.get_pragma(wrapper, 'journal_mode'), 'delete')
+		self.assertEqual(self.get_pragma(wrapper, 'cache_size'), -2000)
+
+		with override_settings(SQLITE_PROFILE='fast'), self.assertRaises(ValueError):
+			get_sqlite_pragmas()
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class TestReplicaRouting(TransactionTestCase):
+	""" Test reading list and detail endpoints from a replica, with a second SQLite database standing in for it. """
+
+	databases = {'default', 'replica'}
+
+	def setUp(self):
+		self.user = user_factory()
+		self.essay = essay_factory()
+		feedback_request_factory(self.essay, assign=True)
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, self.essay.feedback_request
+		)
+		call_command('sync_replica', stdout=StringIO())
+		self.client.force_login(self.user)
+
+	@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+	def test_routing(self):
+		""" Test that reads go to the replica, except within the read-your-writes window after a write. """
+		cache.clear()
+		url = reverse('feedback-response-detail', kwargs={'pk': self.feedback_response.pk})
+		# Written to the primary only, as if the replica lagged behind
+		FeedbackResponse.objects.filter(pk=self.feedback_response.pk).update(content='Unreplicated.')
+		self.assertEqual(self.client.get(url).json()['content'], '')
+		self.assertEqual(self.client.get(reverse('feedback-response-list')).json()[0]['content'], '')
+
+		response = self.client.put(url, {'content': 'Written.'}, content_type='application/json')
+		self.assertEqual(response.status_code, 200)
+		# Not on the replica, but the user's reads are on the primary now
+		self.assertEqual(FeedbackResponse.objects.using('replica').get().content, '')
+		self.assertEqual(self.client.get(url).json()['content'], 'Written.')
+
+		cache.delete(RecentWrites.get_key(self.user.pk))
+		self.assertEqual(self.client.get(url).json()['content'], '')
+		call_command('sync_replica', stdout=StringIO())
+		self.assertEqual(self.client.get(url).json()['content'], 'Written.')
+
+	@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+	def test_primary_reads(self):
+		""" Test that writes, and queues loaded into the cache, use the primary. """
+		cache.clear()
+		router = ReplicaRouter()
+		self.assertEqual(router.db_for_read(FeedbackResponse), 'default')
+		with read_from_replica():
+			self.assertEqual(router.db_for_read(FeedbackResponse), 'replica')
+			self.assertEqual(router.db_for_write(FeedbackResponse), 'default')
+			with read_from_primary():
+				self.assertEqual(router.db_for_read(FeedbackResponse), 'default')
+
+		# Only on the primary
+		feedback_request = feedback_request_factory(essay_factory(), assign=True)
+		response = self.client.get(reverse('feedback-request-list'))
+		self.assertIn(feedback_request.pk, [item['pk'] for item in response.json()])
+		self.assertFalse(FeedbackRequest.objects.using('replica').filter(pk=feedback_request.pk).exists())
+		# As are parameterized queues, whose ETags come from the same cache generation as whole ones
+		response = self.client.get(reverse('feedback-request-list'), {'fields': 'pk'})
+		self.assertIn(feedback_request.pk, [item['pk'] for item in response.json()])
+
+		url = reverse('feedback-response-finish', kwargs={'pk': self.feedback_response.pk})
+		self.assertEqual(self.client.post(url).status_code, 200)
+		self.assertTrue(FeedbackResponse.objects.get(pk=self.feedback_response.pk).finished)
+		self.assertFalse(FeedbackResponse.objects.using('replica').get(pk=self.feedback_response.pk).finished)
@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+import tempfile
+
+from io import StringIO
+
+from django.db import models
+from django.test import TestCase
+from django.urls import reverse
+from django.core.management import CommandError, call_command
+
+from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+from project.seeding import ScaleSeeder
+from project.utilities import EssayManager, FeedbackRequestManager
+from project.tests.factories import user_factory
+
+
+class TestEssayIngestion(TestCase):
+	""" Test bulk essay ingestion. """
+
+	def setUp(self):
+		self.admin = user_factory(is_superuser=True)
+		self.editor = user_factory()
+		self.records = [
+			{
+				'id': 'a',
+				'name': 'A',
+				'content': 'First draft'
+			},
+			{
+				'id': 'b',
+				'name': 'B',
+				'content': 'Second draft',
+				'revision_of': 'a'
+			},
+			{
+				'id': 'c',
+				'name': 'C',
+				'content': 'Third draft',
+				'revision_of': 'b',
+				'deadline': '2021-02-01T12:00:00',
+				'assigned_editors': [self.editor.username],
+			},
+			{
+				'id': 'd',
+				'name': 'D',
+				'content': 'Unrelated'
+			},
+		]
+
+	def write_jsonl(self, records):
+		f = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+		self.addCleanup(os.remove, f.name)
+		f.write('\n'.join(json.dumps(record) for record in records))
+		f.close()
+		return f.name
+
+	def test_ingest_command(self):
+		""" Test importing revisions, feedback requests and assignments, in batches smaller than the chains. """
+		path = self.write_jsonl(self.records)
+		call_command('ingest_essays', path, uploaded_by=self.admin.username, batch_size=3, stdout=StringIO())
+
+		essay = Essay.objects.get(external_id='c')
+		self.assertEqual(essay.uploaded_by, self.admin)
+		self.assertEqual(
+			EssayManager.get_ancestor_ids(essay),
+			[Essay.objects.get(external_id='b').pk,
+				Essay.objects.get(external_id='a').pk]
+		)
+		self.assertEqual(list(FeedbackRequestManager.query_for_user(self.editor)), [essay.feedback_request])
+		self.assertEqual(Essay.objects.count(), 4)
+
+		# Re-running is a no-op
+		call_command('ingest_essays', path, uploaded_by=self.admin.username, stdout=StringIO())
+		self.assertEqual(Essay.objects.count(), 4)
+		self.assertEqual(FeedbackRequest.objects.count(), 1)
+
+	def test_ingest_resumes_from_checkpoint(self):
+		""" Test that a failed import commits whole batches and resumes after them. """
+		checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+		self.addCleanup(shutil.rmtree, os.path.dirname(checkpoint))
+		broken = self.records[:3] + [{'id': 'd', 'name': 'D', 'content': '', 'revision_of': 'missing'}]
+		options = {'uploaded_by': self.admin.username, 'batch_size': 2, 'checkpoint': checkpoint, 'stdout': StringIO()}
+
+		with self.assertRaises(CommandError):
+			call_command('ingest_essays', self.write_jsonl(broken), **options)
+		self.assertEqual(set(Essay.objects.values_list('external_id', flat=True)), {'a', 'b'})
+
+		out = StringIO()
+		call_command('ingest_essays', self.write_jsonl(self.records), **{**options, 'stdout': out})
+		self.assertIn('Resuming after row 2', out.getvalue())
+		self.assertEqual(set(Essay.objects.values_list('external_id', flat=True)), {'a', 'b', 'c', 'd'})
+
+	def test_ingest_api(self):
+		""" Test the bulk import endpoint with CSV input. """
+		url = reverse('essay-bulk')
+		body = (
+			'id,name,content,revision_of,deadline,assigned_editors\n'
+			'a,A,"Line one\nLine two",,,\n'
+			f'b,B,Revised,a,2021-02-01T12:00:00Z,{self.editor.username};{self.admin.username}\n'
+		)
+
+		# Only staff can import
+		self.client.force_login(self.editor)
+		response = self.client.post(url, body, content_type='text/csv')
+		self.assertEqual(response.status_code, 403)
+
+		self.client.force_login(self.admin)
+		response = self.client.post(url, body, content_type='text/csv')
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual((data['rows'], data['essays'], data['assignments']), (2, 2, 2))
+		self.assertEqual(Essay.objects.get(external_id='a').content, 'Line one\nLine two')
+		self.assertEqual(Essay.objects.get(external_id='b').feedback_request.assigned_editors.count(), 2)
+
+		# Errors report how far the import got
+		response = self.client.post(url, '{"id": "x"}', content_type='application/x-ndjson')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(json.loads(response.content)['rows'], 0)
+
+
+class TestScaleSeeder(TestCase):
+	""" Test the scale dataset generator. """
+
+	OPTIONS = dict(editors=5, uploaders=3, essays=60, max_chain_length=6, batch_size=16)
+
+	def get_fingerprint(self, prefix):
+		essays = Essay.objects.filter(uploaded_by__username__startswith=f'{prefix}-').order_by('pk')
+		return [(essay.name, essay.content, essay.revision_of_id is None) for essay in essays]
+
+	def test_seed(self):
+		""" Test that the dataset is consistent with the claim constraints and the status denormalization. """
+		result = ScaleSeeder(seed=1, prefix='a', **self.OPTIONS).seed()
+		self.assertEqual(result.essays, Essay.objects.count())
+		self.assertEqual(result.feedback_requests, FeedbackRequest.objects.count())
+		self.assertEqual(result.feedback_responses, FeedbackResponse.objects.count())
+		self.assertTrue(User.objects.get(username='a-editor-0@example.com').check_password('password'))
+		self.assertTrue(
+			all(
+				len(ids) < 6 for ids in
+				EssayManager.get_ancestor_ids_for_essays(Essay.objects.values_list('pk', flat=True)).values()
+			)
+		)
+		self.assertEqual(FeedbackRequestManager.repair_statuses(), 0)
+		self.assertFalse(
+			FeedbackResponse.objects.exclude(feedback_request__assigned_editors=models.F('editor')).exists()
+		)
+
+	def test_seed_is_deterministic(self):
+		""" Test that the same seed generates the same data, and a different seed different data. """
+		ScaleSeeder(seed=1, prefix='a', **self.OPTIONS).seed()
+		ScaleSeeder(seed=1, prefix='b', **self.OPTIONS).seed()
+		ScaleSeeder(seed=2, prefix='c', **self.OPTIONS).seed()
+		self.assertEqual(self.get_fingerprint('a'), self.get_fingerprint('b'))
+		self.assertNotEqual(self.get_fingerprint('a'), self.get_fingerprint('c'))
+
+	def test_seed_command(self):
+		""" Test the management command. """
+		call_command('seed_scale', editors=2, uploaders=2, essays=10, stdout=StringIO())
+		self.assertEqual(Essay.objects.count(), 10)
+		with self.assertRaises(CommandError):
+			call_command('seed_scale', editors=2, uploaders=2, essays=10, stdout=StringIO())
@@ -0,0 +1,247 @@
+from io import StringIO
+
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.core.management import call_command
+
+from project.assignment import FeedbackRequestAssigner
+from project.models import FeedbackRequest, FeedbackResponse
+from project.serializers import FeedbackResponseSerializer
+from project.utilities import EditorHasOpenFeedbackResponseError, EssayManager, FeedbackRequestManager, FeedbackResponseExistsError, FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestFeedbackRequestManager(TestCase):
+	""" Test the feedback request manager. """
+
+	def setUp(self):
+		self.user = user_factory()
+		self.feedback_request = feedback_request_factory(essay_factory(), assign=True)
+
+	def assertStatus(self, status, active_editor=None):
+		self.feedback_request.refresh_from_db()
+		self.assertEqual(self.feedback_request.status, status)
+		self.assertEqual(self.feedback_request.active_editor, active_editor)
+
+	def test_status_sync(self):
+		""" Test that the status follows the FeedbackResponse through its lifecycle. """
+		self.assertStatus(FeedbackRequest.Status.UNSTARTED)
+
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		self.assertEqual(self.feedback_request.status, FeedbackRequest.Status.IN_PROGRESS)
+		self.assertStatus(FeedbackRequest.Status.IN_PROGRESS, self.user)
+
+		FeedbackResponseManager(feedback_response).finish()
+		self.assertStatus(FeedbackRequest.Status.FINISHED, self.user)
+
+		feedback_response.delete()
+		self.assertStatus(FeedbackRequest.Status.UNSTARTED)
+
+	def test_repair_statuses(self):
+		""" Test that the repair command fixes statuses that have drifted. """
+		unstarted_request = feedback_request_factory(essay_factory(), assign=True)
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		FeedbackRequest.objects.update(status=FeedbackRequest.Status.FINISHED, active_editor=None)
+
+		call_command('sync_feedback_request_status', batch_size=1, stdout=StringIO())
+		self.assertStatus(FeedbackRequest.Status.IN_PROGRESS, self.user)
+		unstarted_request.refresh_from_db()
+		self.assertEqual(unstarted_request.status, FeedbackRequest.Status.UNSTARTED)
+
+		FeedbackResponse.objects.filter(pk=feedback_response.pk).update(finished=True)
+		self.assertEqual(FeedbackRequestManager.repair_statuses(), 1)
+		self.assertStatus(FeedbackRequest.Status.FINISHED, self.user)
+		self.assertEqual(FeedbackRequestManager.repair_statuses(), 0)
+
+
+class TestFeedbackResponseManager(TestCase):
+	""" Test the feedback response manager. """
+
+	def setUp(self):
+		self.user = user_factory()
+		self.finished_essay = essay_factory()
+		self.finished_feedback_request = feedback_request_factory(self.finished_essay, assign=True)
+		self.finished_feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, self.finished_feedback_request
+		)
+		FeedbackResponseManager(self.finished_feedback_response).finish()
+		self.essay = essay_factory()
+		self.feedback_request = feedback_request_factory(self.essay, assign=True)
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+
+	def test_claims_are_enforced_by_the_database(self):
+		""" Test that the database itself rejects a second claim on a request or a second open response. """
+		other_user = user_factory()
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			FeedbackResponse.objects.create(editor=other_user, feedback_request=self.feedback_request)
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			FeedbackResponse.objects.create(
+				editor=self.user, feedback_request=feedback_request_factory(essay_factory())
+			)
+
+		# Integrity errors are reported as the manager's own errors
+		self.feedback_request.assigned_editors.add(other_user)
+		with self.assertRaises(FeedbackResponseExistsError):
+			FeedbackResponseManager.create_for_feedback_request(other_user, self.feedback_request)
+		with self.assertRaises(EditorHasOpenFeedbackResponseError):
+			FeedbackResponseManager.create_for_feedback_request(
+				self.user, feedback_request_factory(essay_factory(), assign=True)
+			)
+
+	def test_get_previous_feedback_responses_empty(self):
+		""" Test getting feedback responses when there are none. """
+		self.assertEqual(len(FeedbackResponseManager(self.feedback_response).get_previous_feedback_responses()), 0)
+
+	def test_get_previous_feedback_responses_no_revision(self):
+		""" Test getting previous feedback responses when there is a revision but it was not edited """
+		# An editor can only have one unfinished response at a time
+		FeedbackResponseManager(self.feedback_response).finish()
+		self.finished_feedback_response.finished = False
+		self.finished_feedback_response.save()
+
+		self.assertEqual(len(FeedbackResponseManager(self.feedback_response).get_previous_feedback_responses()), 0)
+
+	def test_get_previous_feedback_responses_one(self):
+		""" Test getting previous feedback responses when there is one revision. """
+		self.essay.revision_of = self.finished_essay
+		self.essay.save()
+
+		feedback_responses = FeedbackResponseManager(self.feedback_response).get_previous_feedback_responses()
+		self.assertEqual(len(feedback_responses), 1)
+		self.assertEqual(feedback_responses[0], self.finished_feedback_response)
+
+	def test_get_previous_feedback_responses_two(self):
+		""" Test getting previous feedback responses when there are two revisions. """
+		FeedbackResponseManager(self.feedback_response).finish()
+
+		old_essay = essay_factory()
+		old_feedback_request = feedback_request_factory(old_essay, assign=True)
+		old_feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, old_feedback_request)
+		FeedbackResponseManager(old_feedback_response).finish()
+		self.finished_essay.revision_of = old_essay
+		self.finished_essay.save()
+		self.essay.revision_of = self.finished_essay
+		self.essay.save()
+
+		feedback_responses = FeedbackResponseManager(self.feedback_response).get_previous_feedback_responses()
+		self.assertEqual(len(feedback_responses), 2)
+		self.assertEqual(feedback_responses[0], self.finished_feedback_response)
+		self.assertEqual(feedback_responses[1], old_feedback_response)
+
+
+class TestEssayManager(TestCase):
+	""" Test the essay manager. """
+
+	def setUp(self):
+		self.essays = [essay_factory()]
+		for _ in range(5):
+			self.essays.append(essay_factory(revision_of=self.essays[-1]))
+
+	def test_get_ancestor_ids(self):
+		""" Test that ancestors are returned nearest first in a single query. """
+		with self.assertNumQueries(1):
+			ancestor_ids = EssayManager.get_ancestor_ids(self.essays[-1])
+		self.assertEqual(ancestor_ids, [essay.pk for essay in reversed(self.essays[:-1])])
+		self.assertEqual(EssayManager.get_ancestor_ids(self.essays[0]), [])
+
+	def test_get_ancestor_ids_for_essays(self):
+		""" Test getting ancestors of several essays at once. """
+		with self.assertNumQueries(1):
+			ancestor_ids = EssayManager.get_ancestor_ids_for_essays([self.essays[2].pk, self.essays[0].pk])
+		self.assertEqual(
+			ancestor_ids, {
+				self.essays[2].pk: [self.essays[1].pk, self.essays[0].pk],
+				self.essays[0].pk: [],
+			}
+		)
+
+	def test_get_ancestor_ids_inserted_revision(self):
+		""" Test that a revision inserted in the middle of a chain is picked up. """
+		inserted = essay_factory(revision_of=self.essays[2])
+		self.essays[3].revision_of = inserted
+		self.essays[3].save()
+		ancestor_ids = EssayManager.get_ancestor_ids(self.essays[4])
+		self.assertEqual(
+			ancestor_ids, [self.essays[3].pk, inserted.pk, self.essays[2].pk, self.essays[1].pk, self.essays[0].pk]
+		)
+
+	def test_get_ancestor_ids_broken_chain(self):
+		""" Test that deleting an essay in the chain ends the chain there. """
+		self.essays[2].delete()
+		self.assertEqual(EssayManager.get_ancestor_ids(self.essays[-1]), [self.essays[4].pk, self.essays[3].pk])
+		self.assertEqual(EssayManager.get_ancestor_ids(self.essays[1]), [self.essays[0].pk])
+
+	def test_get_ancestor_ids_cycle(self):
+		""" Test that a cycle in `revision_of` does not recurse forever. """
+		self.essays[0].revision_of = self.essays[-1]
+		self.essays[0].save()
+		ancestor_ids = EssayManager.get_ancestor_ids(self.essays[-1])
+		self.assertEqual(len(ancestor_ids), EssayManager.MAX_REVISION_DEPTH)
+
+	def test_previous_revision_feedback_query_count(self):
+		""" Test that serializing previous revision feedback does not cost a query per revision. """
+		user = user_factory()
+		for essay in self.essays:
+			feedback_request_factory(essay, assign=True)
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(user, self.essays[-1].feedback_request)
+		feedback_response = FeedbackResponse.objects.select_related('feedback_request__essay').get(
+			pk=feedback_response.pk
+		)
+		with self.assertNumQueries(2):
+			data = FeedbackResponseSerializer(
+				feedback_response, context={
+					FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS: True
+				}
+			).data
+		self.assertEqual(
+			[feedback_request['essay']['pk'] for feedback_request in data['previous_revision_feedback']],
+			[essay.pk for essay in reversed(self.essays[:-1])],
+		)
+
+
+class TestFeedbackRequestAssigner(TestCase):
+	""" Test the feedback request assignment engine. """
+
+	def setUp(self):
+		self.editors = [user_factory(is_superuser=True) for _ in range(3)]
+		now = timezone.now()
+		self.feedback_requests = []
+		for i in range(7):
+			feedback_request = feedback_request_factory(essay_factory())
+			feedback_request.deadline = now + timezone.timedelta(hours=i)
+			feedback_request.save()
+			self.feedback_requests.append(feedback_request)
+
+	def get_loads(self):
+		return [editor.assigned_feedback_requests.count() for editor in self.editors]
+
+	def test_assign_balances_load(self):
+		""" Test that requests are spread evenly, most urgent first, and that existing work is counted. """
+		self.feedback_requests[-1].assigned_editors.add(self.editors[0])
+		assigner = FeedbackRequestAssigner(batch_size=2)
+		self.assertEqual(assigner.assign(), 6)
+		self.assertEqual(sorted(self.get_loads()), [2, 2, 3])
+
+		# The editor who already had work was skipped for the two most urgent requests, and the three most urgent
+		# requests went to three different editors
+		first_editors = [fr.assigned_editors.get().pk for fr in self.feedback_requests[:3]]
+		self.assertNotIn(self.editors[0].pk, first_editors[:2])
+		self.assertEqual(len(set(first_editors)), 3)
+
+		# Running again has nothing left to do
+		self.assertEqual(FeedbackRequestAssigner().assign(), 0)
+
+	def test_assign_respects_capacity(self):
+		""" Test that editors at capacity are skipped and that leftover requests stay unassigned. """
+		created = FeedbackRequestAssigner(
+			editors=self.editors[:2], editors_per_request=2, max_open_per_editor=3
+		).assign()
+		self.assertEqual(created, 6)
+		self.assertEqual(self.get_loads(), [3, 3, 0])
+		self.assertEqual(FeedbackRequestAssigner.query_unassigned().count(), 4)
+
+	def test_assign_command(self):
+		""" Test the management command. """
+		call_command('assign_feedback_requests', editors=[self.editors[0].username], stdout=StringIO())
+		self.assertEqual(self.get_loads(), [7, 0, 0])
@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import tempfile
+
+from io import StringIO
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.management import CommandError, call_command
+
+from project.benchmarking import compare_to_baseline, measure_request
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestEndpointBenchmarks(TestCase):
+	""" Test the endpoint benchmark helpers. """
+
+	def test_measure_request(self):
+		""" Test that the queries a request makes are counted. """
+		user = user_factory()
+		self.client.force_login(user)
+		with CaptureQueriesContext(connection) as queries:
+			response, measurement = measure_request(self.client, 'get', reverse('feedback-request-list'))
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(measurement.status_code, 200)
+		self.assertEqual(measurement.queries, len(queries))
+		self.assertGreater(measurement.wall_ms, measurement.sql_ms)
+
+	def test_compare_to_baseline(self):
+		""" Test that extra queries, slowdowns and status changes are regressions, and that noise is not. """
+		baseline = {
+			'list': {
+				'status_code': 200,
+				'wall_ms': 10.0,
+				'queries': 3,
+				'sql_ms': 1.0
+			},
+			'detail': {
+				'status_code': 200,
+				'wall_ms': 2.0,
+				'queries': 4,
+				'sql_ms': 1.0
+			},
+		}
+		results = {
+			'list': {
+				'status_code': 200,
+				'wall_ms': 12.0,
+				'queries': 3,
+				'sql_ms': 1.0
+			},
+			'detail': {
+				'status_code': 200,
+				'wall_ms': 5.0,
+				'queries': 4,
+				'sql_ms': 1.0
+			},
+			'new': {
+				'status_code': 200,
+				'wall_ms': 500.0,
+				'queries': 100,
+				'sql_ms': 1.0
+			},
+		}
+		self.assertEqual(compare_to_baseline(baseline, results), [])
+
+		results['list'] = {'status_code': 403, 'wall_ms': 30.0, 'queries': 13, 'sql_ms': 1.0}
+		self.assertEqual(
+			compare_to_baseline(baseline, results),
+			['list: status 200 -> 403', 'list: 3 -> 13 queries', 'list: 10.0ms -> 30.0ms'],
+		)
+		self.assertEqual(
+			compare_to_baseline(baseline, results, time_tolerance=0, query_tolerance=10),
+			['list: status 200 -> 403'],
+		)
+
+
+class TestServerTiming(TestCase):
+	""" Test the Server-Timing instrumentation. """
+
+	def setUp(self):
+		self.user = user_factory()
+		feedback_request_factory(essay_factory(), assign=True)
+		self.client.force_login(self.user)
+
+	@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+	def test_sampled_request(self):
+		""" Test that sampled requests report query, serializer, view and total time. """
+		with self.assertLogs('project.timing') as logs, CaptureQueriesContext(connection) as queries:
+			response = self.client.get(reverse('feedback-request-list'))
+		self.assertEqual(response.status_code, 200)
+		metrics = {metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')}
+		self.assertEqual(set(metrics), {'db', 'serialize', 'view', 'total'})
+		self.assertIn(f'desc="{len(queries)} queries"', metrics['db'])
+		timings = logs.records[0].timings
+		self.assertEqual(timings['view'], 'feedback-request-list')
+		self.assertEqual(timings['db_queries'], len(queries))
+		self.assertLessEqual(timings['view_ms'], timings['total_ms'])
+
+	@override_settings(SERVER_TIMING_SAMPLE_RATE=0.0)
+	def test_unsampled_request(self):
+		""" Test that nothing is reported when sampling is off. """
+		response = self.client.get(reverse('feedback-request-list'))
+		self.assertEqual(response.status_code, 200)
+		self.assertNotIn('Server-Timing', response)
+
+
+class TestProfiling(TestCase):
+	""" Test on-demand request profiling. """
+
+	def setUp(self):
+		self.user = user_factory()
+		feedback_request = feedback_request_factory(essay_factory(), assign=True)
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, feedback_request)
+		self.client.force_login(self.user)
+		self.profiling_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.profiling_dir)
+
+	def test_profile_request(self):
+		""" Test that requests with the token are profiled and that the profiles can be listed and summarized. """
+		url = reverse('feedback-response-detail', kwargs={'pk': self.feedback_response.pk})
+		with override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=self.profiling_dir):
+			response = self.client.get(url, HTTP_X_PROFILE_TOKEN='wrong')
+			self.assertNotIn('X-Profile-Id', response)
+			response = self.client.get(url, HTTP_X_PROFILE_TOKEN='sécret')
+			self.assertEqual(response.status_code, 200)
+			self.assertNotIn('X-Profile-Id', response)
+			with CaptureQueriesContext(connection) as queries:
+				response = self.client.get(url, HTTP_X_PROFILE_TOKEN='secret')
+			self.assertEqual(response.status_code, 200)
+			profile_id = response['X-Profile-Id']
+			self.assertIn('feedback-response-detail', profile_id)
+			self.assertTrue(os.path.exists(os.path.join(self.profiling_dir, f'{profile_id}.prof')))
+			with open(os.path.join(self.profiling_dir, f'{profile_id}.json')) as f:
+				profile = json.load(f)
+			self.assertEqual(profile['view'], 'feedback-response-detail')
+			self.assertEqual(profile['status'], 200)
+			self.assertEqual(len(profile['queries']), len(queries))
+			self.assertNotIn('params', profile['queries'][0])
+
+			out = StringIO()
+			call_command('profiles', stdout=out)
+			self.assertIn(profile_id, out.getvalue())
+			out = StringIO()
+			call_command('profiles', profile_id, stdout=out)
+			self.assertIn('Slowest queries', out.getvalue())
+			self.assertIn('function calls', out.getvalue())
+			with self.assertRaises(CommandError):
+				call_command('profiles', 'missing', stdout=StringIO())
+
+	def test_sampled_profiling(self):
+		""" Test that requests are profiled at the sample rate. """
+		with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profiling_dir):
+			response = self.client.get(reverse('feedback-response-list'))
+		self.assertIn('X-Profile-Id', response)
@@ -0,0 +1,127 @@
+from io import StringIO
+
+from faker import Faker
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.management import call_command
+
+from project.content_storage import DELTA
+from project.models import Essay, FeedbackResponse, User
+from project.search import ESSAY, FEEDBACK_RESPONSE, InvalidSearchQueryError, SearchIndex
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestSearch(TestCase):
+	""" Test the full-text search index and endpoint. """
+
+	def setUp(self):
+		self.user = user_factory()
+		self.essay = essay_factory(content='Notes on the migration of arctic terns.')
+		self.titled = essay_factory(content='Nothing relevant here.')
+		self.titled.name = 'Arctic terns'
+		self.titled.save()
+		feedback_request_factory(self.essay, assign=True)
+		feedback_request_factory(self.titled, assign=True)
+		self.hidden = essay_factory(content='Arctic terns, unassigned.')
+		self.feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, self.essay.feedback_request
+		)
+		self.client.force_login(self.user)
+
+	def search(self, query, **kwargs):
+		return [(hit.kind, hit.pk) for hit in SearchIndex.search(query, **kwargs)]
+
+	def test_sync(self):
+		""" Test that saving and deleting objects, and applying deltas, updates the index. """
+		self.assertEqual(self.search('puffins'), [])
+		self.essay.content = 'Puffins, mostly.'
+		self.essay.save()
+		self.assertEqual(self.search('puffins'), [(ESSAY, self.essay.pk)])
+		self.assertEqual(self.search('migration'), [])
+
+		FeedbackResponseManager.apply_delta(
+			FeedbackResponse.objects.all(), self.feedback_response.pk, 0,
+			[{
+				'offset': 0,
+				'delete': 0,
+				'insert': 'Puffin'
+			}]
+		)
+		self.assertEqual(
+			self.search('puffin', kind=FEEDBACK_RESPONSE), [(FEEDBACK_RESPONSE, self.feedback_response.pk)]
+		)
+
+		self.essay.delete()
+		self.assertEqual(self.search('puffins'), [])
+
+	def test_ranking_and_queries(self):
+		""" Test that titles weigh more than content, and that every term and phrases must match. """
+		self.assertEqual(self.search('arctic terns')[:1], [(ESSAY, self.titled.pk)])
+		self.assertEqual(
+			{hit
+				for hit in self.search('tern')},
+			{(ESSAY, self.essay.pk), (ESSAY, self.titled.pk), (ESSAY, self.hidden.pk)}
+		)
+		self.assertEqual(self.search('"terns arctic"'), [])
+		self.assertEqual(self.search('terns "of arctic"'), [(ESSAY, self.essay.pk)])
+		# FTS5 syntax is matched as text rather than interpreted
+		self.assertEqual(self.search('terns OR NOT puffins*'), [])
+		with self.assertRaises(InvalidSearchQueryError):
+			SearchIndex.search(' "" ')
+
+	def test_permissions(self):
+		""" Test that users only find what they can read. """
+		self.assertEqual(
+			{hit
+				for hit in self.search('terns', user=self.user)}, {(ESSAY, self.essay.pk), (ESSAY, self.titled.pk)}
+		)
+		self.assertIn((ESSAY, self.hidden.pk), self.search('terns', user=User.objects.get(is_superuser=True)))
+		self.feedback_response.content = 'Terns are fine.'
+		self.feedback_response.save()
+		self.assertIn((FEEDBACK_RESPONSE, self.feedback_response.pk), self.search('terns', user=self.user))
+		self.assertEqual(self.search('terns', user=user_factory()), [])
+
+	def test_endpoint(self):
+		""" Test paginating and describing results, with escaped snippets. """
+		self.essay.content = 'Arctic terns <b>and</b> puffins.'
+		self.essay.save()
+		url = reverse('search')
+		response = self.client.get(url, {'q': 'arctic', 'page_size': 1})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json()['results'][0]['pk'], self.titled.pk)
+		response = self.client.get(response.json()['next'])
+		self.assertIsNone(response.json()['next'])
+		result = response.json()['results'][0]
+		self.assertEqual((result['type'], result['pk'], result['name']), (ESSAY, self.essay.pk, self.essay.name))
+		self.assertEqual(result['snippet'], '<mark>Arctic</mark> terns &lt;b&gt;and&lt;/b&gt; puffins.')
+
+		self.feedback_response.content = 'Arctic.'
+		self.feedback_response.save()
+		result = self.client.get(url, {'q': 'arctic', 'type': FEEDBACK_RESPONSE}).json()['results'][0]
+		self.assertEqual((result['pk'], result['essay']), (self.feedback_response.pk, self.essay.pk))
+
+		self.assertEqual(self.client.get(url, {'q': ''}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'q': 'arctic', 'type': 'user'}).status_code, 400)
+		self.client.logout()
+		self.assertEqual(self.client.get(url, {'q': 'arctic'}).status_code, 403)
+
+	def test_rebuild(self):
+		""" Test rebuilding the index, including objects that bypassed signals and delta stored essays. """
+		Essay.objects.filter(pk=self.hidden.pk).update(content='Puffins.')
+		paragraphs = [Faker().paragraph(nb_sentences=5) for _ in range(10)]
+		self.essay.content = '\n'.join(paragraphs)
+		self.essay.save()
+		with override_settings(ESSAY_CONTENT_STORAGE=DELTA):
+			revision = essay_factory(revision_of=self.essay, content='\n'.join(paragraphs + ['Puffins too.']))
+		self.assertIsNone(Essay.objects.filter(pk=revision.pk).values_list('content', flat=True).get())
+		with connection.cursor() as cursor:
+			cursor.execute(f'DELETE FROM {SearchIndex.TABLE}')
+
+		out = StringIO()
+		call_command('rebuild_search_index', stdout=out)
+		# Four essays and a feedback response
+		self.assertIn('Indexed 5 rows', out.getvalue())
+		self.assertEqual({hit for hit in self.search('puffins')}, {(ESSAY, self.hidden.pk), (ESSAY, revision.pk)})
@@ -0,0 +1,46 @@
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from project.models import FeedbackRequest, FeedbackResponse
+from project.fast_serializers import compile_serializer
+from project.serializers import FeedbackRequestSerializer, FeedbackResponseSerializer
+from project.utilities import FeedbackResponseManager
+from project.tests.factories import user_factory, essay_factory, feedback_request_factory
+
+
+class TestCompiledSerializers(TestCase):
+	""" Test that compiled serializers produce the same output as the DRF serializers. """
+
+	def setUp(self):
+		self.user = user_factory()
+		essay = None
+		for i in range(3):
+			essay = essay_factory(revision_of=essay)
+			feedback_request = feedback_request_factory(essay, assign=True)
+			feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, feedback_request)
+			if i < 2:
+				FeedbackResponseManager(feedback_response).finish()
+
+	def assertSameOutput(self, serializer_class, data, context=None, **kwargs):
+		expected = JSONRenderer().render(serializer_class(data, context=context or {}, **kwargs).data)
+		compiled = compile_serializer(serializer_class(data, context=context or {}, **kwargs))
+		self.assertEqual(JSONRenderer().render(compiled.data), expected)
+		return compiled
+
+	def test_feedback_requests(self):
+		""" Test FeedbackRequest lists, read from instances and from `.values()` rows, with sparse fieldsets. """
+		feedback_requests = FeedbackRequest.objects.select_related('essay').order_by('pk')
+		for context in ({}, {'fields': {'pk', 'essay.name'}}, {'exclude': {'essay.content', 'deadline'}}):
+			compiled = self.assertSameOutput(FeedbackRequestSerializer, feedback_requests, context, many=True)
+			self.assertTrue(compiled.child.supports_values)
+			self.assertSameOutput(FeedbackRequestSerializer, list(feedback_requests), context, many=True)
+		with self.assertNumQueries(1):
+			compile_serializer(FeedbackRequestSerializer(FeedbackRequest.objects.all(), many=True)).data
+
+	def test_feedback_responses(self):
+		""" Test FeedbackResponses, with and without feedback on previous revisions. """
+		feedback_responses = FeedbackResponse.objects.select_related('feedback_request__essay').order_by('pk')
+		for context in ({}, {FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS: True}):
+			compiled = self.assertSameOutput(FeedbackResponseSerializer, feedback_responses, context, many=True)
+			self.assertEqual(compiled.child.supports_values, not context)
+			self.assertSameOutput(FeedbackResponseSerializer, feedback_responses.last(), context)
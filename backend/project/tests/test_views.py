@@ -0,0 +1,564 @@
+import base64
+import json
+
+from django.utils import timezone
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib import auth
+
+from project.models import FeedbackRequest, FeedbackResponse
+from project.serializers import FeedbackResponseSerializer
+from project.utilities import FeedbackRequestManager, FeedbackResponseManager
+from project.tests.factories import USER_PASSWORD, JSON, user_factory, essay_factory, feedback_request_factory
+
+
+class TestAuthentication(TestCase):
+	""" Test user authentication: login and logout. """
+
+	def setUp(self):
+		self.user = user_factory()
+
+	def test_login(self):
+		""" Check that login is functional. """
+		url = reverse('user-login')
+
+		# The user can load the /login/ page
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertTemplateUsed('project/login.html')
+
+		# The user cannot login with incorrect credentials
+		data = {'username': self.user.username, 'password': 'WRONG'}
+		response = self.client.post(url, data=json.dumps(data), content_type=JSON)
+		self.assertEqual(response.status_code, 403)
+
+		# The user can login with correct credentials
+		data = {'username': self.user.username, 'password': USER_PASSWORD}
+		response = self.client.post(url, data=json.dumps(data), content_type=JSON)
+		self.assertEqual(response.status_code, 204)
+		user = auth.get_user(self.client)
+		self.assertTrue(user.is_authenticated)
+
+	def test_logout(self):
+		""" Check that logout is functional. """
+		url = reverse('user-logout')
+		self.client.force_login(self.user)
+
+		# Logging out logs out the user
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 204)
+		user = auth.get_user(self.client)
+		self.assertFalse(user.is_authenticated)
+
+
+class TestPlatformView(TestCase):
+	""" Verify that the platform is able to be loaded. """
+
+	def setUp(self):
+		self.user = user_factory()
+
+	def test_load_platform(self):
+		url = reverse('platform')
+
+		# Loading the platform fails if the user is not authenticated
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 403)
+
+		# Loading the platform works if the user is not authenticated
+		self.client.force_login(self.user)
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertTemplateUsed('project/platform.html')
+
+
+class TestFeedbackRequestView(TestCase):
+	""" Test feedback request views. """
+
+	def setUp(self):
+		self.user = user_factory()
+		self.admin = user_factory(is_superuser=True)
+		self.old_essay = essay_factory()
+		self.essay = essay_factory(revision_of=self.old_essay)
+
+	def test_list_matched_feedback_requests(self):
+		""" Test listing feedback requests matched with the a user. """
+		url = reverse('feedback-request-list')
+
+		# Must be authenticated to access feedback requests
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 403)
+
+		self.client.force_login(self.user)
+
+		# The user sees requests matched with them, not requests matched with others
+		fr_matched_with_editor = feedback_request_factory(self.essay)
+		fr_matched_with_editor.assigned_editors.add(self.user)
+		fr_matched_with_editor.assigned_editors.add(self.admin)
+		fr_not_matched_with_editor = feedback_request_factory(self.old_essay)
+		fr_not_matched_with_editor.assigned_editors.add(self.admin)
+
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 1)
+		self.assertEqual(data[0].get('pk'), fr_matched_with_editor.pk)
+		self.assertIsInstance(data[0].get('essay'), dict)
+
+		# The user sees requests with an active feedback response
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, fr_matched_with_editor)
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 1)
+		self.assertEqual(data[0].get('pk'), fr_matched_with_editor.pk)
+
+		# But only if the feedback response is their own
+		feedback_response.editor = self.admin
+		feedback_response.save()
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 0)
+
+		# The user does not see requests that are completely finished
+		feedback_response.editor = self.user
+		feedback_response.save()
+		FeedbackResponseManager(feedback_response).finish()
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 0)
+
+	def test_list_feedback_requests_paginated(self):
+		""" Test paging through the queue with a cursor. """
+		url = reverse('feedback-request-list')
+		self.client.force_login(self.user)
+		deadline = timezone.now()
+		for i in range(5):
+			feedback_request = feedback_request_factory(essay_factory())
+			# Repeat deadlines so that the primary key has to break ties
+			feedback_request.deadline = deadline + timezone.timedelta(days=i // 2)
+			feedback_request.save()
+			feedback_request.assigned_editors.add(self.user)
+		expected = list(
+			FeedbackRequestManager.query_for_user(self.user).order_by('deadline', 'pk').values_list('pk', flat=True)
+		)
+
+		pks = []
+		next_url = url + '?page_size=2'
+		while next_url:
+			response = self.client.get(next_url)
+			self.assertEqual(response.status_code, 200)
+			data = json.loads(response.content)
+			self.assertLessEqual(len(data['results']), 2)
+			pks += [feedback_request['pk'] for feedback_request in data['results']]
+			next_url = data['next']
+		self.assertEqual(pks, expected)
+
+		# Pagination is opt-in
+		response = self.client.get(url)
+		self.assertEqual(len(json.loads(response.content)), 5)
+
+		# Garbage cursors are rejected, as are well formed cursors with values of the wrong type
+		for values in [['not a date', '1'], [deadline.isoformat(), 'x'], [deadline.isoformat(), 1], [None, '1'], {}]:
+			cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+			response = self.client.get(url, {'cursor': cursor})
+			self.assertEqual(response.status_code, 404, values)
+		response = self.client.get(url + '?cursor=garbage')
+		self.assertEqual(response.status_code, 404)
+
+	def test_list_feedback_requests_sparse_fieldsets(self):
+		""" Test limiting the fields returned in the queue, and loading essay content separately. """
+		url = reverse('feedback-request-list')
+		self.client.force_login(self.user)
+		feedback_request = feedback_request_factory(self.essay)
+		feedback_request.assigned_editors.add(self.user)
+
+		response = self.client.get(url + '?fields=pk,essay.name')
+		data = json.loads(response.content)
+		self.assertEqual(data, [{'pk': feedback_request.pk, 'essay': {'name': self.essay.name}}])
+
+		with CaptureQueriesContext(connection) as context:
+			response = self.client.get(url + '?exclude=essay.content,essay.revision_of')
+		data = json.loads(response.content)
+		self.assertEqual(set(data[0]), {'pk', 'essay', 'deadline'})
+		self.assertEqual(set(data[0]['essay']), {'pk', 'name', 'uploaded_by'})
+		self.assertNotIn('"content"', context.captured_queries[-1]['sql'])
+
+		# Essay content can then be loaded on demand
+		url = reverse('essay-content', kwargs={'pk': self.essay.pk})
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(json.loads(response.content), {'pk': self.essay.pk, 'content': self.essay.content})
+
+		# But only for essays the user can see
+		response = self.client.get(reverse('essay-content', kwargs={'pk': self.old_essay.pk}))
+		self.assertEqual(response.status_code, 404)
+		response = self.client.get(reverse('essay-content', kwargs={'pk': 'abc'}))
+		self.assertEqual(response.status_code, 404)
+
+	def test_start_response(self):
+		""" Test starting a response. """
+		feedback_request_1 = feedback_request_factory(self.essay)
+		feedback_request_2 = feedback_request_factory(self.old_essay)
+		url = reverse('feedback-request-start-response', kwargs={'pk': feedback_request_1.pk})
+
+		# User must be authenticated to start a response
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 403)
+
+		self.client.force_login(self.user)
+
+		# User cannot start a response on a request they are not matched with
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 400)
+		feedback_request_1.refresh_from_db()
+		self.assertFalse(feedback_request_1.feedback_responses.exists())
+		self.assertIn('not assigned', str(response.content))
+
+		feedback_request_1.assigned_editors.add(self.user, self.admin)
+		feedback_request_2.assigned_editors.add(self.user, self.admin)
+
+		# User cannot start a response on a request someone else has started
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.admin, feedback_request_1)
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('open feedback response', str(response.content))
+
+		feedback_response.delete()
+
+		# User cannot start a response if they have another unfinished response
+		feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, feedback_request_2)
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 400)
+		feedback_request_1.refresh_from_db()
+		self.assertFalse(feedback_request_1.feedback_responses.exists())
+		self.assertIn('unfinished feedback response', str(response.content))
+
+		feedback_response.delete()
+
+		# User **CAN** start a response otherwise
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 201)
+		data = json.loads(response.content)
+		self.assertIn('previous_revision_feedback', data)
+
+	def test_claim_next(self):
+		""" Test claiming the most urgent feedback request. """
+		url = reverse('feedback-request-claim-next')
+		now = timezone.now()
+		later_request = feedback_request_factory(self.essay)
+		earlier_request = feedback_request_factory(self.old_essay)
+		taken_request = feedback_request_factory(essay_factory())
+		unassigned_request = feedback_request_factory(essay_factory())
+		for i, feedback_request in enumerate([taken_request, unassigned_request, earlier_request, later_request]):
+			feedback_request.deadline = now + timezone.timedelta(hours=i)
+			feedback_request.save()
+		for feedback_request in (later_request, earlier_request, taken_request):
+			feedback_request.assigned_editors.add(self.user, self.admin)
+		FeedbackResponseManager.create_for_feedback_request(self.admin, taken_request)
+
+		# User must be authenticated
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 403)
+
+		# The earliest deadline that is assigned to the user and not taken is claimed
+		self.client.force_login(self.user)
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 201)
+		data = json.loads(response.content)
+		self.assertEqual(data['feedback_request']['pk'], earlier_request.pk)
+		self.assertIn('previous_revision_feedback', data)
+
+		# Only one response can be open at a time
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('unfinished feedback response', str(response.content))
+
+		FeedbackResponseManager(FeedbackResponse.objects.get(pk=data['pk'])).finish()
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 201)
+		data = json.loads(response.content)
+		self.assertEqual(data['feedback_request']['pk'], later_request.pk)
+
+		# Nothing left to claim
+		FeedbackResponseManager(FeedbackResponse.objects.get(pk=data['pk'])).finish()
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 404)
+
+	def test_claim_next_skips_stale_status(self):
+		""" Test that a request whose stored status is stale is skipped rather than retried forever. """
+		feedback_request = feedback_request_factory(self.essay, assign=True)
+		FeedbackResponseManager.create_for_feedback_request(self.admin, feedback_request)
+		FeedbackRequest.objects.update(status=FeedbackRequest.Status.UNSTARTED)
+		self.assertIsNone(FeedbackResponseManager.claim_next_for_user(self.user))
+
+
+class FeedbackResponseViewTestCase(TestCase):
+	""" Test feedback response views. """
+
+	def setUp(self):
+		self.user = user_factory()
+		self.other_user = user_factory()
+		self.finished_essay = essay_factory()
+		self.finished_feedback_request = feedback_request_factory(self.finished_essay, assign=True)
+		self.finished_feedback_response = FeedbackResponseManager.create_for_feedback_request(
+			self.user, self.finished_feedback_request
+		)
+		FeedbackResponseManager(self.finished_feedback_response).finish()
+		self.essay = essay_factory(revision_of=self.finished_essay)
+		self.feedback_request = feedback_request_factory(self.essay, assign=True)
+
+	def test_list_feedback_responses(self):
+		""" Test listing feedback responses created by the current user. """
+		url = reverse('feedback-response-list')
+		self.client.force_login(self.user)
+		unfinished_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+
+		# By default, all feedback responses, finished and unfinished, are included
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 2)
+		self.assertNotIn('previous_revision_feedback', data[0])
+
+		# Can filter to only finished
+		response = self.client.get(url + '?only_finished=true')
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 1)
+		self.assertEqual(data[0]['pk'], self.finished_feedback_response.pk)
+
+		# Can filter to only unfinished
+		response = self.client.get(url + '?only_unfinished=true')
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(len(data), 1)
+		self.assertEqual(data[0]['pk'], unfinished_response.pk)
+
+	def test_list_feedback_responses_paginated(self):
+		""" Test paging through feedback responses with a cursor, newest first. """
+		url = reverse('feedback-response-list')
+		self.client.force_login(self.user)
+		unfinished_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+
+		response = self.client.get(url + '?page_size=1')
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual([item['pk'] for item in data['results']], [unfinished_response.pk])
+		self.assertIsNotNone(data['next'])
+
+		response = self.client.get(data['next'])
+		data = json.loads(response.content)
+		self.assertEqual([item['pk'] for item in data['results']], [self.finished_feedback_response.pk])
+		self.assertIsNone(data['next'])
+
+		# Filters still apply
+		response = self.client.get(url + '?page_size=5&only_finished=true')
+		data = json.loads(response.content)
+		self.assertEqual([item['pk'] for item in data['results']], [self.finished_feedback_response.pk])
+
+	def test_list_feedback_responses_with_previous_revisions(self):
+		""" Test that previous revision feedback in list endpoints costs a constant number of queries. """
+		url = reverse('feedback-response-list') + '?previous_revisions=true'
+		self.client.force_login(self.user)
+
+		def count_list_queries(params=''):
+			with CaptureQueriesContext(connection) as context:
+				response = self.client.get(url + params)
+			self.assertEqual(response.status_code, 200)
+			return len(context.captured_queries), json.loads(response.content)
+
+		num_queries, data = count_list_queries()
+		self.assertEqual(len(data), 1)
+		self.assertEqual(data[0]['previous_revision_feedback'], [])
+		self.assertEqual(count_list_queries('&revision_diffs=true')[0], num_queries)
+
+		# Extend the revision chain and respond to every revision
+		essay = self.essay
+		for _ in range(4):
+			feedback_response = FeedbackResponseManager.create_for_feedback_request(self.user, essay.feedback_request)
+			FeedbackResponseManager(feedback_response).finish()
+			essay = essay_factory(revision_of=essay)
+			feedback_request_factory(essay, assign=True)
+
+		num_queries_with_history, data = count_list_queries()
+		self.assertEqual(len(data), 5)
+		by_pk = {item['feedback_request']['essay']['pk']: item for item in data}
+		deepest = by_pk[essay.revision_of.pk]
+		self.assertEqual(len(deepest['previous_revision_feedback']), 4)
+		self.assertEqual(deepest['previous_revision_feedback'][0]['essay']['pk'], essay.revision_of.revision_of.pk)
+		# Without ancestors, neither the previous revision feedback nor its version for the ETag is queried
+		self.assertEqual(num_queries_with_history, num_queries + 2)
+		# Diffs load the content of every ancestor in one more query
+		num_queries_with_diffs, data = count_list_queries('&revision_diffs=true')
+		deepest = next(item for item in data if item['feedback_request']['essay']['pk'] == essay.revision_of.pk)
+		self.assertEqual(len(deepest['previous_revision_feedback']), 4)
+		self.assertIn('diff', deepest['previous_revision_feedback'][0]['essay'])
+		self.assertEqual(num_queries_with_diffs, num_queries_with_history + 1)
+
+	def test_list_feedback_responses_streamed(self):
+		""" Test that streamed lists match unstreamed ones. """
+		url = reverse('feedback-response-list')
+		self.client.force_login(self.user)
+		FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+
+		for params in ('', '?previous_revisions=true', '?only_finished=true&exclude=content'):
+			expected = json.loads(self.client.get(url + params).content)
+			separator = '&' if params else '?'
+			response = self.client.get(url + params + separator + 'stream=true')
+			self.assertEqual(response.status_code, 200)
+			self.assertTrue(response.streaming)
+			self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+
+		# Streaming an empty list still produces valid JSON
+		self.client.force_login(self.other_user)
+		response = self.client.get(url + '?stream=true')
+		self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+	def test_retrieve_feedback_response(self):
+		""" Test retrieving feedback responses. """
+		url = reverse('feedback-response-detail', kwargs={'pk': self.finished_feedback_response.pk})
+
+		# Can retrieve a feedback response created by current user
+		self.client.force_login(self.user)
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertIn('previous_revision_feedback', data)
+
+		# Cannot retrieve a feedback response created by another user
+		self.client.force_login(self.other_user)
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 404)
+
+	def test_update_feedback_response(self):
+		""" Test updating a feedback response. """
+		unfinished_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		url = reverse('feedback-response-detail', kwargs={'pk': unfinished_response.pk})
+		NEW_CONTENT = 'dfsgfsdhjfdsa'
+
+		updated_data = FeedbackResponseSerializer(unfinished_response).data
+		updated_data['content'] = NEW_CONTENT
+
+		# Cannot update a response created by another user
+		self.client.force_login(self.other_user)
+		response = self.client.put(url, json.dumps(updated_data), content_type=JSON)
+		self.assertEqual(response.status_code, 404)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, '')  # Defaults to blank
+
+		# Can update content field
+		self.client.force_login(self.user)
+		response = self.client.put(url, json.dumps(updated_data), content_type=JSON)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertEqual(data['content'], NEW_CONTENT)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, NEW_CONTENT)  # Defaults to blank
+		self.assertIn('previous_revision_feedback', data)
+
+		# Cannot update other fields
+		updated_data['editor'] = self.other_user.pk
+		response = self.client.put(url, json.dumps(updated_data), content_type=JSON)
+		self.assertEqual(response.status_code, 200)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, NEW_CONTENT)
+		self.assertEqual(unfinished_response.editor, self.user)
+
+		# Cannot update a finished response
+		FeedbackResponseManager(unfinished_response).finish()
+		updated_data['content'] = ''
+		response = self.client.put(url, json.dumps(updated_data), content_type=JSON)
+		self.assertEqual(response.status_code, 400)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, NEW_CONTENT)
+
+	def test_delta_update_feedback_response(self):
+		""" Test autosaving a feedback response with text operations. """
+		unfinished_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		unfinished_response.content = 'The quick brown fox.'
+		unfinished_response.save()
+		url = reverse('feedback-response-delta', kwargs={'pk': unfinished_response.pk})
+
+		def patch(data):
+			return self.client.patch(url, json.dumps(data), content_type=JSON)
+
+		# Cannot update a response created by another user
+		self.client.force_login(self.other_user)
+		response = patch({'version': 0, 'operations': [{'offset': 0, 'insert': 'x'}]})
+		self.assertEqual(response.status_code, 404)
+
+		# Operations are applied against the named version, in one go
+		self.client.force_login(self.user)
+		operations = [
+			{
+				'offset': 0,
+				'delete': 3,
+				'insert': 'A'
+			},
+			{
+				'offset': 10,
+				'delete': 5,
+				'insert': 'cat'
+			},
+			{
+				'offset': 20,
+				'insert': '!\n\t'
+			},
+		]
+		response = patch({'version': 0, 'operations': operations})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(json.loads(response.content), {'pk': unfinished_response.pk, 'version': 1})
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, 'A quick cat fox.!\n\t')
+		self.assertEqual(unfinished_response.version, 1)
+
+		# Stale versions are rejected
+		response = patch({'version': 0, 'operations': [{'offset': 0, 'insert': 'x'}]})
+		self.assertEqual(response.status_code, 409)
+		self.assertEqual(json.loads(response.content)['version'], 1)
+
+		# Operations must fit the content and must not overlap
+		response = patch({'version': 1, 'operations': [{'offset': 100, 'insert': 'x'}]})
+		self.assertEqual(response.status_code, 400)
+		response = patch({'version': 1, 'operations': [{'offset': 2, 'delete': 2}, {'offset': 3, 'insert': 'x'}]})
+		self.assertEqual(response.status_code, 400)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.version, 1)
+
+		# Full updates also move the version on
+		updated_data = FeedbackResponseSerializer(unfinished_response).data
+		updated_data['content'] = 'Replaced'
+		response = self.client.put(
+			reverse('feedback-response-detail', kwargs={'pk': unfinished_response.pk}),
+			json.dumps(updated_data),
+			content_type=JSON
+		)
+		self.assertEqual(json.loads(response.content)['version'], 2)
+
+		# Cannot update a finished response
+		unfinished_response.refresh_from_db()
+		FeedbackResponseManager(unfinished_response).finish()
+		response = patch({'version': 2, 'operations': [{'offset': 0, 'insert': 'x'}]})
+		self.assertEqual(response.status_code, 400)
+		unfinished_response.refresh_from_db()
+		self.assertEqual(unfinished_response.content, 'Replaced')
+
+	def test_finish_feedback_response(self):
+		""" Test finishing a feedback response. """
+		unfinished_response = FeedbackResponseManager.create_for_feedback_request(self.user, self.feedback_request)
+		url = reverse('feedback-response-finish', kwargs={'pk': unfinished_response.pk})
+
+		# Can finish a response (happy path test)
+		self.client.force_login(self.user)
+		response = self.client.post(url)
+		self.assertEqual(response.status_code, 200)
+		data = json.loads(response.content)
+		self.assertIn('previous_revision_feedback', data)
+		self.assertTrue(data['finished'])
+		unfinished_response.refresh_from_db()
+		self.assertTrue(unfinished_response.finished)
+		self.assertIsNotNone(unfinished_response.finish_time)
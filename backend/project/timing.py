@@ -0,0 +1,162 @@
+""" Per-request timing instrumentation, reported through `Server-Timing` headers and log lines.
+
+	ServerTimingMiddleware samples requests according to settings.SERVER_TIMING_SAMPLE_RATE. For a sampled request it
+	counts and times the database queries, times the view (ViewTimingMiddleware) and anything wrapped in `timed`, such
+	as serialization (TimedSerializerMixin), and reports the durations. Unsampled requests only cost a settings lookup.
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_timings: ContextVar[Optional['RequestTimings']] = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+	""" Accumulates named durations, in seconds, and database query counts for one request. """
+
+	def __init__(self):
+		self.durations: Dict[str, float] = defaultdict(float)
+		self.queries = 0
+		self._depths: Dict[str, int] = defaultdict(int)
+
+	@contextmanager
+	def measure(self, name: str):
+		""" Add the duration of the enclosed block to `name`. Nested blocks with the same name only count once. """
+		self._depths[name] += 1
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self._depths[name] -= 1
+			if not self._depths[name]:
+				self.durations[name] += time.perf_counter() - start
+
+	def __call__(self, execute, sql, params, many, context):
+		""" Database execute wrapper. """
+		self.queries += 1
+		with self.measure('db'):
+			return execute(sql, params, many, context)
+
+	def get_server_timing(self) -> str:
+		""" Format the durations as a Server-Timing header value, in milliseconds. """
+		metrics = []
+		for name, duration in self.durations.items():
+			description = f';desc="{self.queries} queries"' if name == 'db' else ''
+			metrics.append(f'{name};dur={duration * 1000:.1f}{description}')
+		return ', '.join(metrics)
+
+
+def get_current_timings() -> Optional[RequestTimings]:
+	""" The timings of the request being handled, or None if it is not sampled. """
+	return _current_timings.get()
+
+
+@contextmanager
+def timed(name: str):
+	""" Add the duration of the enclosed block to the current request's timings, if it is sampled. """
+	timings = _current_timings.get()
+	if timings is None:
+		yield
+	else:
+		with timings.measure(name):
+			yield
+
+
+class ServerTimingMiddleware:
+	""" Report query, view, serializer and total time for a sample of requests.
+
+		Sampled responses get a `Server-Timing` header, and a log line is written to the `project.timing` logger with
+		the timings as key=value pairs and as the `timings` attribute of the record. This should be the first
+		middleware, so that the total covers all the others.
+
+		Under ASGI, queries are counted on the connections of the thread handling the request, so sampled requests are
+		handled in a sync thread, as under WSGI. Other requests stay async.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if asyncio.iscoroutinefunction(get_response):
+			# Mark the instance as a coroutine function, as Django's MiddlewareMixin does
+			self._is_coroutine = asyncio.coroutines._is_coroutine
+
+	def __call__(self, request):
+		if asyncio.iscoroutinefunction(self.get_response):
+			return self.__acall__(request)
+		if not self.is_sampled():
+			return self.get_response(request)
+		return self.measure(request, self.get_response)
+
+	async def __acall__(self, request):
+		if not self.is_sampled():
+			return await self.get_response(request)
+		return await sync_to_async(self.measure, thread_sensitive=True)(request, async_to_sync(self.get_response))
+
+	@staticmethod
+	def is_sampled() -> bool:
+		sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+		return bool(sample_rate) and (sample_rate >= 1 or random.random() < sample_rate)
+
+	@staticmethod
+	def measure(request, get_response):
+		timings = RequestTimings()
+		token = _current_timings.set(timings)
+		try:
+			with ExitStack() as stack:
+				for connection in connections.all():
+					stack.enter_context(connection.execute_wrapper(timings))
+				with timings.measure('total'):
+					response = get_response(request)
+		finally:
+			_current_timings.reset(token)
+
+		response['Server-Timing'] = timings.get_server_timing()
+		fields = {
+			'method': request.method,
+			'path': request.path,
+			'view': request.resolver_match.view_name if request.resolver_match else None,
+			'status': response.status_code,
+			'db_queries': timings.queries,
+			**{f'{name}_ms': round(duration * 1000, 1) for name, duration in timings.durations.items()},
+		}
+		logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra={'timings': fields})
+		return response
+
+
+class ViewTimingMiddleware:
+	""" Time the view, as `view`, for requests sampled by ServerTimingMiddleware. This should be the last middleware,
+		so that it only covers the view.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if asyncio.iscoroutinefunction(get_response):
+			self._is_coroutine = asyncio.coroutines._is_coroutine
+
+	def __call__(self, request):
+		if asyncio.iscoroutinefunction(self.get_response):
+			return self.__acall__(request)
+		with timed('view'):
+			return self.get_response(request)
+
+	async def __acall__(self, request):
+		with timed('view'):
+			return await self.get_response(request)
@@ -1,8 +1,15 @@
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 from django.utils import timezone
-from django.db import transaction
-from django.db.models import query
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery, Sum, TextField, Value
+from django.db.models.functions import Concat, Length, Substr
 from django.db.models.query_utils import Q
+from project.caching import FeedbackRequestQueueCache
 from project.models import Essay, FeedbackRequest, FeedbackResponse, User
+from project.search import SearchIndex
 
 
 class FeedbackResponseExistsError(Exception):
@@ -17,6 +24,170 @@ class EditorNotAssignedToFeedbackRequestError(Exception):
 	""" Error raised when a FeedbackResponse cannot be created because the editor is not assigned the request. """
 
 
+def get_version(queryset, *modified_fields: str) -> Tuple[str, Optional[datetime]]:
+	""" Identify the current state of the rows in a queryset, with one aggregate query and without loading them.
+
+		Returns a token that changes when rows are added or removed or when any of the modified timestamps change, and
+		the latest of those timestamps.
+	"""
+	aggregates = queryset.order_by().aggregate(
+		count=Count('pk'), pk_sum=Sum('pk'), **{f'max_{i}': Max(field)
+												for i, field in enumerate(modified_fields)}
+	)
+	timestamps = [aggregates[f'max_{i}'] for i in range(len(modified_fields))]
+	token = ':'.join([str(aggregates['count']), str(aggregates['pk_sum'])] + [str(t) for t in timestamps])
+	return token, max((t for t in timestamps if t is not None), default=None)
+
+
+class EssayManager:
+	""" Helper methods related to Essays. """
+
+	# Guards against cycles in `revision_of`, which the schema does not prevent
+	MAX_REVISION_DEPTH = 1000
+
+	@staticmethod
+	def query_for_user(user: User):
+		""" Query all Essays the specified user can read: those they uploaded, and those on FeedbackRequests assigned
+			to them.
+		"""
+		return Essay.objects.filter(
+			pk__in=Essay.objects.filter(Q(uploaded_by=user) | Q(feedback_request__assigned_editors=user)).values('pk')
+		)
+
+	@staticmethod
+	def get_ancestor_ids_for_essays(essay_ids: Iterable[int]) -> Dict[int, List[int]]:
+		""" Get the ids of the ancestors of each of the specified Essays in a single query.
+
+			Ancestors are found by following `revision_of` with a recursive CTE, so the result always reflects the
+			current state of the chain (including revisions inserted mid-chain and chains broken by deletions).
+
+			Returns a dict mapping each essay id to its ancestor ids, nearest ancestor first.
+		"""
+		essay_ids = list(set(essay_ids))
+		ancestor_ids: Dict[int, List[int]] = {essay_id: [] for essay_id in essay_ids}
+		if not essay_ids:
+			return ancestor_ids
+
+		table = connection.ops.quote_name(Essay._meta.db_table)
+		pk = connection.ops.quote_name(Essay._meta.pk.column)
+		revision_of = connection.ops.quote_name(Essay._meta.get_field('revision_of').column)
+		placeholders = ', '.join(['%s'] * len(essay_ids))
+		sql = f"""
+			WITH RECURSIVE ancestry (root_id, essay_id, depth) AS (
+				SELECT {pk}, {revision_of}, 1 FROM {table}
+				WHERE {pk} IN ({placeholders}) AND {revision_of} IS NOT NULL
+				UNION ALL
+				SELECT ancestry.root_id, essay.{revision_of}, ancestry.depth + 1
+				FROM ancestry INNER JOIN {table} essay ON essay.{pk} = ancestry.essay_id
+				WHERE essay.{revision_of} IS NOT NULL AND ancestry.depth < %s
+			)
+			SELECT root_id, essay_id FROM ancestry ORDER BY root_id, depth
+		"""
+		with connection.cursor() as cursor:
+			cursor.execute(sql, [*essay_ids, EssayManager.MAX_REVISION_DEPTH])
+			for root_id, essay_id in cursor.fetchall():
+				ancestor_ids[root_id].append(essay_id)
+		return ancestor_ids
+
+	@staticmethod
+	def get_ancestor_ids(essay: Essay) -> List[int]:
+		""" Get the ids of all ancestors of the specified Essay, nearest ancestor first, in a single query. """
+		return EssayManager.get_ancestor_ids_for_essays([essay.pk])[essay.pk]
+
+
+class PreviousRevisionLoader:
+	""" Bulk loader for feedback on previous revisions of many Essays.
+
+		Ancestor Essays, their FeedbackRequests and their finished FeedbackResponses are each fetched once for all of
+		the Essays passed in, so the number of queries does not depend on how many Essays there are or on how long
+		their revision chains are.
+	"""
+
+	def __init__(self, essays: Iterable[Essay], include_content: bool = True):
+		""" If `include_content` is False, the content of ancestor Essays is not loaded. """
+		self.ancestor_ids = EssayManager.get_ancestor_ids_for_essays(essay.pk for essay in essays)
+		self.include_content = include_content
+		self._feedback_requests: Optional[Dict[int, FeedbackRequest]] = None
+		self._finished_feedback_responses: Optional[Dict[int, FeedbackResponse]] = None
+
+	@classmethod
+	def for_feedback_responses(
+		cls, feedback_responses: Iterable[FeedbackResponse], include_content: bool = True
+	) -> 'PreviousRevisionLoader':
+		""" Create a loader for the Essays being edited in the specified FeedbackResponses. """
+		return cls(
+			(feedback_response.feedback_request.essay for feedback_response in feedback_responses), include_content
+		)
+
+	def _all_ancestor_ids(self) -> Set[int]:
+		return {essay_id for ancestor_ids in self.ancestor_ids.values() for essay_id in ancestor_ids}
+
+	@property
+	def feedback_requests(self) -> Dict[int, FeedbackRequest]:
+		""" FeedbackRequests on all ancestor Essays, keyed by essay id. Loaded in one query on first access. """
+		if self._feedback_requests is None:
+			ancestor_ids = self._all_ancestor_ids()
+			self._feedback_requests = {}
+			if ancestor_ids:
+				queryset = FeedbackRequest.objects.filter(essay_id__in=ancestor_ids).select_related('essay')
+				if not self.include_content:
+					queryset = queryset.defer('essay__content')
+				for feedback_request in queryset:
+					self._feedback_requests[feedback_request.essay_id] = feedback_request
+		return self._feedback_requests
+
+	@property
+	def finished_feedback_responses(self) -> Dict[int, FeedbackResponse]:
+		""" The first finished FeedbackResponse on each ancestor Essay, keyed by essay id. Loaded in one query on
+			first access.
+		"""
+		if self._finished_feedback_responses is None:
+			ancestor_ids = self._all_ancestor_ids()
+			self._finished_feedback_responses = {}
+			if ancestor_ids:
+				for feedback_response in FeedbackResponse.objects.filter(
+					finished=True, feedback_request__essay_id__in=ancestor_ids
+				).select_related('feedback_request').order_by('pk'):
+					self._finished_feedback_responses.setdefault(
+						feedback_response.feedback_request.essay_id, feedback_response
+					)
+		return self._finished_feedback_responses
+
+	def get_feedback_requests(self, essay: Essay) -> List[FeedbackRequest]:
+		""" Get the FeedbackRequests on ancestors of the specified Essay, nearest ancestor first. """
+		feedback_requests = self.feedback_requests
+		return [
+			feedback_requests[essay_id]
+			for essay_id in self.ancestor_ids.get(essay.pk, [])
+			if essay_id in feedback_requests
+		]
+
+	def get_finished_feedback_responses(self, essay: Essay) -> List[FeedbackResponse]:
+		""" Get the finished FeedbackResponses on ancestors of the specified Essay, nearest ancestor first. """
+		finished_feedback_responses = self.finished_feedback_responses
+		return [
+			finished_feedback_responses[essay_id]
+			for essay_id in self.ancestor_ids.get(essay.pk, [])
+			if essay_id in finished_feedback_responses
+		]
+
+
+class FeedbackResponseFinishedError(Exception):
+	""" Error raised when a finished FeedbackResponse would be modified. """
+
+
+class StaleFeedbackResponseVersionError(Exception):
+	""" Error raised when a delta update names a version of a FeedbackResponse that is no longer current. """
+
+	def __init__(self, current_version: int):
+		super().__init__(current_version)
+		self.current_version = current_version
+
+
+class InvalidFeedbackResponseDeltaError(Exception):
+	""" Error raised when a delta update does not fit the content it is applied to. """
+
+
 class FeedbackRequestManager:
 	""" Helper methods related to FeedbackRequests. """
 
@@ -28,50 +199,262 @@ class FeedbackRequestManager:
 			to the user.
 		"""
 		return FeedbackRequest.objects.filter(
-			Q(assigned_editors=user) & Q(Q(feedback_responses__isnull=True) | Q(feedback_responses__editor=user))
-		).exclude(feedback_responses__finished=True)
+			Q(assigned_editors=user) & Q(
+				Q(status=FeedbackRequest.Status.UNSTARTED)
+				| Q(status=FeedbackRequest.Status.IN_PROGRESS, active_editor=user)
+			)
+		)
+
+	@staticmethod
+	def get_queue_version(user: User) -> Tuple[str, datetime]:
+		""" Identify the current state of the user's queue without querying it.
+
+			This is the user's FeedbackRequestQueueCache generation, which changes whenever anything in their queue
+			does, including requests leaving it, which aggregates over the queue could not see. Its timestamp is the
+			last modification time.
+		"""
+		generation = FeedbackRequestQueueCache.get_generation(user.pk)
+		return str(generation), datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
+
+	@staticmethod
+	def get_status_for_response(feedback_response: FeedbackResponse) -> str:
+		""" Get the status a FeedbackRequest should have, given the FeedbackResponse on it. """
+		if feedback_response.finished:
+			return FeedbackRequest.Status.FINISHED
+		return FeedbackRequest.Status.IN_PROGRESS
+
+	@staticmethod
+	def sync_status_for_response(feedback_response: FeedbackResponse):
+		""" Bring the status of a FeedbackRequest in line with a FeedbackResponse on it that was just saved.
+
+			This is a single UPDATE that matches no rows when the status is already in sync, as it is for most saves.
+			Editor queues that the change affects are invalidated.
+		"""
+		status = FeedbackRequestManager.get_status_for_response(feedback_response)
+		feedback_requests = FeedbackRequest.objects.filter(pk=feedback_response.feedback_request_id)
+		if status == FeedbackRequest.Status.FINISHED and feedback_requests.filter(
+			status=FeedbackRequest.Status.IN_PROGRESS, active_editor_id=feedback_response.editor_id
+		).update(
+			status=status, modified=timezone.now()
+		):
+			# Finishing only takes the request out of the queue of the editor who had it in progress
+			FeedbackRequestQueueCache.invalidate_users([feedback_response.editor_id])
+		elif feedback_requests.exclude(
+			status=status, active_editor_id=feedback_response.editor_id
+		).update(
+			status=status, active_editor_id=feedback_response.editor_id, modified=timezone.now()
+		):
+			FeedbackRequestQueueCache.invalidate_feedback_requests([feedback_response.feedback_request_id])
+
+	@staticmethod
+	def refresh_status(feedback_request_id: int):
+		""" Recompute the status of a FeedbackRequest from the FeedbackResponses on it. """
+		feedback_response = FeedbackResponse.objects.filter(feedback_request_id=feedback_request_id
+															).order_by('-finished', 'pk').first()
+		if feedback_response is None:
+			if FeedbackRequest.objects.filter(pk=feedback_request_id).exclude(
+				status=FeedbackRequest.Status.UNSTARTED, active_editor_id=None
+			).update(
+				status=FeedbackRequest.Status.UNSTARTED, active_editor_id=None, modified=timezone.now()
+			):
+				FeedbackRequestQueueCache.invalidate_feedback_requests([feedback_request_id])
+		else:
+			FeedbackRequestManager.sync_status_for_response(feedback_response)
+
+	@staticmethod
+	def repair_statuses(queryset=None) -> int:
+		""" Recompute the status of every FeedbackRequest in the queryset (default: all) with bulk UPDATEs.
+
+			Only rows that are out of sync are written. Returns the number of rows that were repaired.
+		"""
+		if queryset is None:
+			queryset = FeedbackRequest.objects.all()
+		responses = FeedbackResponse.objects.filter(feedback_request=OuterRef('pk')).order_by('pk')
+		finished_responses = responses.filter(finished=True)
+		unfinished_responses = responses.filter(finished=False)
+
+		repaired = 0
+		for status, condition, editor_responses in (
+			(FeedbackRequest.Status.FINISHED, Exists(finished_responses), finished_responses),
+			(
+				FeedbackRequest.Status.IN_PROGRESS,
+				~Exists(finished_responses) & Exists(unfinished_responses),
+				unfinished_responses,
+			),
+		):
+			editor = Subquery(editor_responses.values('editor_id')[:1])
+			repaired += queryset.annotate(expected_editor_id=editor).filter(condition).filter(
+				~Q(status=status) | ~Q(active_editor_id=F('expected_editor_id')) | Q(active_editor_id__isnull=True)
+			).update(
+				status=status, active_editor_id=editor, modified=timezone.now()
+			)
+		repaired += queryset.filter(~Exists(responses)).filter(
+			~Q(status=FeedbackRequest.Status.UNSTARTED) | Q(active_editor_id__isnull=False)
+		).update(
+			status=FeedbackRequest.Status.UNSTARTED, active_editor_id=None, modified=timezone.now()
+		)
+		if repaired:
+			FeedbackRequestQueueCache.invalidate_all()
+		return repaired
 
 
 class FeedbackResponseManager:
 	""" Helper methods related to FeedbackResponses. """
 
+	# Number of candidate FeedbackRequests read at a time by claim_next_for_user
+	CLAIM_NEXT_BATCH_SIZE = 10
+
 	def __init__(self, feedback_response: FeedbackResponse):
 		self.feedback_response = feedback_response
 
 	@staticmethod
 	def create_for_feedback_request(user: User, feedback_request: FeedbackRequest):
-		with transaction.atomic():
-			_ = FeedbackRequest.objects.filter(pk=feedback_request.pk).select_for_update()[0]
-			_ = User.objects.filter(pk=user.pk).select_for_update()[0]
-			if feedback_request.feedback_responses.exists():
+		""" Start a FeedbackResponse by the specified user on the specified FeedbackRequest.
+
+			Concurrent claims are arbitrated by the database rather than by locks: unique constraints allow only one
+			FeedbackResponse per FeedbackRequest and one unfinished FeedbackResponse per editor, so the insert itself
+			fails for the loser of a race. The cause is only looked up after an insert fails.
+		"""
+		if not feedback_request.assigned_editors.filter(pk=user.pk).exists():
+			raise EditorNotAssignedToFeedbackRequestError()
+		return FeedbackResponseManager._insert_for_feedback_request(user, feedback_request)
+
+	@staticmethod
+	def _insert_for_feedback_request(user: User, feedback_request: FeedbackRequest):
+		""" Insert a FeedbackResponse, mapping constraint violations to errors. Does not check the assignment. """
+		try:
+			with transaction.atomic():
+				feedback_response = FeedbackResponse.objects.create(
+					editor=user,
+					feedback_request=feedback_request,
+				)
+		except IntegrityError:
+			if FeedbackResponse.objects.filter(feedback_request=feedback_request).exists():
 				raise FeedbackResponseExistsError()
-			elif user.feedback_responses.filter(finished=False).exists():
+			elif FeedbackResponse.objects.filter(editor=user, finished=False).exists():
 				raise EditorHasOpenFeedbackResponseError()
-			elif not feedback_request.assigned_editors.filter(pk=user.pk).exists():
-				raise EditorNotAssignedToFeedbackRequestError()
-			return FeedbackResponse.objects.create(
-				editor=user,
-				feedback_request=feedback_request,
-			)
+			raise
+		# The stored status is synced when the response is saved; keep the caller's instance in line with it
+		feedback_request.status = FeedbackRequest.Status.IN_PROGRESS
+		feedback_request.active_editor = user
+		return feedback_response
+
+	@staticmethod
+	def claim_next_for_user(user: User) -> Optional[FeedbackResponse]:
+		""" Start a FeedbackResponse on the most urgent unstarted FeedbackRequest assigned to the specified user.
+
+			Candidates are read in deadline order from the (status, deadline) index. Where the database supports
+			SKIP LOCKED, candidates being claimed by other editors are skipped, so concurrent callers get distinct
+			requests. Elsewhere, the unique constraints reject candidates that another editor claimed first and the
+			next candidate is tried. Either way the caller never has to retry.
+
+			Returns None if no unstarted FeedbackRequest is assigned to the user.
+		"""
+		if user.feedback_responses.filter(finished=False).exists():
+			raise EditorHasOpenFeedbackResponseError()
+		candidates = FeedbackRequest.objects.filter(
+			assigned_editors=user, status=FeedbackRequest.Status.UNSTARTED
+		).order_by('deadline', 'pk')
+		skip_locked = connection.features.has_select_for_update_skip_locked
+		if skip_locked:
+			of = ('self',) if connection.features.has_select_for_update_of else ()
+			candidates = candidates.select_for_update(skip_locked=True, of=of)
+
+		taken = []
+		while True:
+			# Row locks only last as long as the transaction. Without them, reading outside of one avoids holding
+			# a read lock that would have to be upgraded for the insert (which SQLite fails rather than waits for).
+			with transaction.atomic() if skip_locked else nullcontext():
+				batch = list(candidates.exclude(pk__in=taken)[:FeedbackResponseManager.CLAIM_NEXT_BATCH_SIZE])
+				if not batch:
+					return None
+				for feedback_request in batch:
+					try:
+						return FeedbackResponseManager._insert_for_feedback_request(user, feedback_request)
+					except FeedbackResponseExistsError:
+						taken.append(feedback_request.pk)
 
 	@staticmethod
 	def query_for_user(user: User):
 		""" Query all FeedbackResponses related to the specified user. """
 		return FeedbackResponse.objects.filter(editor=user)
 
+	@staticmethod
+	def get_version(feedback_responses, include_previous_revisions: bool = False) -> Tuple[str, Optional[datetime]]:
+		""" Identify the current state of the FeedbackResponses in a queryset, as serialized with their
+			FeedbackRequests and Essays, and optionally the feedback on previous revisions. See `get_version`.
+		"""
+		token, last_modified = get_version(
+			feedback_responses, 'modified', 'feedback_request__modified', 'feedback_request__essay__modified'
+		)
+		if include_previous_revisions:
+			ancestor_ids = EssayManager.get_ancestor_ids_for_essays(
+				feedback_responses.values_list('feedback_request__essay_id', flat=True)
+			)
+			previous_token, previous_modified = get_version(
+				FeedbackRequest.objects.filter(essay_id__in={pk
+																for ids in ancestor_ids.values()
+																for pk in ids}),
+				'modified',
+				'essay__modified',
+			)
+			token = f'{token}:{previous_token}'
+			last_modified = max(filter(None, [last_modified, previous_modified]), default=None)
+		return token, last_modified
+
 	def finish(self):
 		""" Finish the managed FeedbackResponse. """
 		self.feedback_response.finish_time = timezone.now()
 		self.feedback_response.finished = True
 		self.feedback_response.save()
+		if FeedbackResponse.feedback_request.is_cached(self.feedback_response):
+			self.feedback_response.feedback_request.status = FeedbackRequest.Status.FINISHED
+
+	@staticmethod
+	def apply_delta(feedback_responses, pk: int, version: int, operations: List[dict]) -> int:
+		""" Apply text operations to the content of a FeedbackResponse in a single UPDATE.
+
+			Each operation is a dict with `offset`, `delete` and `insert` keys: `delete` characters starting at
+			`offset` are replaced by the `insert` text. Offsets refer to the content at `version`, and operations must
+			be sorted by offset and must not overlap. The update only applies if the response is still at `version`
+			and unfinished, and it increments the version.
+
+			`feedback_responses` is the queryset the response is looked up in, which scopes who may update it.
+
+			Returns the new version.
+		"""
+		pieces = []
+		position = 0
+		for operation in operations:
+			if operation['offset'] > position:
+				pieces.append(Substr('content', position + 1, operation['offset'] - position))
+			if operation['insert']:
+				pieces.append(Value(operation['insert']))
+			position = operation['offset'] + operation['delete']
+		pieces.append(Substr('content', position + 1))
+		content = Concat(*pieces, output_field=TextField()) if len(pieces) > 1 else pieces[0]
+
+		feedback_responses = feedback_responses.filter(pk=pk).annotate(content_length=Length('content'))
+		updated = feedback_responses.filter(
+			version=version, finished=False, content_length__gte=position
+		).update(
+			content=content, version=F('version') + 1, modified=timezone.now()
+		)
+		if updated:
+			# The update bypasses the signal that syncs the search index
+			SearchIndex.index_feedback_response_ids([pk])
+			return version + 1
+
+		feedback_response = feedback_responses.values('finished', 'version', 'content_length').first()
+		if feedback_response is None:
+			raise FeedbackResponse.DoesNotExist()
+		elif feedback_response['finished']:
+			raise FeedbackResponseFinishedError()
+		elif feedback_response['version'] != version:
+			raise StaleFeedbackResponseVersionError(feedback_response['version'])
+		raise InvalidFeedbackResponseDeltaError()
 
 	def get_previous_feedback_responses(self):
 		""" Get FeedbackResponses on previous revisions of the Essay being edited. """
-		feedback_responses = []
-		essay: Essay = self.feedback_response.feedback_request.essay
-		while essay.revision_of:
-			essay = essay.revision_of
-			feedback_response = FeedbackResponse.objects.filter(finished=True, feedback_request__essay=essay).first()
-			if feedback_response:
-				feedback_responses.append(feedback_response)
-		return feedback_responses
+		essay = self.feedback_response.feedback_request.essay
+		return PreviousRevisionLoader([essay]).get_finished_feedback_responses(essay)
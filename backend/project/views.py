@@ -1,27 +1,232 @@
+import hashlib
+
+from datetime import datetime
+from itertools import islice
+from typing import List, Optional, Tuple
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth import login as auth_login, authenticate, logout as auth_logout
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from rest_framework import views
 from rest_framework import viewsets
 from rest_framework import status
 from rest_framework import mixins
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import generics
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from project.models import FeedbackRequest
+from rest_framework.utils.urls import replace_query_param
+from project.caching import FeedbackRequestQueueCache
+from project.diffs import EssayDiffCache
+from project.fast_serializers import compile_serializer
+from project.ingestion import CSV, JSONL, EssayIngester, IngestionError, read_records
+from project.models import Essay, FeedbackRequest, FeedbackResponse
+from project.pagination import FeedbackRequestPagination, FeedbackResponsePagination
+from project.routing import RecentWrites, end_replica_reads, read_from_primary, start_replica_reads
+from project.search import ESSAY, FEEDBACK_RESPONSE, KINDS, InvalidSearchQueryError, SearchHit, SearchIndex, SearchNotSupportedError
+from project.serializers import EssayContentSerializer, EssaySerializer, FeedbackRequestSerializer, FeedbackResponseDeltaSerializer, FeedbackResponseSerializer, SparseFieldsetMixin
+from project.utilities import EditorHasOpenFeedbackResponseError, EditorNotAssignedToFeedbackRequestError, EssayManager, FeedbackRequestManager, FeedbackResponseExistsError, FeedbackResponseFinishedError, FeedbackResponseManager, InvalidFeedbackResponseDeltaError, StaleFeedbackResponseVersionError
+
+
+class SparseFieldsetViewMixin:
+	""" Viewset mixin that passes the `fields` and `exclude` query params to a SparseFieldsetMixin serializer.
+
+		Both params are comma-separated lists of dotted field paths (e.g. `?exclude=essay.content`). Model fields
+		listed in `deferrable_fields` are deferred in the queryset whenever they will not be serialized.
+	"""
+
+	# Map of serializer field path to the queryset path to defer when that field is not requested
+	deferrable_fields = {}
+
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		for key in (SparseFieldsetMixin.FIELDS, SparseFieldsetMixin.EXCLUDE):
+			value = self.request.query_params.get(key)
+			if value is not None:
+				context[key] = {path.strip() for path in value.split(',') if path.strip()}
+		return context
+
+	def defer_unrequested_fields(self, queryset):
+		context = self.get_serializer_context()
+		deferred = [
+			queryset_path for field_path, queryset_path in self.deferrable_fields.items()
+			if not SparseFieldsetMixin.is_field_requested(context, field_path)
+		]
+		return queryset.defer(*deferred) if deferred else queryset
+
+
+class CompiledSerializerViewMixin:
+	""" Viewset mixin that serializes GET responses with the compiled equivalent of the view's serializer, which
+		produces the same output faster. See project.fast_serializers. Views opt out with `compile_serializers = False`.
+	"""
+
+	compile_serializers = True
+
+	def get_serializer(self, *args, **kwargs):
+		serializer = super().get_serializer(*args, **kwargs)
+		if self.compile_serializers and self.request.method == 'GET' and 'data' not in kwargs:
+			return compile_serializer(serializer)
+		return serializer
+
+
+class ConditionalGetMixin:
+	""" Viewset mixin that answers conditional GETs (`If-None-Match`, `If-Modified-Since`) with 304 Not Modified,
+		without loading or serializing the data.
+
+		Views call `get_not_modified_response` first and return its response if there is one. Otherwise the `ETag` and
+		`Last-Modified` headers are added to their 200 response. The ETag is derived from `get_version`, the user and
+		the full path, so different users and query params get different ETags.
+	"""
+
+	etag = None
+	last_modified = None
+
+	def get_version(self) -> Optional[Tuple[str, Optional[datetime]]]:
+		""" A token identifying the data the view would return, and when it was last modified, or None if it cannot
+			be determined cheaply. Views override this; by default every request gets a full response.
+		"""
+		return None
+
+	def get_not_modified_response(self, request):
+		version = self.get_version()
+		if version is None:
+			return None
+		token, last_modified = version
+		self.etag = quote_etag(
+			hashlib.sha1(f'{request.user.pk}:{request.get_full_path()}:{token}'.encode()).hexdigest()
+		)
+		self.last_modified = int(last_modified.timestamp()) if last_modified else None
+		response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+		if isinstance(response, HttpResponseNotModified):
+			response['ETag'] = self.etag
+		return response
+
+	def finalize_response(self, request, response, *args, **kwargs):
+		response = super().finalize_response(request, response, *args, **kwargs)
+		if self.etag and response.status_code == status.HTTP_200_OK:
+			response['ETag'] = self.etag
+			if self.last_modified is not None:
+				response['Last-Modified'] = http_date(self.last_modified)
+		return response
+
+
+class ReplicaReadViewMixin:
+	""" Viewset mixin that reads from the database replica in `replica_actions`, unless the user wrote within the last
+		few seconds, and records successful unsafe requests as writes. See project.routing.
+	"""
+
+	replica_actions = ('list', 'retrieve')
+
+	def initial(self, request, *args, **kwargs):
+		# Authentication reads from the primary, since sessions and users written moments ago must be found
+		super().initial(request, *args, **kwargs)
+		if self.action in self.replica_actions and not RecentWrites.has_written(request.user):
+			start_replica_reads()
 
-from project.serializers import EssaySerializer, FeedbackRequestSerializer, FeedbackResponseSerializer
-from project.utilities import EditorHasOpenFeedbackResponseError, EditorNotAssignedToFeedbackRequestError, FeedbackRequestManager, FeedbackResponseExistsError, FeedbackResponseManager
+	def dispatch(self, request, *args, **kwargs):
+		try:
+			return super().dispatch(request, *args, **kwargs)
+		finally:
+			# Also when an exception escapes, so that later queries in the thread do not read from the replica
+			end_replica_reads()
+
+	def finalize_response(self, request, response, *args, **kwargs):
+		end_replica_reads()
+		if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+			RecentWrites.record(request.user)
+		return super().finalize_response(request, response, *args, **kwargs)
+
+
+class StreamingListModelMixin(mixins.ListModelMixin):
+	""" List mixin that can stream the list as a JSON array instead of building it in memory.
+
+		Streaming is enabled per request with `?stream=true`. The queryset is read with `QuerySet.iterator()` and
+		serialized one chunk at a time, so memory use is bounded by `stream_chunk_size` rather than by the size of the
+		list. Streamed lists are never paginated.
+
+		Only WSGI streams the list. Under ASGI, Django 3.1 iterates streaming responses on the event loop, where the
+		ORM cannot run, so the same chunks are rendered in the view's thread and sent as one response.
+	"""
+
+	stream_chunk_size = 500
+
+	def list(self, request, *args, **kwargs):
+		if request.query_params.get('stream') != 'true':
+			return super().list(request, *args, **kwargs)
+		queryset = self.filter_queryset(self.get_queryset())
+		if isinstance(request._request, ASGIRequest):
+			return HttpResponse(b''.join(self.stream_list(queryset)), content_type='application/json')
+		return StreamingHttpResponse(self.stream_list(queryset), content_type='application/json')
+
+	def stream_list(self, queryset):
+		""" Yield the serialized queryset as the chunks of a JSON array. """
+		renderer = JSONRenderer()
+		rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+		yield b'['
+		separator = b''
+		while True:
+			chunk = list(islice(rows, self.stream_chunk_size))
+			if not chunk:
+				break
+			# Render the chunk as an array with the same renderer as unstreamed responses, then drop the brackets
+			yield separator + renderer.render(self.get_serializer(chunk, many=True).data)[1:-1]
+			separator = b','
+		yield b']'
+
+
+class FeedbackRequestViewSet(
+	ReplicaReadViewMixin, CompiledSerializerViewMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+	viewsets.GenericViewSet, StreamingListModelMixin
+):
+	""" Viewset for views pertaining to feedback requests.
 
+		Query params:
+			cursor, page_size: If either is given, the list is paginated by deadline. See KeysetPagination.
+			fields, exclude: Limit the fields returned. See SparseFieldsetViewMixin.
+			stream: If 'true', the list is streamed. See StreamingListModelMixin.
+
+		The list without query params, which is each editor's whole queue, is cached per user. See
+		FeedbackRequestQueueCache. Its responses say whether they came from the cache in an `X-Cache` header.
 
-class FeedbackRequestViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
-	""" Viewset for views pertaining to feedback requests. """
+		The list answers conditional GETs. See ConditionalGetMixin.
+	"""
 
 	serializer_class = FeedbackRequestSerializer
+	pagination_class = FeedbackRequestPagination
 	permission_classes = (IsAuthenticated,)
+	deferrable_fields = {'essay.content': 'essay__content'}
 
 	def get_queryset(self):
-		return FeedbackRequestManager.query_for_user(self.request.user).select_related('essay')
+		return self.defer_unrequested_fields(
+			FeedbackRequestManager.query_for_user(self.request.user).select_related('essay')
+		)
+
+	def get_version(self):
+		return FeedbackRequestManager.get_queue_version(self.request.user)
+
+	def list(self, request, *args, **kwargs):
+		not_modified = self.get_not_modified_response(request)
+		if not_modified is not None:
+			return not_modified
+		if request.query_params:
+			# The ETag comes from the primary's queue generation, so the body must too, or a lagging replica's list
+			# would be stored under it and served by later 304s. See project.routing.
+			with read_from_primary():
+				return super().list(request, *args, **kwargs)
+
+		def load():
+			# Cached queues are read by later requests, so they are loaded from the primary. See project.routing.
+			with read_from_primary():
+				return self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data
+
+		data, hit = FeedbackRequestQueueCache.get_or_set(request.user, load)
+		return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
 
 	@action(methods=['post'], detail=True, url_path='start-response', url_name='start-response')
 	def start_response(self, request, pk, *args, **kwargs):
@@ -63,29 +268,74 @@ class FeedbackRequestViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
 				{'detail': 'That feedback request is not assigned to you.'}, status=status.HTTP_400_BAD_REQUEST
 			)
 
+	@action(methods=['post'], detail=False, url_path='claim-next', url_name='claim-next')
+	def claim_next(self, request, *args, **kwargs):
+		""" Start a new FeedbackResponse on the unstarted FeedbackRequest assigned to the user with the earliest
+			deadline.
+
+			Returns a 400 if the user already has an unfinished FeedbackResponse, and a 404 if there is nothing to claim.
+
+			Returns a 201 with a serialized FeedbackResponse if the request succeeds.
+		"""
+		try:
+			feedback_response = FeedbackResponseManager.claim_next_for_user(self.request.user)
+		except EditorHasOpenFeedbackResponseError:
+			return Response(
+				{'detail': 'You cannot start feedback because you have another unfinished feedback response.'},
+				status=status.HTTP_400_BAD_REQUEST
+			)
+		if feedback_response is None:
+			return Response(
+				{'detail': 'There are no unstarted feedback requests assigned to you.'},
+				status=status.HTTP_404_NOT_FOUND
+			)
+		return Response(
+			FeedbackResponseSerializer(
+				feedback_response, context={
+					FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS: True
+				}
+			).data,
+			status=status.HTTP_201_CREATED
+		)
+
 
 class FeedbackResponseViewSet(
-	viewsets.GenericViewSet, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.UpdateModelMixin
+	ReplicaReadViewMixin, CompiledSerializerViewMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+	viewsets.GenericViewSet, mixins.RetrieveModelMixin, StreamingListModelMixin, mixins.UpdateModelMixin
 ):
 	""" Viewset for views pertaining to feedback responses.
 
-		Includes previous feedback on responses in detail endpoints.
+		Includes previous feedback on responses in detail endpoints. The list and detail endpoints answer conditional
+		GETs. See ConditionalGetMixin.
 
 		Query params:
 			only_finished: If 'true', only finished FeedbackResponses will be returned.
 			only_unfinished: If 'true', only unfinished FeedbackResponses will be returned.
+			previous_revisions: If 'true', previous revision feedback is included in list endpoints too. It is loaded
+				for the whole page in a constant number of queries.
+			revision_diffs: If 'true', each previous revision has a `diff` to the essay being edited instead of its
+				content. See EssayViewSet.diff.
+			cursor, page_size: If either is given, the list is paginated, newest first. See KeysetPagination.
+			fields, exclude: Limit the fields returned. See SparseFieldsetViewMixin.
+			stream: If 'true', the list is streamed. See StreamingListModelMixin.
 	"""
 
 	serializer_class = FeedbackResponseSerializer
+	pagination_class = FeedbackResponsePagination
 	permission_classes = (IsAuthenticated,)
+	deferrable_fields = {'feedback_request.essay.content': 'feedback_request__essay__content'}
 
 	def get_queryset(self):
-		return FeedbackResponseManager.query_for_user(self.request.user).select_related('feedback_request__essay')
+		return self.defer_unrequested_fields(
+			FeedbackResponseManager.query_for_user(self.request.user).select_related('feedback_request__essay')
+		)
 
 	def get_serializer_context(self):
 		context = super().get_serializer_context()
-		if self.detail:
+		if self.detail or self.request.query_params.get('previous_revisions') == 'true':
 			context[FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS] = True
+		if self.request.query_params.get('revision_diffs') == 'true':
+			context[FeedbackResponseSerializer.PREVIOUS_REVISION_DIFFS] = True
 		return context
 
 	def filter_queryset(self, queryset):
@@ -95,14 +345,85 @@ class FeedbackResponseViewSet(
 			queryset = queryset.filter(finished=False)
 		return super().filter_queryset(queryset)
 
-	def update(self, *args, **kwargs):
+	def get_version(self):
+		feedback_responses = self.filter_queryset(self.get_queryset())
+		if self.detail:
+			try:
+				feedback_responses = feedback_responses.filter(pk=int(self.kwargs['pk']))
+			except ValueError:
+				return None
+		return FeedbackResponseManager.get_version(
+			feedback_responses,
+			include_previous_revisions=self.get_serializer_context().get(
+				FeedbackResponseSerializer.INCLUDE_PREVIOUS_REVISIONS, False
+			),
+		)
+
+	def list(self, request, *args, **kwargs):
+		not_modified = self.get_not_modified_response(request)
+		if not_modified is not None:
+			return not_modified
+		return super().list(request, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		not_modified = self.get_not_modified_response(request)
+		if not_modified is not None:
+			return not_modified
+		return super().retrieve(request, *args, **kwargs)
+
+	def update(self, request, *args, **kwargs):
+		partial = kwargs.pop('partial', False)
 		feedback_response = self.get_object()
 		if feedback_response.finished:
 			return Response(
 				{'detail': 'You cannot update that response because it is finished.'},
 				status=status.HTTP_400_BAD_REQUEST
 			)
-		return super().update(*args, **kwargs)
+		serializer = self.get_serializer(feedback_response, data=request.data, partial=partial)
+		serializer.is_valid(raise_exception=True)
+		serializer.save(version=feedback_response.version + 1)
+		return Response(serializer.data)
+
+	@action(methods=['patch'], detail=True)
+	def delta(self, request, pk, *args, **kwargs):
+		""" Apply a delta to the content of the specified FeedbackResponse, for autosaving long documents.
+
+			Expects `{"version": <int>, "operations": [{"offset": <int>, "delete": <int>, "insert": <str>}, ...]}`.
+			See FeedbackResponseManager.apply_delta for the semantics of the operations.
+
+			Returns 200 with the new version on success, 409 with the current version if `version` is stale, and 400
+			if the response is finished or the operations do not fit its content.
+		"""
+		try:
+			pk = int(pk)
+		except ValueError:
+			raise Http404
+		serializer = FeedbackResponseDeltaSerializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		try:
+			version = FeedbackResponseManager.apply_delta(
+				FeedbackResponseManager.query_for_user(request.user), pk, **serializer.validated_data
+			)
+		except FeedbackResponse.DoesNotExist:
+			raise Http404
+		except FeedbackResponseFinishedError:
+			return Response(
+				{'detail': 'You cannot update that response because it is finished.'},
+				status=status.HTTP_400_BAD_REQUEST
+			)
+		except StaleFeedbackResponseVersionError as e:
+			return Response(
+				{
+					'detail': f'Version {serializer.validated_data["version"]} is not the current version.',
+					'version': e.current_version,
+				},
+				status=status.HTTP_409_CONFLICT
+			)
+		except InvalidFeedbackResponseDeltaError:
+			return Response(
+				{'detail': 'The operations extend past the end of the content.'}, status=status.HTTP_400_BAD_REQUEST
+			)
+		return Response({'pk': pk, 'version': version})
 
 	@action(methods=['post'], detail=True)
 	def finish(self, request, pk, *args, **kwargs):
@@ -119,6 +440,156 @@ class FeedbackResponseViewSet(
 		return Response(self.get_serializer(feedback_response).data)
 
 
+class EssayViewSet(ReplicaReadViewMixin, viewsets.GenericViewSet):
+	""" Viewset for views pertaining to essays. """
+
+	permission_classes = (IsAuthenticated,)
+
+	def get_queryset(self):
+		return EssayManager.query_for_user(self.request.user)
+
+	@action(methods=['get'], detail=True)
+	def content(self, request, pk, *args, **kwargs):
+		""" Get the content of an Essay on its own, for clients that list essays without their content. """
+		essay = generics.get_object_or_404(self.get_queryset().only('pk', 'content'), pk=pk)
+		return Response(EssayContentSerializer(essay).data)
+
+	@action(methods=['get'], detail=True)
+	def diff(self, request, pk, *args, **kwargs):
+		""" Get a diff from an ancestor of an Essay to the Essay, for clients that already have its content. Diffs
+			are cached. See diff_content for the format.
+
+			Query params:
+				ancestor: The id of the ancestor. Defaults to the Essay's `revision_of`.
+		"""
+		# DRF's get_object_or_404 also turns a pk that is not an id into a 404
+		essay = generics.get_object_or_404(self.get_queryset(), pk=pk)
+		ancestor_id = request.query_params.get('ancestor', essay.revision_of_id)
+		if ancestor_id is None:
+			return Response({'detail': 'This essay is not a revision.'}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			ancestor_id = int(ancestor_id)
+		except (TypeError, ValueError):
+			return Response({'detail': 'ancestor must be an essay id.'}, status=status.HTTP_400_BAD_REQUEST)
+		if ancestor_id not in EssayManager.get_ancestor_ids(essay):
+			return Response(
+				{'detail': 'That essay is not an ancestor of this essay.'}, status=status.HTTP_400_BAD_REQUEST
+			)
+		ancestor = Essay.objects.only('pk', 'modified').get(pk=ancestor_id)
+		return Response(
+			{
+				'essay': essay.pk,
+				'ancestor': ancestor_id,
+				'diff': EssayDiffCache.get_diffs(essay, [ancestor])[ancestor_id],
+			}
+		)
+
+	@action(methods=['post'], detail=False, permission_classes=(IsAuthenticated, IsAdminUser))
+	def bulk(self, request, *args, **kwargs):
+		""" Bulk import essays from a JSONL (default) or CSV (`Content-Type: text/csv`) request body.
+
+			The body is read a line at a time and imported in batches. See EssayIngester and read_records.
+
+			Query params:
+				start: Skip this many records, to resume an import that failed part way through.
+
+			Returns 200 with the number of rows committed, or 400 with the number of rows committed before the
+			batch that failed. Staff only.
+		"""
+		record_format = CSV if request.content_type.startswith('text/csv') else JSONL
+		try:
+			start = int(request.query_params.get('start', 0))
+		except ValueError:
+			return Response({'detail': 'start must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+		lines = (line.decode('utf-8') for line in iter(request.stream.readline, b'')) if request.stream else ()
+		try:
+			result = EssayIngester(request.user).ingest(read_records(lines, record_format), start=start)
+		except IngestionError as e:
+			return Response({'detail': str(e), 'rows': e.rows_committed}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(
+			{
+				'rows': result.rows,
+				'essays': result.essays,
+				'feedback_requests': result.feedback_requests,
+				'assignments': result.assignments,
+				'rows_per_second': round(result.rows_per_second, 1),
+			}
+		)
+
+
+class SearchView(views.APIView):
+	""" Ranked full-text search over the essays and feedback responses the user can read. See project.search.
+
+		Query params:
+			q: The search. Every term must match, and double-quoted phrases must match as phrases.
+			type: 'essay' or 'feedback_response' to only search one of them.
+			page, page_size: The page of results, from 1, and its size.
+
+		Responses look like `{"next": <url or null>, "results": [...]}`, best matches first. Each result has its
+		`type` and `pk`, a `score` (lower is better), an HTML `snippet` with matches in <mark>, and a few fields of the
+		object.
+	"""
+
+	permission_classes = (IsAuthenticated,)
+	page_size = 20
+	max_page_size = 100
+
+	def get(self, request, *args, **kwargs):
+		kind = request.query_params.get('type')
+		if kind is not None and kind not in KINDS:
+			return Response(
+				{'detail': f'type must be one of: {", ".join(KINDS)}.'}, status=status.HTTP_400_BAD_REQUEST
+			)
+		try:
+			page = max(1, int(request.query_params.get('page', 1)))
+			page_size = max(1, min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size))
+		except ValueError:
+			return Response({'detail': 'page and page_size must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			# One extra hit tells whether there is a next page
+			hits = SearchIndex.search(
+				request.query_params.get('q', ''),
+				request.user,
+				kind,
+				limit=page_size + 1,
+				offset=(page - 1) * page_size
+			)
+		except InvalidSearchQueryError:
+			return Response({'detail': 'Enter something to search for.'}, status=status.HTTP_400_BAD_REQUEST)
+		except SearchNotSupportedError:
+			return Response({'detail': 'Search is not available.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+		next_url = None
+		if len(hits) > page_size:
+			hits = hits[:page_size]
+			next_url = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+		return Response({'next': next_url, 'results': self.get_results(hits)})
+
+	@staticmethod
+	def get_results(hits: List[SearchHit]) -> List[dict]:
+		""" Describe each hit, loading the fields of each type of object in one query. """
+		fields = {
+			ESSAY:
+			Essay.objects.values('pk', 'name', 'revision_of'),
+			FEEDBACK_RESPONSE:
+			FeedbackResponse.objects.values(
+				'pk', 'feedback_request', 'editor', 'finished', essay=F('feedback_request__essay')
+			),
+		}
+		objects = {}
+		for kind, queryset in fields.items():
+			pks = [hit.pk for hit in hits if hit.kind == kind]
+			if pks:
+				objects.update({(kind, row['pk']): row for row in queryset.filter(pk__in=pks)})
+		return [
+			{
+				'type': hit.kind,
+				**objects[(hit.kind, hit.pk)], 'score': hit.score,
+				'snippet': hit.snippet
+			} for hit in hits if (hit.kind, hit.pk) in objects
+		]
+
+
 class HomeView(views.APIView):
 	""" View that takes users who navigate to `/` to the correct page, depending on login status. """
 
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -19,6 +20,35 @@ from pathlib import Path
 AUTH_USER_MODEL = 'project.User'
 FRONTEND_URL = 'http://localhost:8080/'
 ENV = 'LOCAL'
+# Fraction of requests to report timings for in Server-Timing headers and logs. See project.timing.
+SERVER_TIMING_SAMPLE_RATE = 0.0
+# Requests with this value in the X-Profile-Token header are profiled, as is a sample of requests. See
+# project.profiling.
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DIR = Path(__file__).resolve().parent.parent / 'profiles'
+# 'full' or 'delta'. With 'delta', essay revisions are stored as compressed diffs against the essay they revise, in
+# full every ESSAY_CONTENT_KEYFRAME_INTERVAL revisions. Convert existing essays with `convert_essay_content` when
+# changing it. See project.content_storage.
+ESSAY_CONTENT_STORAGE = os.environ.get('ESSAY_CONTENT_STORAGE', 'full')
+ESSAY_CONTENT_KEYFRAME_INTERVAL = 8
+# Pragmas applied to every SQLite connection: a profile from project.database.SQLITE_PROFILES ('production' or
+# 'baseline'), and overrides of any of its pragmas, e.g. SQLITE_PRAGMAS='cache_size=-128000,mmap_size=0'.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = dict(pragma.split('=', 1) for pragma in os.environ.get('SQLITE_PRAGMAS', '').split(',') if pragma)
+# The database alias that list and detail endpoints read from, if it is in DATABASES, and for how many seconds after a
+# user writes their reads stay on the primary instead. See project.routing.
+DATABASE_REPLICA = 'replica'
+READ_YOUR_WRITES_WINDOW = 5
+# 'db', 'cached_db' or 'signed_cookies'. The last two read sessions without a query. Authenticated users are cached for
+# AUTH_USER_CACHE_TIMEOUT seconds. See project.authentication.
+SESSION_ENGINE = f'django.contrib.sessions.backends.{os.environ.get("SESSION_BACKEND", "cached_db")}'
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTHENTICATION_BACKENDS = [
+	'project.authentication.CachedModelBackend',
+	# For sessions started before CachedModelBackend, which name the backend that authenticated them
+	'django.contrib.auth.backends.ModelBackend',
+]
 
 ##########
 # SETTINGS BELOW HERE ARE BASED ON DJANGO DEFAULTS
@@ -52,6 +82,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+	'project.timing.ServerTimingMiddleware',
 	'django.middleware.security.SecurityMiddleware',
 	'django.contrib.sessions.middleware.SessionMiddleware',
 	'django.middleware.common.CommonMiddleware',
@@ -59,6 +90,8 @@ MIDDLEWARE = [
 	'django.contrib.auth.middleware.AuthenticationMiddleware',
 	'django.contrib.messages.middleware.MessageMiddleware',
 	'django.middleware.clickjacking.XFrameOptionsMiddleware',
+	'project.profiling.ProfilingMiddleware',
+	'project.timing.ViewTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'prompt.urls'
@@ -89,6 +122,26 @@ DATABASES = {
 	'default': {
 		'ENGINE': 'django.db.backends.sqlite3',
 		'NAME': BASE_DIR / 'db.sqlite3',
+		# Keep connections, and the pragmas and page cache that come with them, for this many seconds across requests
+		'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+	}
+}
+# A read replica. Locally, a second SQLite file kept in sync with the `sync_replica` command stands in for one.
+if os.environ.get('DATABASE_REPLICA_NAME'):
+	DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['DATABASE_REPLICA_NAME']}
+DATABASE_ROUTERS = ['project.routing.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# A file based cache is shared by every process on the host, so invalidations reach them all.
+
+CACHES = {
+	'default': {
+		'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+		'LOCATION': BASE_DIR / 'cache',
+		'OPTIONS': {
+			'MAX_ENTRIES': 100000,
+		},
 	}
 }
 
@@ -128,6 +181,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+LOGGING = {
+	'version': 1,
+	'disable_existing_loggers': False,
+	'handlers': {
+		'console': {
+			'class': 'logging.StreamHandler',
+		},
+	},
+	'loggers': {
+		'project': {
+			'handlers': ['console'],
+			'level': 'INFO',
+		},
+	},
+}
+
 
 # Disable migrations when testing
 # See: https://stackoverflow.com/a/28560805
@@ -142,3 +211,8 @@ class DisableMigrations(object):
 
 if 'test' in sys.argv[1:]:
 	MIGRATION_MODULES = DisableMigrations()
+	# Rolled back test data is never invalidated, so tests that use the cache enable it themselves
+	CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+	# A second database for the tests of replica routing, which route reads to it by overriding DATABASE_REPLICA
+	DATABASES['replica'] = DATABASES['default'].copy()
+	DATABASE_REPLICA = None
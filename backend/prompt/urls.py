@@ -18,9 +18,11 @@ from django.urls import path
 
 from rest_framework.routers import SimpleRouter
 
-from project.views import FeedbackRequestViewSet, FeedbackResponseViewSet, HomeView, LoginView, LogoutView, PlatformView
+from project.async_views import AsyncFeedbackRequestViewSet, AsyncFeedbackResponseViewSet
+from project.views import EssayViewSet, FeedbackRequestViewSet, FeedbackResponseViewSet, HomeView, LoginView, LogoutView, PlatformView, SearchView
 
 router = SimpleRouter()
+router.register('api/essay', EssayViewSet, basename='essay')
 router.register('api/feedback-request', FeedbackRequestViewSet, basename='feedback-request')
 router.register('api/feedback-response', FeedbackResponseViewSet, basename='feedback-response')
 
@@ -30,4 +32,25 @@ urlpatterns = router.urls + [
 	path('login/', LoginView.as_view(), name='user-login'),
 	path('logout/', LogoutView.as_view(), name='user-logout'),
 	path('platform/', PlatformView.as_view(), name='platform'),
+	path('api/search/', SearchView.as_view(), name='search'),
+	path(
+		'api/async/feedback-request/',
+		AsyncFeedbackRequestViewSet.as_view({'get': 'list'}, detail=False),
+		name='async-feedback-request-list'
+	),
+	path(
+		'api/async/feedback-response/',
+		AsyncFeedbackResponseViewSet.as_view({'get': 'list'}, detail=False),
+		name='async-feedback-response-list'
+	),
+	path(
+		'api/async/feedback-response/<pk>/',
+		AsyncFeedbackResponseViewSet.as_view({'get': 'retrieve'}, detail=True),
+		name='async-feedback-response-detail'
+	),
+	path(
+		'api/async/feedback-response/<pk>/delta/',
+		AsyncFeedbackResponseViewSet.as_view({'patch': 'delta'}, detail=True),
+		name='async-feedback-response-delta'
+	),
 ]
@@ -20,6 +20,7 @@ export type FeedbackResponse = {
   finish_time: string // stores datetime at which finished
   editor: number
   content: string
+  version: number // incremented on every save
 }
 
 export type FeedbackResponseWithHistory = FeedbackResponse & {